@@ -0,0 +1,965 @@
+import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+
+import perf_metrics
+from json_stream import IncrementalJSONObjectParser
+from llm_client import achat_completion, chat_completion, run_async
+from result_cache import text_hash
+from token_budget import SCORE_CALL_INPUT_TOKENS, fit_inputs, input_budget
+
+# ================= 3. AI 交互逻辑 =================
+
+MOCK_DATA = {
+    "total_score": 78,
+    "dimensions": {
+        "技能匹配度": 82,
+        "经验相关性": 75,
+        "行业契合度": 70,
+        "表达与亮点": 88
+    },
+    "highlights": [
+        "演示模式：已有 AI/大模型相关项目，和 AI 产品/智能分析岗位高度相关。",
+        "演示模式：具备一定 Python / 数据分析基础，方便后续向数据产品或智能分析方向延展。"
+    ],
+    "gaps": [
+        "演示模式：简历中缺少系统性的指标设计与业务结果量化描述。",
+        "演示模式：缺少对协作方式、跨部门沟通的具体案例说明。"
+    ],
+    "suggestions": [
+        {
+            "section": "项目经历",
+            "original": "参与风向监控 Agent 项目。",
+            "problem": "描述过于笼统，看不出业务背景、你的职责和结果。",
+            "rewrite": "主导风向监控 Agent 需求分析与PRD撰写，覆盖战略/行业/产品等6个维度的信息源，将竞品情报整理耗时从1天缩短至2小时，为老板周例会提供结构化对手情报输入。"
+        },
+        {
+            "section": "技能",
+            "original": "熟练使用 Office。",
+            "problem": "表述过泛，与目标岗位的关键能力缺乏关联。",
+            "rewrite": "熟练使用 Excel / Pandas 进行数据清洗与漏斗分析，具备基础 SQL 查询能力，可独立完成简历数据与业务日志数据的结构化处理。"
+        }
+    ],
+    "draft_resume": """# 演示简历
+## 个人简介
+我正在向 AI 产品 / 数据分析方向发展，具备基础产品方法论和数据分析能力，已经通过多项项目实践熟悉「需求分析 → 方案设计 → 项目落地 → 结果复盘」的完整闭环。
+
+## 教育经历
+- **某某大学 本科 · 专业：XXX**（201X - 202X）
+  - 相关课程：数据分析、统计学基础、数据库原理、计算机基础
+
+## 实习 / 项目经历
+- **风向监控 Agent 项目｜AI 产品实习 / 个人项目**
+  - 背景：公司缺乏系统的竞品与行业信息收集机制，情报依赖人工搜索与零散记录。
+  - 职责：主导风向监控 Agent 的需求分析、PRD撰写与核心流程设计。
+  - 方案：
+    - 设计战略 / 行业 / 财务 / 产品 / 招投标 / 口碑 6个维度的监控框架；
+    - 定义多 Agent 协同检索与聚合规则，搭建舆情与情报数据的初步结构化方案。
+  - 结果：
+    - 将竞品情报整理耗时从1天缩短至2小时；
+    - 支持老板在周例会中更系统地评估竞对策略与行业动向。
+  - 工具：Coze / 腾讯元宝、多Agent编排、Notion、Excel
+
+- **JobAlign AI 简历匹配与成长规划工具｜个人项目**
+  - 背景：求职者很难理解 JD 需求、评估自身匹配度并规划下一步学习。
+  - 职责：从0到1设计并实现简历上传解析、JD对比、匹配报告、学习规划与岗位推荐的完整流程。
+  - 方案：
+    - 使用 Streamlit 构建前端界面，支持 PDF / Word / 图片简历与多个 JD 同时上传；
+    - 利用大模型生成匹配度评分、亮点 / 缺失分析、简历改写建议与3-6个月成长路径。
+  - 结果：
+    - 帮助用户快速识别与自身背景更契合的岗位方向；
+    - 提供结构化的学习与项目实践建议，为后续求职打基础。
+  - 工具：Python、Streamlit、OpenAI / DeepSeek API、PyPDF2、pytesseract
+
+## 技能
+- 产品：需求分析、PRD撰写、用户场景拆解、UAT测试
+- 数据：Python（Pandas）、SQL基础、简单可视化与漏斗分析
+- 工具：Figma / 墨刀、Notion、Excel、Streamlit
+- AI：对大模型、RAG、多 Agent 有一定理解，能基于平台搭建简单智能体流程
+
+## 其他
+- 持续在 CSDN / 个人公众号输出数据与 AI 产品相关内容，保持自我迭代。
+""",
+    "learning_plan": {
+        "target_direction": "AI 产品 / 数据产品 方向",
+        "summary": "综合你的简历与目标 JD，更推荐你在未来3-6个月重点强化：产品方法论、数据分析思维与项目复盘能力，用少量但高质量的项目支撑简历，而不是盲目堆数量。",
+        "skills_to_focus": [
+            "系统化的PRD写作与需求拆解",
+            "SQL + 基础数据分析思维",
+            "业务指标设计与结果量化表达",
+            "项目复盘与结构化表达"
+        ],
+        "stages": [
+            {
+                "name": "第1-4周：打基础（理解岗位 & 强化表达）",
+                "goals": [
+                    "搞清楚AI产品 / 数据产品岗位的日常与核心能力",
+                    "能写出结构清晰且有重点的PRD / 项目说明"
+                ],
+                "actions": [
+                    "每周阅读2-3篇 AI / 数据产品案例拆解，将核心结构和亮点记录下来。",
+                    "选1-2个你常用的产品，尝试从“问题-目标-方案-指标”的角度各写1页分析。"
+                ]
+            },
+            {
+                "name": "第5-8周：打造 1-2 个可写进简历的项目",
+                "goals": [
+                    "产出至少1个完整项目，可在简历中用1/3页重点描述",
+                    "项目说明中能体现“做了什么”和“带来了什么变化”"
+                ],
+                "actions": [
+                    "基于 JobAlign 等现有项目，补上需求背景、目标用户、关键指标与复盘思考。",
+                    "结合公开数据或模拟数据，做一份简单的数据分析或看板，并写成小报告。"
+                ]
+            },
+            {
+                "name": "第9-12周：校准简历 & 预热面试",
+                "goals": [
+                    "让简历与目标 JD 的关键词高度对齐，同时保持真实",
+                    "提前熟悉常见面试问法和项目深挖角度"
+                ],
+                "actions": [
+                    "针对 3-5 条目标 JD，使用本工具多次优化简历表述，形成 1-2 份主力版本。",
+                    "在牛客等平台刷同岗位面经，整理高频问题，并用自己的项目练习回答。"
+                ]
+            }
+        ]
+    },
+    "resources": [
+        {
+            "platform": "B站",
+            "category": "学习视频",
+            "search_keyword": "产品经理 PRD 入门 案例 拆解",
+            "reason": "帮助你系统理解 PRD 的结构和写法，提升简历中产品项目的专业度。"
+        },
+        {
+            "platform": "B站",
+            "category": "学习视频",
+            "search_keyword": "Python SQL 数据分析 零基础 实战 项目",
+            "reason": "你对数据分析有兴趣，但缺少成体系项目，可以通过实战教学补齐。"
+        },
+        {
+            "platform": "牛客",
+            "category": "面试经验",
+            "search_keyword": "AI 产品 实习 面经 2024",
+            "reason": "目标 JD 是 AI / 大模型相关产品方向，提前熟悉常见面试问题和考察维度。"
+        },
+        {
+            "platform": "CSDN",
+            "category": "技术文章",
+            "search_keyword": "Streamlit 简历分析 项目 实战",
+            "reason": "你已经在做 Streamlit 简历分析工具，可以参考他人实践，丰富项目亮点。"
+        }
+    ],
+    "job_recommendations": [
+        {
+            "title": "AI 产品实习生",
+            "company_type": "头部/新锐互联网公司（示例）",
+            "location": "一线 / 新一线城市",
+            "similarity_to_target_jd": 90,
+            "match_reason": "岗位同样聚焦大模型 / 智能体方向，要求你具备产品思维与基础技术理解，与现有项目非常契合。",
+            "core_requirements": [
+                "参与 AI 产品需求分析、方案设计与文档撰写",
+                "对主流大模型 / Agent 应用有基本了解，有实践经验更佳",
+                "良好的沟通协作能力，能在技术与业务之间做有效对接"
+            ]
+        },
+        {
+            "title": "数据产品实习生",
+            "company_type": "数据智能 / 企业服务公司（示例）",
+            "location": "北上广深 / 杭州 / 成都",
+            "similarity_to_target_jd": 85,
+            "match_reason": "在保持产品岗位属性的前提下，更强调数据分析与指标设计，与你的 Python / SQL 和项目经历匹配度较高。",
+            "core_requirements": [
+                "参与数据产品需求梳理与指标体系设计",
+                "配合中台 /业务方搭建分析报表与看板",
+                "具备基础 SQL / Python 数据处理能力"
+            ]
+        }
+    ],
+    "target_jd_overview": [
+        {
+            "jd_index": 1,
+            "jd_title": "JD_1：AI 产品实习生（示例）",
+            "match_score": 88,
+            "recommendation_level": "强烈推荐",
+            "short_comment": "岗位方向与简历中的 AI 产品 / 智能体项目高度一致，是当前背景下优先级最高的选择之一。"
+        },
+        {
+            "jd_index": 2,
+            "jd_title": "JD_2：数据分析实习生（示例）",
+            "match_score": 80,
+            "recommendation_level": "可重点考虑",
+            "short_comment": "强调数据分析能力和 SQL / Python，对你现在的技术基础比较友好，但产品成分略弱。"
+        }
+    ],
+    "selected_jd_index": 1
+}
+
+
+_PROMPT_ROLE = """
+你是一名非常专业的「简历评估 + 职业发展教练」，熟悉校招 / 实习 / 社招 ATS 筛选逻辑，
+理解 AI 产品 / 数据分析 / 互联网业务岗位的真实工作内容和用人标准。
+
+你的目标：
+- 帮求职者看清「当前简历」与「多个候选 JD」的匹配情况；
+- 帮他选出更值得重点冲刺的岗位方向（不替他决定人生，只做专业建议）；
+- 在此基础上，给出简历优化建议、未来3–6个月的成长规划、学习资源推荐，以及同方向的其他公司岗位参考。
+
+"""
+
+_PROMPT_FIELDS_REPORT = """1. total_score        (0-100整数)
+   - 对「最终选中的 JD」的总体匹配度评分。
+
+2. dimensions         (对象，键包括：
+                        - 技能匹配度
+                        - 经验相关性
+                        - 行业契合度
+                        - 表达与亮点
+                       值为0-100整数)
+
+3. highlights         (数组，3-5条高匹配点，每条为字符串，语言专业、具体，避免空洞鸡汤)
+
+4. gaps               (数组，3-5条缺失或风险点，每条为字符串，尽量关联到面试 / ATS 筛选风险)
+
+"""
+
+_PROMPT_FIELDS_SUGGESTIONS = """5. suggestions        (数组，元素为对象，字段：
+                       - section: 所属模块，如“项目经历”“实习经历”“技能”
+                       - original: 简历原文句子
+                       - problem: 存在的问题（例如：缺少量化结果、与JD关键词不对齐）
+                       - rewrite: 建议的改写示例（注意保持真实，不虚构经历）)
+
+"""
+
+_PROMPT_FIELDS_DRAFT = """6. draft_resume       (字符串，针对“最终选中的 JD”生成的完整简历 Markdown 文本，
+                       使用 # / ## 标题和 - 列表，突出与该 JD 相关的经历与成果，不要包含 JSON 转义字符)
+
+"""
+
+_PROMPT_FIELDS_CORE = _PROMPT_FIELDS_REPORT + _PROMPT_FIELDS_SUGGESTIONS + _PROMPT_FIELDS_DRAFT
+
+_PROMPT_FIELDS_MULTI_JD = """【多 JD 匹配与选择】
+
+7. target_jd_overview (数组，用于汇总每个候选 JD 的匹配情况。每个元素为对象：
+                       - jd_index: 整数，和输入中的 JD 序号一致（从 1 开始）
+                       - jd_title: 复制输入中 JD 标题（如：文件名或你看到的标题），不要自己造
+                       - match_score: 0-100 整数，该 JD 与当前简历的匹配度
+                       - recommendation_level: 字符串，如“强烈推荐”“可重点考虑”“可尝试”“不推荐”
+                       - short_comment: 1-2 句专业点评，说明匹配好/不好的关键原因)
+
+8. selected_jd_index  (整数，从 1 开始，表示你认为最适合做本轮深度优化的 JD 序号。
+                       total_score / dimensions / draft_resume 等都应基于这个 JD。)
+
+"""
+
+_PROMPT_FIELDS_LEARNING = """【学习与资源推荐】
+
+9. learning_plan      (对象，字段：
+                       - target_direction: 综合简历与 JD 后推荐的主要发展方向（如：AI产品、数据产品、数据分析等）
+                       - summary: 用2-3句话概述未来3-6个月更理性、更有效的准备思路
+                       - skills_to_focus: 数组，列出3-6个优先需要补齐或加强的能力/技能
+                       - stages: 数组，每个阶段是一个对象，字段：
+                           * name: 阶段名称，如“第1-4周：打基础”
+                           * goals: 数组，该阶段的目标（站在求职者视角，而不是算法视角）
+                           * actions: 数组，该阶段可以执行的具体行动建议（可操作，不要泛泛而谈）)
+
+10. resources         (数组，每个元素是一个学习 / 面试资源建议对象，字段：
+                       - platform: 平台名称，如“B站”“YouTube”“牛客”“CSDN”“其他”
+                       - category: 资源类型，如“学习视频”“面试经验”“技术文章”“刷题/实战”
+                       - search_keyword: 建议用户在该平台使用的搜索关键词（可以直接复制粘贴去搜）
+                       - reason: 推荐理由，说明该资源如何帮助用户弥补当前简历中的短板或准备面试)
+
+"""
+
+_PROMPT_FIELDS_JOBS = """【相似岗位推荐（同方向）】
+
+11. job_recommendations (数组，每个元素是一个岗位推荐对象，字段：
+                       - title: 岗位名称，例如“AI 产品实习生”“数据产品实习生”
+                       - company_type: 公司类型或示例描述，如“一线互联网公司（示例）”“数据智能公司（示例）”
+                       - location: 城市或地区（可以是模糊描述，如“一线/新一线城市”）
+                       - similarity_to_target_jd: 0-100整数，表示与「最终选中 JD」的相似程度
+                       - match_reason: 推荐理由，说明为什么该岗位方向适合当前用户（结合简历与JD）
+                       - core_requirements: 数组，列出3-6条该岗位核心要求示例（用自然语言）
+
+"""
+
+_PROMPT_FIELDS_GROWTH = _PROMPT_FIELDS_LEARNING + _PROMPT_FIELDS_JOBS
+
+_PROMPT_CONSTRAINTS = """强约束要求：
+- 所有 job_recommendations 必须与「候选 JD 的岗位类型」同一职业族，例如：
+  - 输入 JD 是 AI 产品 / 数据产品 / 互联网产品岗，只能推荐同类或高度相关产品/数据岗；
+  - 不要跨到「财务、人力、纯后端开发」等完全不相关方向。
+- 不要杜撰具体公司名和具体招聘链接，可以使用“某头部互联网公司（示例）”这类泛化描述。
+- 所有内容必须基于【简历】和【候选 JD】的方向、技能差距来生成，避免和用户完全无关的建议。
+- 不要编造简历中根本不存在的学校 / 公司 / 证书，可以合理推测适合的学习方向和资源关键词。
+- 语气专业、友好，尽量站在求职者视角，避免空泛鸡汤，多给可执行建议。
+- 输出必须是严格合法的 JSON，对象最外层必须包含上述所有字段。
+    """
+
+SYSTEM_PROMPT = (
+    _PROMPT_ROLE
+    + """请根据【简历】和【候选 JD 列表】进行分析，并返回严格的 JSON，字段必须包含：
+
+"""
+    + _PROMPT_FIELDS_CORE
+    + _PROMPT_FIELDS_MULTI_JD
+    + _PROMPT_FIELDS_GROWTH
+    + _PROMPT_CONSTRAINTS
+)
+
+# 分阶段引擎：第一阶段逐个 JD 打分（小请求），第二阶段只对选中的 JD 做深度生成
+JD_SCORE_PROMPT = """
+你是一名非常专业的「简历评估 + 职业发展教练」，熟悉校招 / 实习 / 社招 ATS 筛选逻辑。
+
+请只评估【简历】与【一个候选 JD】的匹配度，返回严格的 JSON，字段必须包含：
+- match_score: 0-100 整数，该 JD 与当前简历的匹配度
+- recommendation_level: 字符串，如“强烈推荐”“可重点考虑”“可尝试”“不推荐”
+- short_comment: 1-2 句专业点评，说明匹配好/不好的关键原因
+
+输出必须是严格合法的 JSON，不要输出其他字段。
+"""
+
+DEEP_ANALYSIS_PROMPT = (
+    _PROMPT_ROLE
+    + "请根据【简历】和【选中的目标 JD】进行深度分析，并返回严格的 JSON，字段必须包含：\n\n"
+    + _PROMPT_FIELDS_CORE
+    + _PROMPT_FIELDS_GROWTH
+    + _PROMPT_CONSTRAINTS
+)
+
+# 深度分析也可按分区拆成互相独立的请求并行生成，每个分区可以路由到不同模型
+# （如资源 / 岗位推荐用快速便宜的模型，定制简历用更强的模型），结果合并回同一结构
+DEEP_SECTIONS = {
+    "report": ("total_score", "dimensions", "highlights", "gaps"),
+    "suggestions": ("suggestions",),
+    "draft_resume": ("draft_resume",),
+    "learning": ("learning_plan", "resources"),
+    "job_recommendations": ("job_recommendations",),
+}
+SECTION_LABELS = {
+    "report": "匹配报告（总分 / 维度 / 亮点 / 缺失）",
+    "suggestions": "改写建议",
+    "draft_resume": "定制简历",
+    "learning": "学习规划与资源",
+    "job_recommendations": "相似岗位推荐",
+}
+SECTION_PROMPTS = {
+    section: (
+        _PROMPT_ROLE
+        + "请根据【简历】和【选中的目标 JD】进行深度分析。本次只负责以下字段，返回严格的 JSON，字段必须包含：\n\n"
+        + fields
+        + _PROMPT_CONSTRAINTS
+    )
+    for section, fields in {
+        "report": _PROMPT_FIELDS_REPORT,
+        "suggestions": _PROMPT_FIELDS_SUGGESTIONS,
+        "draft_resume": _PROMPT_FIELDS_DRAFT,
+        "learning": _PROMPT_FIELDS_LEARNING,
+        "job_recommendations": _PROMPT_FIELDS_JOBS,
+    }.items()
+}
+
+TEMPERATURE = 0.7
+JD_SCORE_TEMPERATURE = 0.3
+
+# 提示词指纹：提示词任何改动都会让结果缓存自动失效
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + JD_SCORE_PROMPT + DEEP_ANALYSIS_PROMPT + "".join(SECTION_PROMPTS.values())).encode("utf-8")
+).hexdigest()[:12]
+
+
+_error_handler = st.error
+_thread_local = threading.local()
+
+
+def set_error_handler(handler):
+    """
+    设置错误提示方式：界面内默认 st.error，
+    命令行 / 后台任务等非 Streamlit 场景可替换为日志等
+    """
+    global _error_handler
+    _error_handler = handler
+
+
+@contextmanager
+def thread_error_handler(handler):
+    """只对当前线程生效的错误回调（后台任务在共享线程池中运行，不能改全局回调）"""
+    previous = getattr(_thread_local, "error_handler", None)
+    _thread_local.error_handler = handler
+    try:
+        yield
+    finally:
+        _thread_local.error_handler = previous
+
+
+def _report_error(message):
+    (getattr(_thread_local, "error_handler", None) or _error_handler)(message)
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def _add_usage(acc, usage):
+    """把 response.usage 累加到调用方传入的 usage 字典（可选）"""
+    if acc is None or usage is None:
+        return
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        acc[field] = acc.get(field, 0) + (getattr(usage, field, 0) or 0)
+
+
+def _completion(api_key, base_url, call, usage=None, **kwargs):
+    """非流式调用：记录 llm.total 耗时与 token，并累加 usage"""
+    with perf_metrics.span("llm.total", call=call, model=kwargs.get("model")) as attrs:
+        response = chat_completion(api_key, base_url, **kwargs)
+        attrs.update(perf_metrics.usage_attrs(response.usage))
+    _add_usage(usage, response.usage)
+    return response
+
+
+def _parse_json(content):
+    with perf_metrics.span("json.parse", chars=len(content or "")):
+        return json.loads(content)
+
+
+def build_messages(resume, jd_list, model=None, model_limits=None):
+    """
+    resume: 简历文本
+    jd_list: [{'index': int, 'title': str, 'text': str}, ...]  支持多个 JD
+    model: 用于查询上下文窗口，按 token 预算裁剪简历与各 JD
+    model_limits: 本次调用自定义的模型上限（token_budget.model_limit_overrides），优先于内置表
+    """
+    with perf_metrics.span("prompt.build", call="full", jds=len(jd_list)):
+        resume_fit, jd_texts = fit_inputs(
+            resume,
+            [jd.get("text", "") for jd in jd_list],
+            input_budget(model, SYSTEM_PROMPT, model_limits)
+        )
+
+    # 组合多 JD 内容
+    jd_blocks = []
+    for idx, (jd, text) in enumerate(zip(jd_list, jd_texts), start=1):
+        title = jd.get("title", f"JD_{idx}")
+        jd_blocks.append(
+            f"<<<JD_{idx} - {title}>>>\n{text}"
+        )
+    jd_combined = "\n\n".join(jd_blocks)
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"【简历文本】:\n{resume_fit}\n\n"
+                f"【候选岗位JD列表】：\n\n{jd_combined}"
+            )
+        }
+    ]
+
+
+def analyze_with_llm(api_key, base_url, model, resume, jd_list, usage=None, model_limits=None):
+    """
+    resume: 简历文本
+    jd_list: [{'index': int, 'title': str, 'text': str}, ...]  支持多个 JD
+    usage: 可选 dict，用于累加本次调用消耗的 token 数
+    """
+    try:
+        response = _completion(
+            api_key, base_url, "full", usage,
+            model=model,
+            messages=build_messages(resume, jd_list, model, model_limits),
+            response_format={"type": "json_object"},
+            temperature=TEMPERATURE
+        )
+        return _parse_json(response.choices[0].message.content)
+    except Exception as e:
+        _report_error(f"API 调用错误: {e}")
+        return None
+
+
+def _stream_json(api_key, base_url, model, messages, usage=None, call="full", cancel=None):
+    """
+    流式调用 + 增量解析，字段完整时 yield (key, value)，结束时 yield (None, 完整结果)；
+    输出被截断 / 不是合法 JSON 时结束时 yield (None, None)
+    记录 llm.ttft（首个内容 token）、llm.total 与增量解析累计耗时 json.parse
+    cancel（threading.Event）被设置时关闭连接并 yield (None, None)
+    """
+    parser = IncrementalJSONObjectParser()
+    started = time.perf_counter()
+    first_token = None
+    parse_seconds = 0.0
+    # llm.total 在 span 中记录：取消、连接中断、调用方提前关闭生成器时也有记录（带 error / cancelled 字段）
+    with perf_metrics.span("llm.total", call=call, model=model, stream=True) as attrs:
+        stream = chat_completion(
+            api_key, base_url,
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=TEMPERATURE,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if _cancelled(cancel):
+                stream.close()
+                attrs["cancelled"] = True
+                yield None, None
+                return
+            # 开启 include_usage 后，最后一个 chunk 只带 usage、choices 为空
+            _add_usage(usage, getattr(chunk, "usage", None))
+            attrs.update(perf_metrics.usage_attrs(getattr(chunk, "usage", None)))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if first_token is None and delta:
+                first_token = time.perf_counter()
+                perf_metrics.record("llm.ttft", first_token - started, call=call, model=model)
+            parse_started = time.perf_counter()
+            fields = parser.feed(delta)
+            parse_seconds += time.perf_counter() - parse_started
+            for key, value in fields:
+                yield key, value
+    parse_started = time.perf_counter()
+    result = parser.close()
+    parse_seconds += time.perf_counter() - parse_started
+    if result is None:
+        # 已产出的字段只作预览，截断的输出不能当作完整结果
+        _report_error(f"模型输出不完整（{call}）：响应被截断或不是合法 JSON，请重试。")
+    perf_metrics.record("json.parse", parse_seconds, chars=len(parser.text), stream=True)
+    yield None, result
+
+
+def analyze_with_llm_stream(api_key, base_url, model, resume, jd_list, usage=None, cancel=None, model_limits=None):
+    """
+    流式版本：边接收 token 边增量解析 JSON，
+    每个顶层字段完整时 yield (key, value)；结束时 yield (None, 完整结果)
+    出错或被取消时 yield (None, None)
+    """
+    try:
+        yield from _stream_json(api_key, base_url, model, build_messages(resume, jd_list, model, model_limits),
+                                usage, cancel=cancel)
+    except Exception as e:
+        _report_error(f"API 调用错误: {e}")
+        yield None, None
+
+
+# ---------- 分阶段引擎（map-reduce） ----------
+
+def build_jd_score_messages(resume, jd, model=None, model_limits=None):
+    with perf_metrics.span("prompt.build", call="jd_score", jds=1):
+        resume_fit, (jd_text,) = fit_inputs(
+            resume,
+            [jd.get("text", "")],
+            min(SCORE_CALL_INPUT_TOKENS, input_budget(model, JD_SCORE_PROMPT, model_limits))
+        )
+    return [
+        {"role": "system", "content": JD_SCORE_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"【简历文本】:\n{resume_fit}\n\n"
+                f"【候选 JD - {jd.get('title', '')}】：\n{jd_text}"
+            )
+        }
+    ]
+
+
+def build_deep_messages(resume, jd, model=None, model_limits=None):
+    return _build_target_messages(DEEP_ANALYSIS_PROMPT, "deep", resume, jd, model, model_limits)
+
+
+def build_section_messages(section, resume, jd, model=None, model_limits=None):
+    """单个深度分区的请求；按该分区路由到的模型分配 token 预算"""
+    return _build_target_messages(SECTION_PROMPTS[section], f"section.{section}", resume, jd, model, model_limits)
+
+
+def _build_target_messages(system_prompt, call, resume, jd, model, model_limits=None):
+    with perf_metrics.span("prompt.build", call=call, jds=1):
+        resume_fit, (jd_text,) = fit_inputs(
+            resume,
+            [jd.get("text", "")],
+            input_budget(model, system_prompt, model_limits)
+        )
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": (
+                f"【简历文本】:\n{resume_fit}\n\n"
+                f"【选中的目标 JD - {jd.get('title', '')}】：\n{jd_text}"
+            )
+        }
+    ]
+
+
+async def _score_one_jd(api_key, base_url, model, resume, jd, jd_index, semaphore, usage=None, cancel=None,
+                        model_limits=None):
+    title = jd.get("title", f"JD_{jd_index}")
+    async with semaphore:
+        try:
+            if _cancelled(cancel):
+                raise RuntimeError("已取消")
+            messages = build_jd_score_messages(resume, jd, model, model_limits)
+            with perf_metrics.span("llm.total", call="jd_score", model=model) as attrs:
+                response = await achat_completion(
+                    api_key, base_url,
+                    model=model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=JD_SCORE_TEMPERATURE
+                )
+                attrs.update(perf_metrics.usage_attrs(response.usage))
+            _add_usage(usage, response.usage)
+            scored = _parse_json(response.choices[0].message.content)
+            # 缺少或不是数字的 match_score 按评分失败处理，不能当成 0 分缓存下来
+            if scored.get("match_score") is None:
+                raise ValueError("返回中缺少 match_score")
+            score = int(scored["match_score"])
+        except Exception as e:
+            return {
+                "jd_index": jd_index,
+                "jd_title": title,
+                "match_score": None,
+                "recommendation_level": "评分失败",
+                "short_comment": f"该 JD 评分调用失败：{e}"
+            }
+
+    return {
+        "jd_index": jd_index,
+        "jd_title": title,
+        "match_score": max(0, min(100, score)),
+        "recommendation_level": scored.get("recommendation_level", ""),
+        "short_comment": scored.get("short_comment", "")
+    }
+
+
+async def score_jds_async(api_key, base_url, model, resume, jd_list, concurrency=8, usage=None, cancel=None,
+                          model_limits=None):
+    """第一阶段：并发对每个 JD 单独打分，返回 target_jd_overview（顺序与输入一致）"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    return list(await asyncio.gather(*[
+        _score_one_jd(api_key, base_url, model, resume, jd, idx, semaphore, usage, cancel, model_limits)
+        for idx, jd in enumerate(jd_list, start=1)
+    ]))
+
+
+def score_jds(api_key, base_url, model, resume, jd_list, concurrency=8, usage=None, cancel=None, model_limits=None):
+    return run_async(score_jds_async(api_key, base_url, model, resume, jd_list, concurrency, usage, cancel,
+                                     model_limits))
+
+
+def select_jd_index(jd_overview):
+    """选出匹配分最高的 JD（同分取序号靠前的）；全部评分失败时返回 None"""
+    scored = [item for item in jd_overview if isinstance(item.get("match_score"), int)]
+    if not scored:
+        return None
+    return max(scored, key=lambda item: (item["match_score"], -item["jd_index"]))["jd_index"]
+
+
+# ---------- 增量重算 ----------
+
+# 只依赖选中 JD 的字段：选中的 JD 不变时可直接沿用上一次结果
+DEEP_FIELDS = tuple(field for fields in DEEP_SECTIONS.values() for field in fields)
+# 完整结果必须包含的顶层字段：缺任何一个都视为失败，不写缓存 / 历史
+RESULT_FIELDS = ("target_jd_overview", "selected_jd_index") + DEEP_FIELDS
+
+
+def jd_hash(jd):
+    """JD 内容哈希（不含标题：粘贴的 JD 标题带序号，增删其他 JD 后会变）"""
+    return text_hash(jd.get("text", ""))
+
+
+def analysis_basis(base_url, model, resume, section_models=None, model_limits=None):
+    """结果可复用的前提：同一接口 / 模型（含分区路由与自定义上限）/ 提示词版本 / 简历"""
+    basis = {
+        "base_url": base_url or "",
+        "model": model or "",
+        "sections": resolve_section_models(model, section_models),
+        "prompt_version": PROMPT_VERSION,
+        "resume": text_hash(resume),
+    }
+    if model_limits:
+        basis["model_limits"] = {name: list(limits) for name, limits in sorted(model_limits.items())}
+    return basis
+
+
+def tag_source_index(jd_overview, jd_list):
+    """
+    jd_index 是 JD 在本次请求 jd_list 中的位置（预排序截取 top-k 后即排名），
+    按 jd_list 条目的 index 补上 source_index（用户上传时的原序号），供展示与历史记录使用；原地修改
+    """
+    for item in jd_overview or []:
+        idx = item.get("jd_index") if isinstance(item, dict) else None
+        if isinstance(idx, int) and 1 <= idx <= len(jd_list):
+            item["source_index"] = jd_list[idx - 1].get("index", idx)
+    return jd_overview
+
+
+def annotate_result(result, base_url, model, resume, jd_list, section_models=None, model_limits=None):
+    """给结果记上 analysis_basis、每个 JD 的 jd_hash（供下次增量重算比对）与原序号；原地修改并返回"""
+    if not result:
+        return result
+    result["analysis_basis"] = analysis_basis(base_url, model, resume, section_models, model_limits)
+    for item in result.get("target_jd_overview") or []:
+        idx = item.get("jd_index")
+        if isinstance(idx, int) and 1 <= idx <= len(jd_list):
+            item["jd_hash"] = jd_hash(jd_list[idx - 1])
+    tag_source_index(result.get("target_jd_overview"), jd_list)
+    return result
+
+
+def _reusable(previous, basis):
+    """
+    从上一次结果中取出可复用的部分：
+    返回 ({jd_hash: 概览条目}, 上次选中 JD 的 jd_hash)；前提不一致时返回 ({}, None)
+    """
+    if not previous or previous.get("analysis_basis") != basis:
+        return {}, None
+    scores = {}
+    selected_hash = None
+    for item in previous.get("target_jd_overview") or []:
+        if not item.get("jd_hash"):
+            continue
+        if isinstance(item.get("match_score"), int):
+            scores[item["jd_hash"]] = item
+        if item.get("jd_index") == previous.get("selected_jd_index"):
+            selected_hash = item["jd_hash"]
+    return scores, selected_hash
+
+
+# ---------- 深度分区并行生成 ----------
+
+def resolve_section_models(model, section_models):
+    """section_models 为 None 表示不拆分区；否则补全为 {分区: 模型}，未指定的分区使用主模型"""
+    if section_models is None:
+        return None
+    return {section: section_models.get(section) or model for section in DEEP_SECTIONS}
+
+
+def engine_tag(engine, section_models=None, model_limits=None):
+    """写入缓存 key / 历史记录的引擎标识：分区路由或自定义模型上限不同的结果不能互相复用"""
+    tag = engine
+    if section_models is not None:
+        tag += f"+sections:{json.dumps(section_models, sort_keys=True)}"
+    if model_limits:
+        tag += f"+limits:{json.dumps(model_limits, sort_keys=True)}"
+    return tag
+
+
+def missing_fields(result, fields):
+    """result 中缺失的字段（result 不是 dict 时视为全部缺失）"""
+    if not isinstance(result, dict):
+        return list(fields)
+    return [field for field in fields if field not in result]
+
+
+def _merge_usage(acc, part):
+    if acc is None:
+        return
+    for field, value in part.items():
+        acc[field] = acc.get(field, 0) + value
+
+
+def _generate_sections(api_key, base_url, resume, jd, section_models, stream=True, usage=None, cancel=None,
+                       model_limits=None):
+    """
+    各分区各开一个线程、一个请求并行生成；字段完整即 yield (key, value)（不同分区的字段交错到达）
+    全部完成时 yield (None, 合并后的深度字段)；任一分区失败或被取消时 yield (None, None)，其余分区随即停止
+    """
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def run_section(section, model):
+        fields = DEEP_SECTIONS[section]
+        section_usage = {}
+        try:
+            messages = build_section_messages(section, resume, jd, model, model_limits)
+            if stream:
+                section_result = None
+                for key, value in _stream_json(api_key, base_url, model, messages, section_usage,
+                                               call=f"section.{section}", cancel=stop):
+                    if key is None:
+                        section_result = value
+                    elif key in fields:
+                        events.put((section, key, value, None))
+            else:
+                response = _completion(
+                    api_key, base_url, f"section.{section}", section_usage,
+                    model=model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=TEMPERATURE
+                )
+                section_result = _parse_json(response.choices[0].message.content)
+            if section_result is not None:
+                missing = missing_fields(section_result, fields)
+                if missing:
+                    raise ValueError(f"输出缺少字段 {', '.join(missing)}")
+                section_result = {key: section_result[key] for key in fields}
+            events.put((section, None, section_result, section_usage))
+        except Exception as e:
+            events.put((section, None, e, section_usage))
+
+    deep = {}
+    pending = set(section_models)
+    with ThreadPoolExecutor(max_workers=len(section_models), thread_name_prefix="jobalign-section") as executor:
+        for section, model in section_models.items():
+            executor.submit(run_section, section, model)
+        try:
+            while pending:
+                if _cancelled(cancel):
+                    stop.set()
+                try:
+                    section, key, value, section_usage = events.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if key is not None:
+                    yield key, value
+                    continue
+                pending.discard(section)
+                _merge_usage(usage, section_usage)
+                if isinstance(value, Exception):
+                    _report_error(f"API 调用错误（{SECTION_LABELS[section]}）: {value}")
+                    deep = None
+                    break
+                if value is None:
+                    deep = None
+                    break
+                deep.update(value)
+        finally:
+            # 失败 / 取消 / 调用方提前结束迭代：通知其余分区尽快停止
+            stop.set()
+    yield None, deep
+
+
+def analyze_with_llm_map_reduce(api_key, base_url, model, resume, jd_list, concurrency=8, usage=None,
+                                section_models=None, model_limits=None):
+    """
+    分阶段分析：
+    1. 并发逐个 JD 打分 -> target_jd_overview / selected_jd_index
+    2. 只对选中的 JD 做深度生成（suggestions / draft_resume / learning_plan 等）；
+       传入 section_models 时按分区并行生成
+    返回结构与 analyze_with_llm 一致
+    """
+    result = None
+    for key, value in analyze_with_llm_map_reduce_stream(api_key, base_url, model, resume, jd_list,
+                                                         concurrency=concurrency, stream=False, usage=usage,
+                                                         section_models=section_models,
+                                                         model_limits=model_limits):
+        if key is None:
+            result = value
+    return result
+
+
+def analyze_with_llm_map_reduce_stream(api_key, base_url, model, resume, jd_list, concurrency=8, stream=True,
+                                       usage=None, cancel=None, previous=None, section_models=None,
+                                       model_limits=None):
+    """
+    分阶段分析的流式版本：概览字段在第一阶段结束后立即产出，
+    深度字段在第二阶段边生成边产出；结束时 yield (None, 合并后的完整结果)，出错或被取消时 yield (None, None)
+    previous: 上一次的结果（经 annotate_result 标注）。接口 / 模型 / 简历不变时增量重算：
+    只给新增或内容变化的 JD 打分，其余沿用上次评分；选中的 JD 与上次相同时深度字段也直接沿用
+    section_models: 不为 None 时深度字段按分区并行生成，{分区: 模型}，未指定的分区用 model
+    model_limits: 本次调用自定义的模型上限，见 token_budget.model_limit_overrides
+    """
+    basis = analysis_basis(base_url, model, resume, section_models, model_limits)
+    hashes = [jd_hash(jd) for jd in jd_list]
+    reused, previous_selected = _reusable(previous, basis)
+    pending = [idx for idx, h in enumerate(hashes, start=1) if h not in reused]
+
+    try:
+        scored = score_jds(api_key, base_url, model, resume, [jd_list[idx - 1] for idx in pending],
+                           concurrency, usage, cancel, model_limits) if pending else []
+    except Exception as e:
+        _report_error(f"API 调用错误: {e}")
+        yield None, None
+        return
+
+    if _cancelled(cancel):
+        yield None, None
+        return
+
+    # 按当前 JD 顺序合并：序号 / 标题以本次输入为准
+    scored = dict(zip(pending, scored))
+    jd_overview = []
+    for idx, (jd, h) in enumerate(zip(jd_list, hashes), start=1):
+        item = dict(reused[h]) if h in reused else scored[idx]
+        item.update(jd_index=idx, jd_title=jd.get("title", f"JD_{idx}"), jd_hash=h)
+        jd_overview.append(item)
+    tag_source_index(jd_overview, jd_list)
+
+    selected_jd_index = select_jd_index(jd_overview)
+    if selected_jd_index is None:
+        _report_error("API 调用错误: 所有 JD 评分均失败，请检查配置后重试。")
+        yield None, None
+        return
+
+    yield "target_jd_overview", jd_overview
+    yield "selected_jd_index", selected_jd_index
+
+    if (previous_selected is not None and hashes[selected_jd_index - 1] == previous_selected
+            and not missing_fields(previous, DEEP_FIELDS)):
+        deep = {key: previous[key] for key in DEEP_FIELDS}
+        for key, value in deep.items():
+            yield key, value
+    elif section_models is not None:
+        deep = None
+        for key, value in _generate_sections(api_key, base_url, resume, jd_list[selected_jd_index - 1],
+                                             basis["sections"], stream, usage, cancel, model_limits):
+            if key is None:
+                deep = value
+            else:
+                yield key, value
+        if deep is None:
+            yield None, None
+            return
+    else:
+        messages = build_deep_messages(resume, jd_list[selected_jd_index - 1], model, model_limits)
+        try:
+            if stream:
+                deep = None
+                for key, value in _stream_json(api_key, base_url, model, messages, usage, call="deep",
+                                               cancel=cancel):
+                    if key is None:
+                        deep = value
+                    else:
+                        yield key, value
+            else:
+                response = _completion(
+                    api_key, base_url, "deep", usage,
+                    model=model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=TEMPERATURE
+                )
+                deep = _parse_json(response.choices[0].message.content)
+        except Exception as e:
+            _report_error(f"API 调用错误: {e}")
+            yield None, None
+            return
+
+    if _cancelled(cancel):
+        yield None, None
+        return
+
+    # 深度结果为空或缺字段（如输出被截断）时按失败处理，不拼出「只有概览」的结果
+    missing = missing_fields(deep, DEEP_FIELDS)
+    if missing:
+        if deep is not None:
+            _report_error(f"模型输出不完整：深度分析缺少字段 {', '.join(missing)}，请重试。")
+        yield None, None
+        return
+
+    result = dict(deep)
+    result["target_jd_overview"] = jd_overview
+    result["selected_jd_index"] = selected_jd_index
+    result["analysis_basis"] = basis
+    yield None, result
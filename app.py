@@ -1,16 +1,31 @@
-import streamlit as st
-import pandas as pd
-import json
-import plotly.express as px
-from PyPDF2 import PdfReader
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-import io
 import time
-from openai import OpenAI
-from PIL import Image
-import pytesseract
+
+# 冷启动计时：必须在其他导入之前
+_SCRIPT_START = time.perf_counter()
+
+import hashlib
+import json
+import os
+import re
+
+import streamlit as st
+
+import perf_metrics
+from startup_timing import lazy_import, record_import, record_script_run, report as startup_report
+
+from analyzer import DEEP_SECTIONS, MOCK_DATA, SECTION_LABELS
+from document_handler import MAX_FILE_BYTES, MAX_SESSION_UPLOAD_BYTES, DocumentHandler
+from extract_cache import get_extraction_cache
+from history_store import get_history_store, owner_id
+from render_cache import get_render_cache
+from jobs import DONE, STATUS_LABELS, get_job_manager, run_analysis
+from result_cache import get_result_cache, text_hash
+from session_store import SessionBlobStore, get_session_store
+from single_flight import get_single_flight
+from token_budget import get_model_limits, model_limit_overrides
+from word_generator import WordGenerator
+
+record_import("app.py 顶层导入", time.perf_counter() - _SCRIPT_START)
 
 # ================= 1. 全局配置与状态管理 =================
 st.set_page_config(
@@ -20,434 +35,61 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 各阶段耗时面板汇总的是整个进程（所有会话）的记录，含其他用户的模型与 token 用量，只在运维排查时开启
+SHOW_PERF_PANEL = os.environ.get("JOBALIGN_SHOW_PERF_PANEL", "0") == "1"
+
+# 局部重跑：新版 Streamlit 为 st.fragment，旧版为 experimental_fragment，更旧的版本没有（整页重跑）
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
 # 初始化 Session State
 if 'analyzed' not in st.session_state:
     st.session_state.analyzed = False
-if 'result_json' not in st.session_state:
-    st.session_state.result_json = None
+# 分析结果与生成的 docx 存在磁盘存储中，会话里只保存句柄和一份简短摘要
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = SessionBlobStore.new_session_id()
+if 'result_handle' not in st.session_state:
+    st.session_state.result_handle = None
+    st.session_state.result_summary = None
+if 'draft_docx' not in st.session_state:
+    st.session_state.draft_docx = None
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ""
-
-
-# ================= 2. 核心处理工具类 =================
-
-class DocumentHandler:
-    @staticmethod
-    def extract_text(file):
-        """
-        统一处理 PDF / Word / 文本 / 图片 的文本提取
-        支持：
-        - .pdf
-        - .doc / .docx
-        - .txt
-        - 图片：.png / .jpg / .jpeg / .bmp / .tiff / .gif（通过 OCR 识别）
-        """
-        text = ""
-        try:
-            filename = getattr(file, "name", "")
-            ext = filename.split(".")[-1].lower() if "." in filename else ""
-
-            # 确保指针在文件开头
-            try:
-                file.seek(0)
-            except Exception:
-                pass
-
-            if ext == 'pdf':
-                reader = PdfReader(file)
-                for page in reader.pages:
-                    content = page.extract_text()
-                    if content:
-                        text += content + "\n"
-
-            elif ext in ['docx', 'doc']:
-                doc = Document(file)
-                text = "\n".join([para.text for para in doc.paragraphs])
-
-            elif ext == 'txt':
-                text = file.getvalue().decode("utf-8")
-
-            elif ext in ['png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif']:
-                # 图片 OCR 识别
-                file_bytes = file.read()
-                image = Image.open(io.BytesIO(file_bytes))
-                # 如本机有中文语言包，可使用 lang='chi_sim+eng'
-                text = pytesseract.image_to_string(image)
-
-            else:
-                # 兜底：尝试文本方式读取
-                try:
-                    text = file.getvalue().decode("utf-8")
-                except Exception:
-                    text = ""
-
-            return text
-        except Exception as e:
-            return f"Error: 文件解析失败 ({str(e)})"
-
-
-class WordGenerator:
-    @staticmethod
-    def create_docx_from_markdown(markdown_text):
-        """将 Markdown 格式的简历草稿转换为格式化的 Word 文档"""
-        doc = Document()
-
-        # 设置基础样式
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = '微软雅黑'
-        font.size = Pt(11)
-
-        lines = markdown_text.split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # 处理一级标题 (# Title)
-            if line.startswith('# '):
-                p = doc.add_heading(line[2:], level=1)
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-            # 处理二级标题 (## Title)
-            elif line.startswith('## '):
-                p = doc.add_heading(line[3:], level=2)
-
-            # 处理三级标题 (### Title)
-            elif line.startswith('### '):
-                p = doc.add_heading(line[4:], level=3)
-
-            # 处理列表项 (- Item / * Item)
-            elif line.startswith('- ') or line.startswith('* '):
-                p = doc.add_paragraph(line[2:], style='List Bullet')
-
-            # 处理加粗 (**Text**) - 简单处理，仅去除标记
-            elif '**' in line:
-                clean_line = line.replace('**', '')
-                doc.add_paragraph(clean_line)
-
-            # 普通文本
-            else:
-                doc.add_paragraph(line)
-
-        # 保存到内存流
-        buffer = io.BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        return buffer
-
-
-# ================= 3. AI 交互逻辑 =================
-
-MOCK_DATA = {
-    "total_score": 78,
-    "dimensions": {
-        "技能匹配度": 82,
-        "经验相关性": 75,
-        "行业契合度": 70,
-        "表达与亮点": 88
-    },
-    "highlights": [
-        "演示模式：已有 AI/大模型相关项目，和 AI 产品/智能分析岗位高度相关。",
-        "演示模式：具备一定 Python / 数据分析基础，方便后续向数据产品或智能分析方向延展。"
-    ],
-    "gaps": [
-        "演示模式：简历中缺少系统性的指标设计与业务结果量化描述。",
-        "演示模式：缺少对协作方式、跨部门沟通的具体案例说明。"
-    ],
-    "suggestions": [
-        {
-            "section": "项目经历",
-            "original": "参与风向监控 Agent 项目。",
-            "problem": "描述过于笼统，看不出业务背景、你的职责和结果。",
-            "rewrite": "主导风向监控 Agent 需求分析与PRD撰写，覆盖战略/行业/产品等6个维度的信息源，将竞品情报整理耗时从1天缩短至2小时，为老板周例会提供结构化对手情报输入。"
-        },
-        {
-            "section": "技能",
-            "original": "熟练使用 Office。",
-            "problem": "表述过泛，与目标岗位的关键能力缺乏关联。",
-            "rewrite": "熟练使用 Excel / Pandas 进行数据清洗与漏斗分析，具备基础 SQL 查询能力，可独立完成简历数据与业务日志数据的结构化处理。"
-        }
-    ],
-    "draft_resume": """# 演示简历
-## 个人简介
-我正在向 AI 产品 / 数据分析方向发展，具备基础产品方法论和数据分析能力，已经通过多项项目实践熟悉「需求分析 → 方案设计 → 项目落地 → 结果复盘」的完整闭环。
-
-## 教育经历
-- **某某大学 本科 · 专业：XXX**（201X - 202X）
-  - 相关课程：数据分析、统计学基础、数据库原理、计算机基础
-
-## 实习 / 项目经历
-- **风向监控 Agent 项目｜AI 产品实习 / 个人项目**
-  - 背景：公司缺乏系统的竞品与行业信息收集机制，情报依赖人工搜索与零散记录。
-  - 职责：主导风向监控 Agent 的需求分析、PRD撰写与核心流程设计。
-  - 方案：
-    - 设计战略 / 行业 / 财务 / 产品 / 招投标 / 口碑 6个维度的监控框架；
-    - 定义多 Agent 协同检索与聚合规则，搭建舆情与情报数据的初步结构化方案。
-  - 结果：
-    - 将竞品情报整理耗时从1天缩短至2小时；
-    - 支持老板在周例会中更系统地评估竞对策略与行业动向。
-  - 工具：Coze / 腾讯元宝、多Agent编排、Notion、Excel
-
-- **JobAlign AI 简历匹配与成长规划工具｜个人项目**
-  - 背景：求职者很难理解 JD 需求、评估自身匹配度并规划下一步学习。
-  - 职责：从0到1设计并实现简历上传解析、JD对比、匹配报告、学习规划与岗位推荐的完整流程。
-  - 方案：
-    - 使用 Streamlit 构建前端界面，支持 PDF / Word / 图片简历与多个 JD 同时上传；
-    - 利用大模型生成匹配度评分、亮点 / 缺失分析、简历改写建议与3-6个月成长路径。
-  - 结果：
-    - 帮助用户快速识别与自身背景更契合的岗位方向；
-    - 提供结构化的学习与项目实践建议，为后续求职打基础。
-  - 工具：Python、Streamlit、OpenAI / DeepSeek API、PyPDF2、pytesseract
-
-## 技能
-- 产品：需求分析、PRD撰写、用户场景拆解、UAT测试
-- 数据：Python（Pandas）、SQL基础、简单可视化与漏斗分析
-- 工具：Figma / 墨刀、Notion、Excel、Streamlit
-- AI：对大模型、RAG、多 Agent 有一定理解，能基于平台搭建简单智能体流程
-
-## 其他
-- 持续在 CSDN / 个人公众号输出数据与 AI 产品相关内容，保持自我迭代。
-""",
-    "learning_plan": {
-        "target_direction": "AI 产品 / 数据产品 方向",
-        "summary": "综合你的简历与目标 JD，更推荐你在未来3-6个月重点强化：产品方法论、数据分析思维与项目复盘能力，用少量但高质量的项目支撑简历，而不是盲目堆数量。",
-        "skills_to_focus": [
-            "系统化的PRD写作与需求拆解",
-            "SQL + 基础数据分析思维",
-            "业务指标设计与结果量化表达",
-            "项目复盘与结构化表达"
-        ],
-        "stages": [
-            {
-                "name": "第1-4周：打基础（理解岗位 & 强化表达）",
-                "goals": [
-                    "搞清楚AI产品 / 数据产品岗位的日常与核心能力",
-                    "能写出结构清晰且有重点的PRD / 项目说明"
-                ],
-                "actions": [
-                    "每周阅读2-3篇 AI / 数据产品案例拆解，将核心结构和亮点记录下来。",
-                    "选1-2个你常用的产品，尝试从“问题-目标-方案-指标”的角度各写1页分析。"
-                ]
-            },
-            {
-                "name": "第5-8周：打造 1-2 个可写进简历的项目",
-                "goals": [
-                    "产出至少1个完整项目，可在简历中用1/3页重点描述",
-                    "项目说明中能体现“做了什么”和“带来了什么变化”"
-                ],
-                "actions": [
-                    "基于 JobAlign 等现有项目，补上需求背景、目标用户、关键指标与复盘思考。",
-                    "结合公开数据或模拟数据，做一份简单的数据分析或看板，并写成小报告。"
-                ]
-            },
-            {
-                "name": "第9-12周：校准简历 & 预热面试",
-                "goals": [
-                    "让简历与目标 JD 的关键词高度对齐，同时保持真实",
-                    "提前熟悉常见面试问法和项目深挖角度"
-                ],
-                "actions": [
-                    "针对 3-5 条目标 JD，使用本工具多次优化简历表述，形成 1-2 份主力版本。",
-                    "在牛客等平台刷同岗位面经，整理高频问题，并用自己的项目练习回答。"
-                ]
-            }
-        ]
-    },
-    "resources": [
-        {
-            "platform": "B站",
-            "category": "学习视频",
-            "search_keyword": "产品经理 PRD 入门 案例 拆解",
-            "reason": "帮助你系统理解 PRD 的结构和写法，提升简历中产品项目的专业度。"
-        },
-        {
-            "platform": "B站",
-            "category": "学习视频",
-            "search_keyword": "Python SQL 数据分析 零基础 实战 项目",
-            "reason": "你对数据分析有兴趣，但缺少成体系项目，可以通过实战教学补齐。"
-        },
-        {
-            "platform": "牛客",
-            "category": "面试经验",
-            "search_keyword": "AI 产品 实习 面经 2024",
-            "reason": "目标 JD 是 AI / 大模型相关产品方向，提前熟悉常见面试问题和考察维度。"
-        },
-        {
-            "platform": "CSDN",
-            "category": "技术文章",
-            "search_keyword": "Streamlit 简历分析 项目 实战",
-            "reason": "你已经在做 Streamlit 简历分析工具，可以参考他人实践，丰富项目亮点。"
-        }
-    ],
-    "job_recommendations": [
-        {
-            "title": "AI 产品实习生",
-            "company_type": "头部/新锐互联网公司（示例）",
-            "location": "一线 / 新一线城市",
-            "similarity_to_target_jd": 90,
-            "match_reason": "岗位同样聚焦大模型 / 智能体方向，要求你具备产品思维与基础技术理解，与现有项目非常契合。",
-            "core_requirements": [
-                "参与 AI 产品需求分析、方案设计与文档撰写",
-                "对主流大模型 / Agent 应用有基本了解，有实践经验更佳",
-                "良好的沟通协作能力，能在技术与业务之间做有效对接"
-            ]
-        },
-        {
-            "title": "数据产品实习生",
-            "company_type": "数据智能 / 企业服务公司（示例）",
-            "location": "北上广深 / 杭州 / 成都",
-            "similarity_to_target_jd": 85,
-            "match_reason": "在保持产品岗位属性的前提下，更强调数据分析与指标设计，与你的 Python / SQL 和项目经历匹配度较高。",
-            "core_requirements": [
-                "参与数据产品需求梳理与指标体系设计",
-                "配合中台 /业务方搭建分析报表与看板",
-                "具备基础 SQL / Python 数据处理能力"
-            ]
-        }
-    ],
-    "target_jd_overview": [
-        {
-            "jd_index": 1,
-            "jd_title": "JD_1：AI 产品实习生（示例）",
-            "match_score": 88,
-            "recommendation_level": "强烈推荐",
-            "short_comment": "岗位方向与简历中的 AI 产品 / 智能体项目高度一致，是当前背景下优先级最高的选择之一。"
-        },
-        {
-            "jd_index": 2,
-            "jd_title": "JD_2：数据分析实习生（示例）",
-            "match_score": 80,
-            "recommendation_level": "可重点考虑",
-            "short_comment": "强调数据分析能力和 SQL / Python，对你现在的技术基础比较友好，但产品成分略弱。"
-        }
-    ],
-    "selected_jd_index": 1
-}
-
-
-def analyze_with_llm(api_key, base_url, model, resume, jd_list):
-    """
-    resume: 简历文本
-    jd_list: [{'index': int, 'title': str, 'text': str}, ...]  支持多个 JD
-    """
-    client = OpenAI(api_key=api_key, base_url=base_url)
-
-    # 组合多 JD 内容
-    jd_blocks = []
-    for idx, jd in enumerate(jd_list, start=1):
-        title = jd.get("title", f"JD_{idx}")
-        text = jd.get("text", "")
-        jd_blocks.append(
-            f"<<<JD_{idx} - {title}>>>\n{text[:2500]}"
-        )
-    jd_combined = "\n\n".join(jd_blocks)
-
-    system_prompt = """
-你是一名非常专业的「简历评估 + 职业发展教练」，熟悉校招 / 实习 / 社招 ATS 筛选逻辑，
-理解 AI 产品 / 数据分析 / 互联网业务岗位的真实工作内容和用人标准。
-
-你的目标：
-- 帮求职者看清「当前简历」与「多个候选 JD」的匹配情况；
-- 帮他选出更值得重点冲刺的岗位方向（不替他决定人生，只做专业建议）；
-- 在此基础上，给出简历优化建议、未来3–6个月的成长规划、学习资源推荐，以及同方向的其他公司岗位参考。
-
-请根据【简历】和【候选 JD 列表】进行分析，并返回严格的 JSON，字段必须包含：
-
-1. total_score        (0-100整数)
-   - 对「最终选中的 JD」的总体匹配度评分。
-
-2. dimensions         (对象，键包括：
-                        - 技能匹配度
-                        - 经验相关性
-                        - 行业契合度
-                        - 表达与亮点
-                       值为0-100整数)
-
-3. highlights         (数组，3-5条高匹配点，每条为字符串，语言专业、具体，避免空洞鸡汤)
-
-4. gaps               (数组，3-5条缺失或风险点，每条为字符串，尽量关联到面试 / ATS 筛选风险)
-
-5. suggestions        (数组，元素为对象，字段：
-                       - section: 所属模块，如“项目经历”“实习经历”“技能”
-                       - original: 简历原文句子
-                       - problem: 存在的问题（例如：缺少量化结果、与JD关键词不对齐）
-                       - rewrite: 建议的改写示例（注意保持真实，不虚构经历）)
-
-6. draft_resume       (字符串，针对“最终选中的 JD”生成的完整简历 Markdown 文本，
-                       使用 # / ## 标题和 - 列表，突出与该 JD 相关的经历与成果，不要包含 JSON 转义字符)
-
-【多 JD 匹配与选择】
-
-7. target_jd_overview (数组，用于汇总每个候选 JD 的匹配情况。每个元素为对象：
-                       - jd_index: 整数，和输入中的 JD 序号一致（从 1 开始）
-                       - jd_title: 复制输入中 JD 标题（如：文件名或你看到的标题），不要自己造
-                       - match_score: 0-100 整数，该 JD 与当前简历的匹配度
-                       - recommendation_level: 字符串，如“强烈推荐”“可重点考虑”“可尝试”“不推荐”
-                       - short_comment: 1-2 句专业点评，说明匹配好/不好的关键原因)
-
-8. selected_jd_index  (整数，从 1 开始，表示你认为最适合做本轮深度优化的 JD 序号。
-                       total_score / dimensions / draft_resume 等都应基于这个 JD。)
-
-【学习与资源推荐】
-
-9. learning_plan      (对象，字段：
-                       - target_direction: 综合简历与 JD 后推荐的主要发展方向（如：AI产品、数据产品、数据分析等）
-                       - summary: 用2-3句话概述未来3-6个月更理性、更有效的准备思路
-                       - skills_to_focus: 数组，列出3-6个优先需要补齐或加强的能力/技能
-                       - stages: 数组，每个阶段是一个对象，字段：
-                           * name: 阶段名称，如“第1-4周：打基础”
-                           * goals: 数组，该阶段的目标（站在求职者视角，而不是算法视角）
-                           * actions: 数组，该阶段可以执行的具体行动建议（可操作，不要泛泛而谈）)
-
-10. resources         (数组，每个元素是一个学习 / 面试资源建议对象，字段：
-                       - platform: 平台名称，如“B站”“YouTube”“牛客”“CSDN”“其他”
-                       - category: 资源类型，如“学习视频”“面试经验”“技术文章”“刷题/实战”
-                       - search_keyword: 建议用户在该平台使用的搜索关键词（可以直接复制粘贴去搜）
-                       - reason: 推荐理由，说明该资源如何帮助用户弥补当前简历中的短板或准备面试)
-
-【相似岗位推荐（同方向）】
-
-11. job_recommendations (数组，每个元素是一个岗位推荐对象，字段：
-                       - title: 岗位名称，例如“AI 产品实习生”“数据产品实习生”
-                       - company_type: 公司类型或示例描述，如“一线互联网公司（示例）”“数据智能公司（示例）”
-                       - location: 城市或地区（可以是模糊描述，如“一线/新一线城市”）
-                       - similarity_to_target_jd: 0-100整数，表示与「最终选中 JD」的相似程度
-                       - match_reason: 推荐理由，说明为什么该岗位方向适合当前用户（结合简历与JD）
-                       - core_requirements: 数组，列出3-6条该岗位核心要求示例（用自然语言）
-
-强约束要求：
-- 所有 job_recommendations 必须与「候选 JD 的岗位类型」同一职业族，例如：
-  - 输入 JD 是 AI 产品 / 数据产品 / 互联网产品岗，只能推荐同类或高度相关产品/数据岗；
-  - 不要跨到「财务、人力、纯后端开发」等完全不相关方向。
-- 不要杜撰具体公司名和具体招聘链接，可以使用“某头部互联网公司（示例）”这类泛化描述。
-- 所有内容必须基于【简历】和【候选 JD】的方向、技能差距来生成，避免和用户完全无关的建议。
-- 不要编造简历中根本不存在的学校 / 公司 / 证书，可以合理推测适合的学习方向和资源关键词。
-- 语气专业、友好，尽量站在求职者视角，避免空泛鸡汤，多给可执行建议。
-- 输出必须是严格合法的 JSON，对象最外层必须包含上述所有字段。
-    """
-
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": (
-                        f"【简历文本】:\n{resume[:4000]}\n\n"
-                        f"【候选岗位JD列表】（最多截取前2500字符/条）：\n\n{jd_combined}"
-                    )
-                }
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        st.error(f"API 调用错误: {e}")
+# 本会话提交过的后台任务；watch_job_id 为最近提交、尚未自动展示的任务（结束后清空，只自动展示一次）
+if 'job_ids' not in st.session_state:
+    st.session_state.job_ids = []
+if 'watch_job_id' not in st.session_state:
+    st.session_state.watch_job_id = None
+
+get_session_store().touch(st.session_state.session_id)
+
+
+def set_current_result(result):
+    """保存本会话当前展示的结果（替换并删除上一份）"""
+    store = get_session_store()
+    if st.session_state.result_handle:
+        store.drop(st.session_state.result_handle)
+    st.session_state.result_handle = store.put_json(st.session_state.session_id, result)
+    result_hash = hashlib.sha256(json.dumps(result, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    selected = next(
+        (item for item in result.get("target_jd_overview") or []
+         if item.get("jd_index") == result.get("selected_jd_index")),
+        {}
+    )
+    st.session_state.result_summary = {
+        "total_score": result.get("total_score"),
+        "jd_count": len(result.get("target_jd_overview") or []),
+        "selected_jd_title": selected.get("jd_title"),
+        "selected_jd_hash": selected.get("jd_hash"),
+        "result_hash": result_hash,
+    }
+    st.session_state.analyzed = True
+
+
+def load_current_result():
+    """读取当前结果；会话空闲过久被清理后返回 None"""
+    if not st.session_state.analyzed or not st.session_state.result_handle:
         return None
+    return get_session_store().get_json(st.session_state.result_handle)
 
 
 # ================= 4. UI 界面构建 =================
@@ -457,6 +99,7 @@ with st.sidebar:
     st.title("⚙️ 系统配置")
 
     config_mode = st.radio("运行模式", ["DeepSeek (推荐)", "OpenAI / 其他", "演示模式 (Demo)"])
+    model_limits = None
 
     if config_mode == "DeepSeek (推荐)":
         st.info("💡 高性价比，逻辑能力强")
@@ -467,11 +110,51 @@ with st.sidebar:
         api_key = st.text_input("API Key", type="password")
         base_url = st.text_input("Base URL", value="https://api.openai.com/v1")
         model_name = st.text_input("Model Name", value="gpt-4o")
+        default_context, default_output = get_model_limits(model_name)
+        with st.expander("模型上下文 / 输出上限（用于 token 预算分配）"):
+            context_tokens = st.number_input("上下文窗口 (tokens)", min_value=4000, value=default_context, step=1000)
+            output_tokens = st.number_input("输出预留 (tokens)", min_value=1000, value=default_output, step=1000)
+        # 只作用于本会话的请求；与内置上限相同时不传，避免无谓地拆分缓存 key
+        if (context_tokens, output_tokens) != (default_context, default_output):
+            model_limits = model_limit_overrides(model_name, context_tokens, output_tokens)
     else:
         api_key = "demo"
         base_url = ""
         model_name = "demo"
 
+    stream_output = st.checkbox("流式输出（边生成边展示）", value=True)
+
+    analysis_engine = st.radio(
+        "分析引擎",
+        ["分阶段（多 JD 并发评分 + 深度分析）", "单次调用（全部 JD 一个请求）"],
+        help="分阶段：先并发给每个 JD 单独打分并选出最匹配的岗位，再只针对该岗位做一次深度生成；JD 越多越省时、省 token"
+    )
+    map_reduce = analysis_engine.startswith("分阶段")
+
+    section_models = None
+    if map_reduce:
+        parallel_sections = st.checkbox(
+            "深度分析按分区并行生成", value=False,
+            help="选中岗位后，报告 / 改写建议 / 定制简历 / 学习规划 / 岗位推荐各发一个请求同时生成，"
+                 "总耗时取决于最慢的分区；每个分区可单独指定模型"
+        )
+        if parallel_sections:
+            with st.expander("分区模型路由（留空使用主模型）"):
+                section_models = {
+                    section: st.text_input(SECTION_LABELS[section], value="", placeholder=model_name,
+                                           key=f"section_model_{section}").strip()
+                    for section in DEEP_SECTIONS
+                }
+
+    prerank_top_k = st.number_input(
+        "本地预排序：送入 AI 的 JD 数（top-k）",
+        min_value=1, max_value=20, value=5, step=1,
+        help="JD 较多时先在本地按与简历的相似度排序，只把最相关的 k 个交给大模型"
+    )
+    prerank_top_k = int(prerank_top_k)
+
+    force_refresh = st.checkbox("强制刷新（忽略已缓存的分析结果）", value=False)
+
     st.markdown("---")
     st.markdown("### 使用指南")
     st.markdown("1. 上传简历 (PDF/Word/图片)")
@@ -479,39 +162,83 @@ with st.sidebar:
     st.markdown("3. 点击分析")
     st.markdown("4. 查看匹配报告 + 学习建议 + 岗位推荐并下载简历")
 
+    with st.expander("📦 解析缓存统计"):
+        cache_stats = get_extraction_cache().stats()
+        st.caption(
+            f"命中 {cache_stats['hits']} 次（磁盘 {cache_stats['disk_hits']}） · "
+            f"未命中 {cache_stats['misses']} 次 · 命中率 {cache_stats['hit_rate']:.0%}"
+        )
+        st.caption(
+            f"内存条目 {cache_stats['memory_entries']}（{cache_stats['memory_bytes'] / 1024:.1f} KB） · "
+            f"磁盘占用 {cache_stats['disk_bytes'] / 1024:.1f} KB"
+        )
+
+    with st.expander("⏱️ 启动与加载耗时"):
+        # 内容在脚本末尾填充，才能统计到本次完整执行时间
+        startup_timing_panel = st.empty()
+
+    perf_panel = None
+    if SHOW_PERF_PANEL:
+        with st.expander("📈 各阶段耗时与 token"):
+            # 同样在脚本末尾填充，包含本次的结果渲染耗时
+            perf_panel = st.empty()
+
+    with st.expander("🧠 分析结果缓存统计"):
+        result_stats = get_result_cache().stats()
+        st.caption(
+            f"命中 {result_stats['hits']} 次 · 未命中 {result_stats['misses']} 次 · "
+            f"命中率 {result_stats['hit_rate']:.0%}"
+        )
+        st.caption(f"累计节省 token 约 {result_stats['tokens_saved']:,}")
+        flight_stats = get_single_flight().stats()
+        st.caption(
+            f"在途合并：发起 {flight_stats['started']} 次 · 合并 {flight_stats['coalesced']} 次 · "
+            f"进行中 {flight_stats['in_flight']}"
+        )
+
+    with st.expander("💾 会话存储"):
+        store_stats = get_session_store().stats()
+        st.caption(
+            f"活跃会话 {store_stats['sessions']} · 内存层 {store_stats['memory_entries']} 项 / "
+            f"{store_stats['memory_bytes'] / 1024:.1f} KB"
+        )
+        st.caption(f"已清理空闲会话 {store_stats['evicted_sessions']} 个 · 超限淘汰对象 {store_stats['evicted_blobs']} 个")
+
 # --- Main Area ---
 st.title("💼 JobAlign AI Pro | 职配助手")
 st.caption("多岗位匹配 + 简历优化 + 学习规划 + 岗位推荐，一次走完。")
 
 col1, col2 = st.columns(2)
+UPLOAD_LIMIT_HELP = (
+    f"单个文件不超过 {MAX_FILE_BYTES // (1024 * 1024)} MB，"
+    f"简历与 JD 文件合计不超过 {MAX_SESSION_UPLOAD_BYTES // (1024 * 1024)} MB"
+)
 
 # ========= 4.1 简历输入 =========
 with col1:
     st.subheader("1. 个人简历")
     resume_file = st.file_uploader(
         "上传简历（支持 PDF / Word / 文本 / 图片）",
-        type=['pdf', 'docx', 'doc', 'txt', 'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif']
+        type=['pdf', 'docx', 'doc', 'txt', 'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif'],
+        help=UPLOAD_LIMIT_HELP
     )
     resume_text = ""
-    if resume_file:
-        resume_text = DocumentHandler.extract_text(resume_file)
-        if resume_text.startswith("Error: 文件解析失败"):
-            st.error(resume_text)
-        else:
-            st.success(f"✅ 已提取约 {len(resume_text)} 字")
-            with st.expander("查看简历解析内容"):
-                st.text(resume_text[:800] + "..." if len(resume_text) > 800 else resume_text)
-    else:
+    if not resume_file:
         resume_text = st.text_area("或直接粘贴简历内容", height=200)
 
 # ========= 4.2 多 JD 输入 =========
 with col2:
     st.subheader("2. 目标岗位 (JD) — 可一次输入多个")
-    jd_input_method = st.radio("输入方式", ["文本粘贴（可多个）", "文件上传（可多个）"], horizontal=True)
+    jd_input_method = st.radio(
+        "输入方式",
+        ["文本粘贴（可多个）", "批量粘贴（--- 分隔）", "文件上传（可多个）"],
+        horizontal=True
+    )
     jd_entries = []
+    jd_files = []
 
     if jd_input_method == "文本粘贴（可多个）":
-        num_jd = st.number_input("计划粘贴的 JD 数量", min_value=1, max_value=10, value=1, step=1)
+        num_jd = st.number_input("计划粘贴的 JD 数量", min_value=1, max_value=30, value=1, step=1)
         num_jd = int(num_jd)
         for i in range(num_jd):
             jd_text_i = st.text_area(
@@ -525,31 +252,96 @@ with col2:
                     "title": f"文本JD_{i + 1}",
                     "text": jd_text_i
                 })
+    elif jd_input_method == "批量粘贴（--- 分隔）":
+        bulk_text = st.text_area(
+            "一次粘贴任意多个 JD，JD 之间用单独一行 --- 分隔",
+            height=320,
+            key="jd_bulk_text"
+        )
+        blocks = [b.strip() for b in re.split(r"^\s*-{3,}\s*$", bulk_text, flags=re.MULTILINE)]
+        for i, block in enumerate([b for b in blocks if b], start=1):
+            jd_entries.append({
+                "index": i,
+                "title": f"批量JD_{i}：{block.splitlines()[0][:30]}",
+                "text": block
+            })
+        if jd_entries:
+            st.success(f"✅ 已识别 {len(jd_entries)} 个 JD")
     else:
         jd_files = st.file_uploader(
             "上传 JD 文件（可多选，支持 PDF / Word / 文本 / 图片）",
             type=['pdf', 'docx', 'doc', 'txt', 'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif'],
-            accept_multiple_files=True
+            accept_multiple_files=True,
+            help=UPLOAD_LIMIT_HELP
+        ) or []
+
+# ========= 4.3 并行解析（简历 + 全部 JD 文件一起提交到进程池） =========
+files_to_extract = ([resume_file] if resume_file else []) + list(jd_files)
+extracted_texts = []
+if files_to_extract:
+    with st.spinner(f"正在解析 {len(files_to_extract)} 个文件..."):
+        # 简历与 JD 文件合计计入会话上限，超出部分的文件报错而不解析
+        extracted_texts = DocumentHandler.extract_many(
+            files_to_extract, max_total_bytes=MAX_SESSION_UPLOAD_BYTES
         )
-        if jd_files:
-            for idx, jf in enumerate(jd_files, start=1):
-                text = DocumentHandler.extract_text(jf)
-                if text.startswith("Error: 文件解析失败"):
-                    st.error(f"❌ JD 文件解析失败：{jf.name}，请检查后重试。")
-                    continue
-                jd_entries.append({
-                    "index": idx,
-                    "title": jf.name,
-                    "text": text
-                })
-            if jd_entries:
-                st.success(f"✅ 已成功导入 {len(jd_entries)} 个 JD")
-                with st.expander("查看部分 JD 内容预览"):
-                    for entry in jd_entries:
-                        st.markdown(f"**[{entry['index']}] {entry['title']}**")
-                        preview = entry['text']
-                        st.text(preview[:400] + "..." if len(preview) > 400 else preview)
-                        st.markdown("<hr style='margin: 4px 0; opacity: 0.3'/>", unsafe_allow_html=True)
+
+if resume_file:
+    resume_text = extracted_texts.pop(0)
+    with col1:
+        if resume_text.startswith("Error: 文件解析失败"):
+            st.error(resume_text)
+        else:
+            st.success(f"✅ 已提取约 {len(resume_text)} 字")
+            with st.expander("查看简历解析内容"):
+                st.text(resume_text[:800] + "..." if len(resume_text) > 800 else resume_text)
+
+if jd_files:
+    with col2:
+        for idx, (jf, text) in enumerate(zip(jd_files, extracted_texts), start=1):
+            if text.startswith("Error: 文件解析失败"):
+                # 附上原因（如超出大小限制），方便用户判断如何处理
+                reason = text[len("Error: 文件解析失败"):].strip()
+                st.error(f"❌ JD 文件解析失败：{jf.name} {reason}，请检查后重试。")
+                continue
+            jd_entries.append({
+                "index": idx,
+                "title": jf.name,
+                "text": text
+            })
+        if jd_entries:
+            st.success(f"✅ 已成功导入 {len(jd_entries)} 个 JD")
+            with st.expander("查看部分 JD 内容预览"):
+                for entry in jd_entries:
+                    st.markdown(f"**[{entry['index']}] {entry['title']}**")
+                    preview = entry['text']
+                    st.text(preview[:400] + "..." if len(preview) > 400 else preview)
+                    st.markdown("<hr style='margin: 4px 0; opacity: 0.3'/>", unsafe_allow_html=True)
+
+# ========= 4.4 本地预排序（不调用大模型） =========
+# JD 数量超过 top-k 时，只把本地相似度最高的 k 个送入模型
+jd_for_llm = jd_entries
+if resume_text and resume_text.strip() and len(jd_entries) > 1:
+    # numpy / scipy 只在需要排序时才加载
+    rank_jds = lazy_import("jd_ranker").rank_jds
+    ranked = rank_jds(resume_text, jd_entries)
+    if len(jd_entries) > prerank_top_k:
+        jd_for_llm = [entry for entry, _ in ranked[:prerank_top_k]]
+    with st.expander(
+        f"📈 本地预排序：{len(jd_entries)} 个 JD 中相似度最高的 {len(jd_for_llm)} 个将进入 AI 分析",
+        expanded=len(jd_entries) > prerank_top_k
+    ):
+        # 折叠的 expander 内容照样执行：没有 JD 被筛掉时，排序表（及 pandas）等用户要看再构建
+        if len(jd_entries) > prerank_top_k or st.checkbox("显示排序明细", key="prerank_details"):
+            st.dataframe(lazy_import("pandas").DataFrame([
+                {
+                    "排名": rank,
+                    "原序号": entry["index"],
+                    "岗位名称": entry["title"],
+                    "本地相似度": score,
+                    "进入 AI 分析": "✅" if rank <= len(jd_for_llm) else ""
+                }
+                for rank, (entry, score) in enumerate(ranked, start=1)
+            ]), use_container_width=True, hide_index=True)
 
 st.markdown("---")
 
@@ -561,47 +353,27 @@ with btn_col2:
         use_container_width=True
     )
 
-# 逻辑处理
-if analyze_btn:
-    if not resume_text or not resume_text.strip():
-        st.warning("⚠️ 请先上传或粘贴简历。")
-    elif not jd_entries:
-        st.warning("⚠️ 请至少提供 1 个 JD（可多条文本或多文件）。")
-    elif config_mode != "演示模式 (Demo)" and not api_key:
-        st.error("⚠️ 请输入 API Key 才能使用 AI 功能。")
-    else:
-        with st.spinner("🤖 AI 正在阅读你的简历 & 多个 JD，并生成匹配报告与成长建议..."):
-            if config_mode == "演示模式 (Demo)":
-                time.sleep(2)
-                result = MOCK_DATA
-            else:
-                result = analyze_with_llm(api_key, base_url, model_name, resume_text, jd_entries)
-
-            if result:
-                st.session_state.result_json = result
-                st.session_state.analyzed = True
-                st.rerun()
 
 # ================= 5. 结果展示 =================
-if st.session_state.analyzed and st.session_state.result_json:
-    res = st.session_state.result_json
 
-    # ----- 5.1 多 JD 匹配概览 -----
+# ----- 5.1 多 JD 匹配概览 -----
+def render_jd_overview(res, key=None):
     st.header("📌 多岗位匹配概览")
     jd_overview = res.get("target_jd_overview", [])
     selected_jd_index = res.get("selected_jd_index", None)
 
     if jd_overview:
-        df_jd = pd.DataFrame([
+        df_jd = get_render_cache().get_or_build(key, "jd_overview_df", lambda: lazy_import("pandas").DataFrame([
             {
-                "序号": item.get("jd_index"),
+                # jd_index 是进入分析的 JD 中的位置，展示上传时的原序号
+                "序号": item.get("source_index", item.get("jd_index")),
                 "岗位名称": item.get("jd_title"),
                 "匹配分": item.get("match_score"),
                 "推荐级别": item.get("recommendation_level"),
                 "点评": item.get("short_comment")
             }
             for item in jd_overview
-        ])
+        ]))
         st.dataframe(df_jd, use_container_width=True)
 
         if selected_jd_index:
@@ -611,45 +383,47 @@ if st.session_state.analyzed and st.session_state.result_json:
             )
             if selected_row:
                 st.success(
-                    f"本轮详细优化基于：第 {selected_jd_index} 个岗位 —— {selected_row.get('jd_title', '')}"
+                    f"本轮详细优化基于：第 {selected_row.get('source_index', selected_jd_index)} 个岗位 —— "
+                    f"{selected_row.get('jd_title', '')}"
                 )
     else:
         st.info("暂无多 JD 匹配概览数据。")
 
-    st.markdown("---")
 
-    # ----- 5.2 匹配分 & 亮点 / 缺失 -----
-    st.header("📊 针对选中 JD 的匹配报告")
-    m_col1, m_col2 = st.columns([1, 1])
-
-    with m_col1:
-        st.metric("总体匹配得分", res.get('total_score', 0), delta_color="normal")
-        # 雷达图
-        dimensions = res.get('dimensions', {})
-        if dimensions:
-            df_radar = pd.DataFrame(dict(
-                r=list(dimensions.values()),
-                theta=list(dimensions.keys())
-            ))
-            fig = px.line_polar(df_radar, r='r', theta='theta', line_close=True, range_r=[0, 100])
-            fig.update_traces(fill='toself')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("暂无维度评分数据。")
-
-    with m_col2:
-        st.subheader("🎯 核心发现")
-        tab_high, tab_gap = st.tabs(["✨ 亮点 (Highlights)", "⚠️ 缺失 / 风险 (Gaps)"])
-        with tab_high:
-            for i in res.get('highlights', []):
-                st.success(f"• {i}")
-        with tab_gap:
-            for i in res.get('gaps', []):
-                st.error(f"• {i}")
+# ----- 5.2 匹配分 & 亮点 / 缺失 -----
+def render_score(res, key=None):
+    st.metric("总体匹配得分", res.get('total_score', 0), delta_color="normal")
+    # 雷达图
+    dimensions = res.get('dimensions', {})
+    if dimensions:
+        fig = get_render_cache().get_or_build(key, "radar_fig", lambda: radar_figure(dimensions))
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("暂无维度评分数据。")
+
+
+def radar_figure(dimensions):
+    # plotly 只在渲染雷达图时加载；直接传列表，不在这里构建 DataFrame
+    px = lazy_import("plotly.express")
+    fig = px.line_polar(r=list(dimensions.values()), theta=list(dimensions.keys()), line_close=True,
+                        range_r=[0, 100])
+    fig.update_traces(fill='toself')
+    return fig
 
-    st.markdown("---")
 
-    # ----- 5.3 智能改写建议 -----
+def render_findings(res, key=None):
+    st.subheader("🎯 核心发现")
+    tab_high, tab_gap = st.tabs(["✨ 亮点 (Highlights)", "⚠️ 缺失 / 风险 (Gaps)"])
+    with tab_high:
+        for i in res.get('highlights', []):
+            st.success(f"• {i}")
+    with tab_gap:
+        for i in res.get('gaps', []):
+            st.error(f"• {i}")
+
+
+# ----- 5.3 智能改写建议 -----
+def render_suggestions(res, key=None):
     st.subheader("💡 智能改写建议（逐条对比）")
     suggestions = res.get('suggestions', [])
     if suggestions:
@@ -667,9 +441,9 @@ if st.session_state.analyzed and st.session_state.result_json:
     else:
         st.info("暂无改写建议。")
 
-    st.markdown("---")
 
-    # ----- 5.4 相似岗位推荐 -----
+# ----- 5.4 相似岗位推荐 -----
+def render_job_recommendations(res, key=None):
     job_recs = res.get("job_recommendations", [])
     if job_recs:
         st.header("🔍 相关岗位推荐（同方向）")
@@ -701,9 +475,9 @@ if st.session_state.analyzed and st.session_state.result_json:
                         st.write(f"- {r_item}")
                 st.markdown("<hr style='margin: 5px 0; opacity: 0.15'/>", unsafe_allow_html=True)
 
-    st.markdown("---")
 
-    # ----- 5.5 学习与成长建议 -----
+# ----- 5.5 学习与成长建议 -----
+def render_learning_plan(res, key=None):
     learning_plan = res.get("learning_plan")
     if learning_plan:
         st.header("📚 学习与成长建议（未来 3–6 个月参考）")
@@ -736,9 +510,9 @@ if st.session_state.analyzed and st.session_state.result_json:
     else:
         st.info("暂无学习规划数据。")
 
-    st.markdown("---")
 
-    # ----- 5.6 学习资源 & 面经推荐 -----
+# ----- 5.6 学习资源 & 面经推荐 -----
+def render_resources(res, key=None):
     resources = res.get("resources", [])
     if resources:
         st.header("🎥 学习资源 & 面试经验推荐")
@@ -760,15 +534,14 @@ if st.session_state.analyzed and st.session_state.result_json:
     else:
         st.info("暂无资源推荐数据。")
 
-    st.markdown("---")
 
-    # ----- 5.7 简历生成与导出 -----
+# ----- 5.7 简历生成与导出 -----
+def render_draft_resume(res, key=None):
     st.header("📝 定制版简历预览与导出")
 
     draft_resume = res.get('draft_resume', '')
     if draft_resume:
-        # 生成 Word 文档
-        docx_file = WordGenerator.create_docx_from_markdown(draft_resume)
+        docx_file = draft_docx_bytes(draft_resume)
 
         # 导出按钮
         st.download_button(
@@ -782,3 +555,300 @@ if st.session_state.analyzed and st.session_state.result_json:
             st.text_area("简历 Markdown 源码", value=draft_resume, height=400)
     else:
         st.info("暂无定制简历内容。")
+
+
+def draft_docx_bytes(draft_resume):
+    """生成的 Word 文档存入会话存储，草稿内容不变时直接复用，不必每次 rerun 重新生成"""
+    store = get_session_store()
+    digest = hashlib.sha256(draft_resume.encode("utf-8")).hexdigest()
+    cached = st.session_state.draft_docx
+    if cached and cached["hash"] == digest:
+        data = store.get_bytes(cached["handle"])
+        if data is not None:
+            return data
+    data = WordGenerator.create_docx_from_markdown(draft_resume).getvalue()
+    if cached:
+        store.drop(cached["handle"])
+    st.session_state.draft_docx = {"hash": digest, "handle": store.put_bytes(st.session_state.session_id, data)}
+    return data
+
+
+class ResultView:
+    """
+    结果区布局：先为每个分区放好占位符，
+    分区依赖的字段齐全后即可单独渲染（流式输出时逐块出现）
+    """
+
+    def __init__(self, include_draft=True):
+        self._slots = []
+
+        self._add_slot(("target_jd_overview", "selected_jd_index"), render_jd_overview)
+        st.markdown("---")
+
+        st.header("📊 针对选中 JD 的匹配报告")
+        m_col1, m_col2 = st.columns([1, 1])
+        with m_col1:
+            self._add_slot(("total_score", "dimensions"), render_score)
+        with m_col2:
+            self._add_slot(("highlights", "gaps"), render_findings)
+        st.markdown("---")
+
+        self._add_slot(("suggestions",), render_suggestions)
+        st.markdown("---")
+        self._add_slot(("job_recommendations",), render_job_recommendations)
+        st.markdown("---")
+        self._add_slot(("learning_plan",), render_learning_plan)
+        st.markdown("---")
+        self._add_slot(("resources",), render_resources)
+        # 任务预览与正式结果可能同屏，导出区只在正式结果中渲染，避免控件重复
+        if include_draft:
+            st.markdown("---")
+            self._add_slot(("draft_resume",), render_draft_resume)
+
+    def _add_slot(self, fields, render_fn):
+        placeholder = st.empty()
+        self._slots.append({"fields": fields, "placeholder": placeholder, "render": render_fn, "done": False})
+
+    def show_pending(self):
+        for slot in self._slots:
+            if not slot["done"]:
+                slot["placeholder"].caption("⏳ 生成中...")
+
+    def update(self, res, final=False, result_key=None, isolate=False):
+        """
+        渲染所有字段已齐全的分区；final=True 时缺字段的分区也按空数据渲染
+        result_key: 完整结果的哈希，分区据此复用已构建的表格 / 图表（流式预览时为 None）
+        isolate: 每个分区包成独立的 fragment，分区内的控件交互只重跑该分区
+        """
+        for slot in self._slots:
+            if slot["done"]:
+                continue
+            if final or all(f in res for f in slot["fields"]):
+                with slot["placeholder"].container():
+                    if isolate and _fragment is not None:
+                        _fragment(render_section)(slot["render"], res, result_key)
+                    else:
+                        render_section(slot["render"], res, result_key)
+                slot["done"] = True
+
+
+def render_section(render_fn, res, key):
+    with perf_metrics.span("render.section", section=render_fn.__name__):
+        render_fn(res, key)
+
+
+# 逻辑处理
+if analyze_btn:
+    if not resume_text or not resume_text.strip():
+        st.warning("⚠️ 请先上传或粘贴简历。")
+    elif not jd_entries:
+        st.warning("⚠️ 请至少提供 1 个 JD（可多条文本或多文件）。")
+    elif config_mode != "演示模式 (Demo)" and not api_key:
+        st.error("⚠️ 请输入 API Key 才能使用 AI 功能。")
+    elif config_mode == "演示模式 (Demo)":
+        with st.spinner("🤖 AI 正在阅读你的简历 & 多个 JD，并生成匹配报告与成长建议..."):
+            time.sleep(2)
+            set_current_result(MOCK_DATA)
+            st.rerun()
+    else:
+        # 提交到后台任务池：不阻塞本会话，rerun 也不会中断在途请求；可连续提交多个组合排队
+        job_id = get_job_manager().submit(
+            f"{resume_file.name if resume_file else '粘贴的简历'} × {len(jd_for_llm)} 个 JD",
+            run_analysis, api_key, base_url, model_name, resume_text, jd_for_llm,
+            map_reduce=map_reduce, stream=stream_output, force_refresh=force_refresh,
+            # 分阶段引擎下只重算新增 / 改动的 JD，选中岗位不变时沿用上次的深度分析
+            previous=load_current_result(), section_models=section_models, model_limits=model_limits
+        )
+        st.session_state.job_ids.append(job_id)
+        st.session_state.watch_job_id = job_id
+        st.toast(f"🚀 已提交分析任务 #{job_id}，可继续调整输入或提交更多组合")
+
+
+def show_job_result(job_id):
+    job = get_job_manager().get(job_id)
+    if job is not None and job.status == DONE:
+        set_current_result(job.result)
+
+
+def render_job_queue(polling=False):
+    """任务列表：状态 / 耗时 / 取消 / 查看结果；最近提交的任务分析中时显示实时预览"""
+    manager = get_job_manager()
+    jobs = manager.jobs(st.session_state.job_ids)
+    if not jobs:
+        return
+
+    st.subheader("🗂️ 分析任务")
+    for job in reversed(jobs):
+        j_col1, j_col2, j_col3 = st.columns([5, 3, 2])
+        with j_col1:
+            st.markdown(f"**{job.label}** · `#{job.id}`")
+        with j_col2:
+            detail = f"{STATUS_LABELS[job.status]} · {job.elapsed:.1f}s"
+            if job.cached:
+                detail += " · ⚡ 缓存"
+            elif job.coalesced:
+                detail += " · 🔗 合并"
+            elif job.usage.get("total_tokens"):
+                detail += f" · {job.usage['total_tokens']:,} tokens"
+            st.caption(detail)
+        with j_col3:
+            if not job.finished:
+                st.button("取消", key=f"cancel_{job.id}", on_click=manager.cancel, args=(job.id,))
+            elif job.status == DONE:
+                st.button("查看结果", key=f"view_{job.id}", on_click=show_job_result, args=(job.id,))
+        if job.error:
+            st.error(job.error)
+
+    watched = manager.get(st.session_state.watch_job_id) if st.session_state.watch_job_id else None
+    if watched is not None and watched.finished:
+        # 最近提交的任务结束：只处理这一次，之后手动「查看结果」或从历史「载入」的结果不会被换回来
+        st.session_state.watch_job_id = None
+        if watched.status == DONE:
+            # 完成：整页刷新展示结果
+            show_job_result(watched.id)
+            st.rerun()
+    if polling and all(job.finished for job in jobs):
+        # 全部结束后整页刷新一次，停止定时轮询
+        st.rerun()
+    if watched is not None and not watched.finished and watched.partial:
+        st.caption(f"实时预览 · #{watched.id}")
+        view = ResultView(include_draft=False)
+        view.show_pending()
+        view.update(dict(watched.partial))
+    st.markdown("---")
+
+
+# ----- 历史记录：载入往次结果、对比总分与各维度（只读本地 SQLite，不调用模型） -----
+def load_history_run(run_id, owner):
+    result = get_history_store().get_result(run_id, owner)
+    if result:
+        set_current_result(result)
+
+
+def _history_label(run):
+    when = time.strftime("%m-%d %H:%M", time.localtime(run["created_at"]))
+    return f"#{run['id']} · {when} · {run['selected_jd_title'] or '-'} · {run['total_score']} 分"
+
+
+def render_history(owner):
+    """只列出 owner（当前 API Key 对应的用户）自己的记录"""
+    history = get_history_store()
+    if owner is None:
+        with st.expander("🕘 分析历史与对比"):
+            st.caption("输入 API Key 后可查看本人的分析历史（演示模式不记录）。")
+        return
+    with st.expander(f"🕘 分析历史与对比（共 {history.count(owner)} 条）"):
+        # expander 折叠时内容也会执行：记录表与对比表（及 pandas）等用户勾选后再查询、构建
+        if not st.checkbox("显示历史记录", key="history_details"):
+            return
+        scope = st.radio("范围", ["当前简历", "当前目标岗位"], horizontal=True, key="history_scope")
+        summary = st.session_state.result_summary or {}
+        if scope == "当前简历":
+            if not resume_text.strip():
+                st.caption("请先上传或粘贴简历。")
+                return
+            runs = history.recent(owner, resume_hash=text_hash(resume_text))
+        else:
+            # 同一目标岗位下比较不同版本的简历
+            if not summary.get("selected_jd_hash"):
+                st.caption("当前没有分析结果。")
+                return
+            runs = history.recent(owner, jd_hash=summary["selected_jd_hash"])
+        if not runs:
+            st.caption("暂无记录。")
+            return
+
+        st.dataframe(lazy_import("pandas").DataFrame([
+            {
+                "ID": run["id"],
+                "时间": time.strftime("%Y-%m-%d %H:%M", time.localtime(run["created_at"])),
+                "任务": run["label"],
+                "模型": run["model"],
+                "目标岗位": run["selected_jd_title"],
+                "总分": run["total_score"],
+                "耗时 (s)": run["metrics"].get("elapsed_s"),
+                "tokens": run["metrics"].get("total_tokens"),
+            }
+            for run in runs
+        ]), use_container_width=True, hide_index=True)
+
+        by_id = {run["id"]: run for run in runs}
+        h_col1, h_col2 = st.columns([3, 1])
+        with h_col1:
+            load_id = st.selectbox("载入往次结果", list(by_id), format_func=lambda i: _history_label(by_id[i]))
+        with h_col2:
+            st.button("载入", key="history_load", on_click=load_history_run, args=(load_id, owner))
+
+        compare_ids = st.multiselect(
+            "选择要对比的记录（按时间先后排列）",
+            list(by_id), default=list(by_id)[:2], format_func=lambda i: _history_label(by_id[i])
+        )
+        if len(compare_ids) >= 2:
+            ordered = sorted(compare_ids, key=lambda i: by_id[i]["created_at"])
+            _, table = history.compare(ordered, owner)
+            st.dataframe(lazy_import("pandas").DataFrame(table), use_container_width=True, hide_index=True)
+
+
+# 任务轮询：有在途任务时只定时刷新任务区（st.fragment），不打断页面其他部分的操作
+jobs_active = any(not job.finished for job in get_job_manager().jobs(st.session_state.job_ids))
+if jobs_active and _fragment is not None:
+    _fragment(run_every=1.0)(render_job_queue)(polling=True)
+else:
+    render_job_queue()
+
+render_history(None if config_mode == "演示模式 (Demo)" else owner_id(api_key))
+
+# 结果渲染
+current_result = load_current_result()
+if current_result:
+    with perf_metrics.span("render"):
+        ResultView().update(current_result, final=True,
+                            result_key=(st.session_state.result_summary or {}).get("result_hash"), isolate=True)
+elif st.session_state.analyzed:
+    summary = st.session_state.result_summary or {}
+    st.info(
+        f"上次的分析结果（{summary.get('selected_jd_title') or '未知岗位'}，总分 {summary.get('total_score', '-')}）"
+        "因长时间未操作已被清理，请重新分析。"
+    )
+    st.session_state.analyzed = False
+
+# ================= 6. 启动与各阶段耗时 =================
+record_script_run(_SCRIPT_START)
+with startup_timing_panel.container():
+    timing = startup_report()
+    if timing["first_paint_s"] is not None:
+        st.caption(f"冷启动首屏 {timing['first_paint_s']:.2f}s · 本次脚本执行 {timing['last_run_s']:.2f}s "
+                   f"· 平均 {timing['avg_run_s']:.2f}s（{timing['runs']} 次）")
+    for module_name, seconds in timing["imports_s"].items():
+        st.caption(f"首次导入 {module_name}: {seconds * 1000:.0f} ms")
+
+if perf_panel is not None:
+    with perf_panel.container():
+        stage_stats = perf_metrics.summary()
+        if stage_stats:
+            st.dataframe(lazy_import("pandas").DataFrame([
+                {
+                    "阶段": stage,
+                    "次数": stats["count"],
+                    "p50 (ms)": round(stats["p50_s"] * 1000, 1),
+                    "p95 (ms)": round(stats["p95_s"] * 1000, 1),
+                    "最大 (ms)": round(stats["max_s"] * 1000, 1),
+                }
+                for stage, stats in stage_stats.items()
+            ]), use_container_width=True, hide_index=True)
+            tokens = perf_metrics.token_totals()
+            st.caption(f"累计 token：输入 {tokens['prompt_tokens']:,} · 输出 {tokens['completion_tokens']:,}")
+            render_stats = get_render_cache().stats()
+            st.caption(f"结果图表缓存：命中 {render_stats['hits']} 次 · 构建 {render_stats['misses']} 次 "
+                       f"· 命中率 {render_stats['hit_rate']:.0%}")
+            st.download_button("导出 JSON Lines", perf_metrics.export_jsonl(), file_name="jobalign_perf.jsonl",
+                               mime="application/x-ndjson")
+            st.download_button("导出 Prometheus 文本", perf_metrics.export_prometheus(), file_name="jobalign_perf.prom",
+                               mime="text/plain")
+        else:
+            st.caption("暂无记录：解析文件或运行分析后显示")
+
+# 旧版 Streamlit 没有 fragment：有在途任务时整页定时刷新
+if jobs_active and _fragment is None:
+    time.sleep(1.0)
+    st.rerun()
@@ -0,0 +1,344 @@
+"""
+JobAlign 批量分析（命令行，无界面）
+
+复用 DocumentHandler / analyze_with_llm / WordGenerator，对「简历 × JD」做批量分析，
+结果逐行写入 JSONL；再次运行同一输出文件时会跳过已成功的组合（断点续跑）。
+
+示例：
+    python batch.py --resumes ./resumes --jds "./jds/**/*.pdf" --out results.jsonl \\
+        --api-key $DEEPSEEK_API_KEY --concurrency 8 --docx-dir ./drafts
+
+    # 每份简历对整组 JD 做一次多 JD 分析（与界面行为一致）
+    python batch.py --resumes ./resumes --jds ./jds --all-jds --engine map_reduce --out results.jsonl
+
+    # 所有定制简历打包到一个 ZIP（边完成边写入，续跑时追加）
+    python batch.py --resumes ./resumes --jds ./jds --out results.jsonl --docx-zip drafts.zip
+
+    # 深度分析按分区并行生成，资源 / 岗位推荐路由到更便宜的模型
+    python batch.py --resumes ./resumes --jds ./jds --all-jds --engine map_reduce --out results.jsonl \
+        --section-model learning=gpt-4o-mini --section-model job_recommendations=gpt-4o-mini
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from analyzer import (
+    DEEP_SECTIONS,
+    PROMPT_VERSION,
+    RESULT_FIELDS,
+    TEMPERATURE,
+    analyze_with_llm,
+    analyze_with_llm_map_reduce,
+    engine_tag,
+    missing_fields,
+    resolve_section_models,
+    set_error_handler,
+)
+from document_handler import ERROR_PREFIX, DocumentHandler, NamedBytesIO, configure_workers, default_worker_count
+from result_cache import get_result_cache, make_result_key
+from word_generator import WordGenerator
+
+SUPPORTED_EXTS = {'pdf', 'docx', 'doc', 'txt', 'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif'}
+ALL_JDS = "*"
+
+logger = logging.getLogger("jobalign.batch")
+_local = threading.local()
+
+
+def _capture_error(message):
+    """analyzer 的错误回调：记录到当前线程，写入该组合的结果行"""
+    _local.last_error = message
+    logger.warning(message)
+
+
+def expand_inputs(patterns):
+    """目录（递归）或 glob 展开为文件列表，去重并保持顺序"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                for name in sorted(files):
+                    paths.append(os.path.join(root, name))
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+
+    seen = set()
+    result = []
+    for path in paths:
+        ext = path.rsplit(".", 1)[-1].lower() if "." in os.path.basename(path) else ""
+        norm = os.path.abspath(path)
+        if ext in SUPPORTED_EXTS and os.path.isfile(path) and norm not in seen:
+            seen.add(norm)
+            result.append(path)
+    return result
+
+
+def load_documents(paths):
+    """读取并并行提取文本，返回 [{'path', 'sha256', 'text', 'error'}, ...]"""
+    files = []
+    digests = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        files.append(NamedBytesIO(data, os.path.basename(path)))
+        digests.append(hashlib.sha256(data).hexdigest())
+
+    texts = DocumentHandler.extract_many(files) if files else []
+    docs = []
+    for path, digest, text in zip(paths, digests, texts):
+        failed = text.startswith(ERROR_PREFIX) or not text.strip()
+        docs.append({
+            "path": path,
+            "sha256": digest,
+            "text": "" if failed else text,
+            "error": (text if text.startswith(ERROR_PREFIX) else "未提取到文本") if failed else None,
+        })
+    return docs
+
+
+def pair_key(resume_sha, jd_sha, engine, model):
+    """断点续跑的组合标识：换了引擎 / 模型（含分区路由）的同一组合需要重新分析"""
+    return resume_sha, jd_sha, engine, model
+
+
+def load_done(out_path):
+    """读取已有输出，返回已成功组合的 pair_key 集合"""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(pair_key(record.get("resume_sha256"), record.get("jd_sha256"),
+                                  record.get("engine"), record.get("model")))
+    return done
+
+
+def _stem(path):
+    return re.sub(r"[^\w\-一-鿿]+", "_", os.path.splitext(os.path.basename(path))[0])
+
+
+def _docx_name(record):
+    jd_part = "all" if record["jd"] == ALL_JDS else _stem(record["jd"])
+    return f"{_stem(record['resume'])}__{jd_part}.docx"
+
+
+def base_record(args, resume, jds, jd_sha):
+    return {
+        "resume": resume["path"],
+        "resume_sha256": resume["sha256"],
+        "jd": jds[0]["path"] if len(jds) == 1 and jd_sha != ALL_JDS else ALL_JDS,
+        "jd_sha256": jd_sha,
+        "model": args.model,
+        "engine": engine_tag(args.engine, args.section_models),
+    }
+
+
+def run_pair(args, resume, jds, jd_sha):
+    """分析一个组合，返回写入 JSONL 的记录"""
+    _local.last_error = None
+    jd_list = [
+        {"index": i, "title": os.path.basename(jd["path"]), "text": jd["text"]}
+        for i, jd in enumerate(jds, start=1)
+    ]
+    record = base_record(args, resume, jds, jd_sha)
+
+    started = time.perf_counter()
+    usage = {}
+    cache = None if args.no_cache else get_result_cache()
+    cache_key = make_result_key(
+        args.base_url, args.model, PROMPT_VERSION, TEMPERATURE, record["engine"], resume["text"], jd_list
+    )
+    result = cache.get(cache_key) if cache else None
+    if result is not None and missing_fields(result, RESULT_FIELDS):
+        result = None
+    record["cached"] = result is not None
+
+    if result is None:
+        if args.engine == "map_reduce":
+            result = analyze_with_llm_map_reduce(
+                args.api_key, args.base_url, args.model, resume["text"], jd_list,
+                concurrency=args.jd_concurrency, usage=usage, section_models=args.section_models
+            )
+        else:
+            result = analyze_with_llm(args.api_key, args.base_url, args.model, resume["text"], jd_list, usage=usage)
+        missing = missing_fields(result, RESULT_FIELDS) if result else []
+        if missing:
+            _capture_error(f"模型输出不完整：缺少字段 {', '.join(missing)}")
+            result = None
+        if result and cache:
+            cache.put(cache_key, result, usage)
+
+    record["elapsed_s"] = round(time.perf_counter() - started, 3)
+    record["usage"] = usage
+    if not result:
+        record["status"] = "error"
+        record["error"] = _local.last_error or "分析失败"
+        return record
+
+    record["status"] = "ok"
+    record["result"] = result
+
+    if args.docx_dir and result.get("draft_resume"):
+        docx_path = os.path.join(args.docx_dir, _docx_name(record))
+        with open(docx_path, "wb") as f:
+            WordGenerator.write_docx(result["draft_resume"], f)
+        record["docx"] = docx_path
+    return record
+
+
+def build_pairs(resumes, jds, all_jds):
+    """生成 (resume, [jd, ...], jd_sha256) 组合；all_jds 时每份简历对整组 JD 只生成一个组合"""
+    if all_jds:
+        combined = hashlib.sha256("".join(jd["sha256"] for jd in jds).encode("utf-8")).hexdigest()
+        return [(resume, jds, combined) for resume in resumes]
+    return [(resume, [jd], jd["sha256"]) for resume in resumes for jd in jds]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="JobAlign 批量分析：简历 × JD")
+    parser.add_argument("--resumes", nargs="+", required=True, help="简历目录或 glob，可多个")
+    parser.add_argument("--jds", nargs="+", required=True, help="JD 目录或 glob，可多个")
+    parser.add_argument("--out", required=True, help="结果 JSONL 路径（追加写入，可断点续跑）")
+    parser.add_argument("--docx-dir", help="同时导出定制简历 .docx 的目录")
+    parser.add_argument("--docx-zip", help="同时把定制简历 .docx 逐份追加到该 ZIP 文件")
+    parser.add_argument("--all-jds", action="store_true", help="每份简历对整组 JD 做一次多 JD 分析")
+    parser.add_argument("--engine", choices=["single", "map_reduce"], default="single",
+                        help="single：单次调用；map_reduce：先并发逐个 JD 打分再深度分析")
+    parser.add_argument("--api-key", default=os.environ.get("JOBALIGN_API_KEY") or os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument("--base-url", default="https://api.deepseek.com")
+    parser.add_argument("--model", default="deepseek-chat")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的分析数")
+    parser.add_argument("--jd-concurrency", type=int, default=8, help="map_reduce 引擎中单次分析内的 JD 评分并发")
+    parser.add_argument("--parallel-sections", action="store_true",
+                        help="map_reduce 引擎的深度分析按分区拆成多个请求并行生成")
+    parser.add_argument("--section-model", action="append", default=[], metavar="SECTION=MODEL",
+                        help=f"分区路由到的模型（可多次指定，隐含 --parallel-sections），分区：{', '.join(DEEP_SECTIONS)}")
+    parser.add_argument("--extract-workers", type=int, default=default_worker_count(), help="文件解析进程数")
+    parser.add_argument("--no-cache", action="store_true", help="不读写分析结果缓存")
+    parser.add_argument("--limit", type=int, help="最多处理的组合数（调试用）")
+    args = parser.parse_args(argv)
+
+    section_models = {}
+    for item in args.section_model:
+        section, _, model = item.partition("=")
+        if section not in DEEP_SECTIONS or not model:
+            parser.error(f"--section-model 格式应为 SECTION=MODEL，分区：{', '.join(DEEP_SECTIONS)}")
+        section_models[section] = model
+    if (args.parallel_sections or section_models) and args.engine != "map_reduce":
+        parser.error("--parallel-sections / --section-model 只适用于 --engine map_reduce")
+    args.section_models = resolve_section_models(
+        args.model, section_models if (args.parallel_sections or section_models) else None
+    )
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    set_error_handler(_capture_error)
+
+    if not args.api_key:
+        logger.error("缺少 API Key：请使用 --api-key 或设置环境变量 JOBALIGN_API_KEY")
+        return 2
+
+    resume_paths = expand_inputs(args.resumes)
+    jd_paths = expand_inputs(args.jds)
+    logger.info("简历 %d 份，JD %d 个，开始解析...", len(resume_paths), len(jd_paths))
+
+    configure_workers(args.extract_workers)
+    resumes = load_documents(resume_paths)
+    jds = load_documents(jd_paths)
+    for doc in resumes + jds:
+        if doc["error"]:
+            logger.warning("跳过 %s：%s", doc["path"], doc["error"])
+    resumes = [doc for doc in resumes if not doc["error"]]
+    jds = [doc for doc in jds if not doc["error"]]
+    if not resumes or not jds:
+        logger.error("没有可用的简历或 JD")
+        return 1
+
+    done = load_done(args.out)
+    engine = engine_tag(args.engine, args.section_models)
+    all_pairs = build_pairs(resumes, jds, args.all_jds)
+    pairs = [p for p in all_pairs if pair_key(p[0]["sha256"], p[2], engine, args.model) not in done]
+    skipped = len(all_pairs) - len(pairs)
+    if args.limit:
+        pairs = pairs[:args.limit]
+    logger.info("待分析组合 %d 个（已跳过完成的 %d 个）", len(pairs), skipped)
+
+    if args.docx_dir:
+        os.makedirs(args.docx_dir, exist_ok=True)
+
+    ok = failed = 0
+    tokens = 0
+    started = time.perf_counter()
+    pending_pairs = iter(pairs)
+    # ZIP 只在主线程写入：每个组合完成时生成一份文档并立即写入，不会攒在内存里
+    docx_zip = zipfile.ZipFile(args.docx_zip, "a", compression=zipfile.ZIP_STORED) if args.docx_zip else None
+    with open(args.out, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        # 有界提交：在途任务数不超过 concurrency，避免一次性创建上万个 future
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < max(1, args.concurrency):
+                    pair = next(pending_pairs, None)
+                    if pair is None:
+                        break
+                    in_flight[executor.submit(run_pair, args, *pair)] = pair
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pair = in_flight.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        # 单个组合的意外异常（如导出 .docx 失败）只记为该组合失败，不中断整批
+                        logger.exception("分析 %s 时出错", os.path.basename(pair[0]["path"]))
+                        record = base_record(args, *pair)
+                        record.update(status="error", error=f"{type(e).__name__}: {e}", elapsed_s=0.0, usage={})
+                    draft = record.get("result", {}).get("draft_resume")
+                    if docx_zip and draft:
+                        WordGenerator.add_to_zip(docx_zip, _docx_name(record), draft)
+                        record["docx_zip"] = args.docx_zip
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    tokens += record.get("usage", {}).get("total_tokens", 0)
+                    if record["status"] == "ok":
+                        ok += 1
+                    else:
+                        failed += 1
+                    logger.info("[%d/%d] %s × %s -> %s (%.1fs)", ok + failed, len(pairs),
+                                os.path.basename(record["resume"]), os.path.basename(record["jd"]),
+                                record["status"], record["elapsed_s"])
+        except KeyboardInterrupt:
+            logger.warning("已中断：已完成的结果已写入，重新运行会从断点继续")
+            for future in in_flight:
+                future.cancel()
+            return 130
+        finally:
+            if docx_zip:
+                docx_zip.close()
+
+    logger.info("完成：成功 %d，失败 %d，耗时 %.1fs，消耗 token %d",
+                ok, failed, time.perf_counter() - started, tokens)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+合成基准语料：文字版 PDF（单页 / 多页）、DOCX、TXT、OCR 图片，中英文各一套
+
+PDF 为手写的最小结构（不依赖额外库）：英文用 Helvetica；中文用 Identity-H 编码直接写
+UCS-2 码位并附 ToUnicode 映射——字形显示不保证正确，但文字层可被 PyPDF2 完整提取，
+而基准只关心提取耗时
+"""
+import io
+import os
+import random
+
+from startup_timing import lazy_import
+
+SAMPLE_LINES = {
+    "zh": [
+        "负责 AI 产品需求分析与 PRD 撰写，推动多 Agent 协同方案落地",
+        "使用 Python 与 SQL 完成数据清洗、漏斗分析与指标体系搭建",
+        "主导竞品情报监控项目，将整理耗时从 1 天缩短至 2 小时",
+        "熟悉大模型应用、RAG 检索增强与提示词工程，具备原型设计能力",
+        "跨部门协作推进需求评审、UAT 测试与上线复盘，保障交付质量",
+        "任职要求：本科及以上学历，计算机、统计或相关专业优先",
+    ],
+    "en": [
+        "Led requirement analysis and PRD writing for an AI assistant product",
+        "Built data pipelines in Python and SQL for funnel and retention analysis",
+        "Shipped a competitor-monitoring agent that cut research time by 75 percent",
+        "Familiar with LLM applications, retrieval augmented generation and prompt design",
+        "Coordinated cross-functional reviews, UAT testing and launch retrospectives",
+        "Requirements: bachelor degree in computer science, statistics or related field",
+    ],
+}
+
+
+def sample_text(lang, lines, seed=0):
+    rng = random.Random(seed)
+    pool = SAMPLE_LINES[lang]
+    return "\n".join(pool[rng.randrange(len(pool))] for _ in range(lines))
+
+
+# ================= PDF =================
+
+def _ucs2_to_unicode_cmap(text):
+    """UCS-2 编码的恒等 ToUnicode 映射，只覆盖 text 用到的高字节区段（提取器据此把字节还原为文字）"""
+    highs = sorted({ord(ch) >> 8 for ch in text if ord(ch) <= 0xFFFF})
+    ranges = [f"<{hi:02X}00> <{hi:02X}FF> <{hi:02X}00>" for hi in highs]
+    blocks = []
+    for i in range(0, len(ranges), 100):
+        chunk = ranges[i:i + 100]
+        blocks.append(f"{len(chunk)} beginbfrange\n" + "\n".join(chunk) + "\nendbfrange")
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CMapName /UCS2-Identity def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        + "\n".join(blocks)
+        + "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+    ).encode("ascii")
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_page_stream(lines, lang):
+    parts = []
+    y = 800
+    for line in lines:
+        if lang == "zh":
+            parts.append(f"BT /F2 11 Tf 40 {y} Td <{line.encode('utf-16-be').hex().upper()}> Tj ET")
+        else:
+            parts.append(f"BT /F1 11 Tf 40 {y} Td ({_pdf_escape(line)}) Tj ET")
+        y -= 16
+    return "\n".join(parts).encode("latin-1")
+
+
+def make_text_pdf(pages, lang):
+    """pages: 每页的文本行列表；返回 PDF 字节"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages，页对象编号确定后回填
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    fonts = b"/F1 3 0 R"
+    if lang == "zh":
+        cmap = _ucs2_to_unicode_cmap("".join("".join(lines) for lines in pages))
+        objects += [
+            b"<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /Identity-H "
+            b"/DescendantFonts [5 0 R] /ToUnicode 6 0 R >>",
+            b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+            b"/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> /DW 1000 >>",
+            b"<< /Length %d >>\nstream\n" % len(cmap) + cmap + b"\nendstream",
+        ]
+        fonts += b" /F2 4 0 R"
+    page_ids = []
+    for lines in pages:
+        stream = _pdf_page_stream(lines, lang)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << " + fonts + b" >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+# ================= DOCX / TXT / 图片 =================
+
+def make_docx(text):
+    doc = lazy_import("docx").Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def make_table_docx(text, columns=4):
+    """模板式简历：首行放页眉，其余按表格排版（中文简历模板常见做法）"""
+    lines = text.splitlines()
+    doc = lazy_import("docx").Document()
+    doc.sections[0].header.paragraphs[0].text = lines[0]
+    cells = lines[1:]
+    table = doc.add_table(rows=(len(cells) + columns - 1) // columns, cols=columns)
+    for i, line in enumerate(cells):
+        table.cell(i // columns, i % columns).text = line
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def make_txt(text):
+    return text.encode("utf-8")
+
+
+# 常见的中文字体位置；找不到时中文图片样本会被跳过
+_CJK_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:\\Windows\\Fonts\\msyh.ttc",
+]
+
+
+def _find_font(lang):
+    image_font = lazy_import("PIL.ImageFont")
+    if lang == "zh":
+        for path in _CJK_FONT_CANDIDATES:
+            if os.path.exists(path):
+                return image_font.truetype(path, 28)
+        return None
+    try:
+        return image_font.load_default(size=28)
+    except TypeError:
+        return image_font.load_default()
+
+
+def make_image(text, lang, width=1240, image_format="PNG"):
+    """把文本画成白底黑字图片（模拟截图 / 扫描件）；缺少中文字体时返回 None"""
+    font = _find_font(lang)
+    if font is None:
+        return None
+    image_module = lazy_import("PIL.Image")
+    draw_module = lazy_import("PIL.ImageDraw")
+    lines = text.splitlines()
+    image = image_module.new("RGB", (width, 80 + 44 * len(lines)), "white")
+    draw = draw_module.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + 44 * i), line, fill="black", font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def build_corpus():
+    """
+    返回 [(name, filename, bytes), ...]
+    name 形如 extract.pdf.zh.1p，用于结果 JSON 与阈值匹配
+    """
+    corpus = []
+    for lang in ("zh", "en"):
+        one_page = sample_text(lang, 40, seed=1)
+        corpus.append((f"extract.pdf.{lang}.1p", "sample.pdf", make_text_pdf([one_page.splitlines()], lang)))
+        pages = [sample_text(lang, 45, seed=i).splitlines() for i in range(20)]
+        corpus.append((f"extract.pdf.{lang}.20p", "sample.pdf", make_text_pdf(pages, lang)))
+
+        corpus.append((f"extract.docx.{lang}.small", "sample.docx", make_docx(sample_text(lang, 40, seed=2))))
+        corpus.append((f"extract.docx.{lang}.large", "sample.docx", make_docx(sample_text(lang, 800, seed=3))))
+        corpus.append((f"extract.docx.{lang}.table", "sample.docx", make_table_docx(sample_text(lang, 200, seed=7))))
+
+        corpus.append((f"extract.txt.{lang}.small", "sample.txt", make_txt(sample_text(lang, 40, seed=4))))
+        corpus.append((f"extract.txt.{lang}.large", "sample.txt", make_txt(sample_text(lang, 4000, seed=5))))
+
+        image = make_image(sample_text(lang, 12, seed=6), lang)
+        if image is not None:
+            corpus.append((f"extract.image.{lang}.png", "sample.png", image))
+    return corpus
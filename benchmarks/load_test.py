@@ -0,0 +1,239 @@
+"""
+并发会话压测：N 个模拟会话同时走真实的「文件解析 -> 大模型分析」路径
+
+默认在进程内启动 mock_llm_server 作为模型端（不消耗 API 额度），也可用 --base-url 指向外部服务。
+每个会话使用内容不同的合成简历 / JD 文件，保证解析缓存不会命中。
+
+示例：
+    python -m benchmarks.load_test --sessions 16 --iterations 3 --engine map_reduce --stream
+    python -m benchmarks.load_test --sessions 8 --rate-limit-rate 0.1 --error-rate 0.02 --out load.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perf_metrics  # noqa: E402
+from analyzer import (  # noqa: E402
+    analyze_with_llm,
+    analyze_with_llm_map_reduce,
+    analyze_with_llm_map_reduce_stream,
+    analyze_with_llm_stream,
+    set_error_handler,
+)
+from benchmarks.corpus import make_docx, make_text_pdf, make_txt, sample_text  # noqa: E402
+from document_handler import ERROR_PREFIX, DocumentHandler, NamedBytesIO, configure_workers  # noqa: E402
+from mock_llm_server import add_option_args, options_from_args, start_server  # noqa: E402
+
+logger = logging.getLogger("jobalign.load")
+_local = threading.local()
+
+
+def _capture_error(message):
+    _local.last_error = message
+
+
+def rss_mb():
+    """当前进程常驻内存（MB）；无 /proc 时退回峰值 RSS"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def session_files(session, iteration, jd_count):
+    """每个会话一份 PDF 简历 + 若干 JD（PDF / DOCX / TXT 轮换），内容按会话与轮次区分"""
+    seed = session * 1000 + iteration * 100
+    lang = "zh" if session % 2 == 0 else "en"
+    files = [NamedBytesIO(make_text_pdf([sample_text(lang, 40, seed=seed).splitlines()], lang), "resume.pdf")]
+    makers = [
+        ("pdf", lambda text: make_text_pdf([text.splitlines()], lang)),
+        ("docx", make_docx),
+        ("txt", make_txt),
+    ]
+    for i in range(jd_count):
+        ext, make = makers[i % len(makers)]
+        files.append(NamedBytesIO(make(sample_text(lang, 30, seed=seed + i + 1)), f"jd_{i + 1}.{ext}"))
+    return files
+
+
+def run_session(args, session, iteration):
+    """一次完整的会话流程，返回耗时与结果状态"""
+    _local.last_error = None
+    started = time.perf_counter()
+    files = session_files(session, iteration, args.jds)
+    texts = DocumentHandler.extract_many(files)
+    extracted = time.perf_counter()
+
+    failed = [t for t in texts if t.startswith(ERROR_PREFIX)]
+    resume_text = texts[0]
+    jd_list = [
+        {"index": i, "title": files[i].name, "text": text}
+        for i, text in enumerate(texts[1:], start=1)
+    ]
+
+    ttfr = None
+    if args.stream:
+        if args.engine == "map_reduce":
+            events = analyze_with_llm_map_reduce_stream(args.api_key, args.base_url, args.model, resume_text, jd_list,
+                                                        concurrency=args.jd_concurrency)
+        else:
+            events = analyze_with_llm_stream(args.api_key, args.base_url, args.model, resume_text, jd_list)
+        result = None
+        for key, value in events:
+            if ttfr is None:
+                ttfr = time.perf_counter() - started
+            if key is None:
+                result = value
+    elif args.engine == "map_reduce":
+        result = analyze_with_llm_map_reduce(args.api_key, args.base_url, args.model, resume_text, jd_list,
+                                             concurrency=args.jd_concurrency)
+    else:
+        result = analyze_with_llm(args.api_key, args.base_url, args.model, resume_text, jd_list)
+
+    finished = time.perf_counter()
+    return {
+        "session": session,
+        "iteration": iteration,
+        "ok": bool(result) and not failed,
+        "error": _local.last_error or (failed[0] if failed else None),
+        "total_s": finished - started,
+        "extract_s": extracted - started,
+        "analysis_s": finished - extracted,
+        "first_result_s": ttfr,
+    }
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {
+        "p50_s": round(pick(0.5), 4),
+        "p95_s": round(pick(0.95), 4),
+        "p99_s": round(pick(0.99), 4),
+        "max_s": round(values[-1], 4),
+    }
+
+
+def _session_loop(args, session, samples):
+    for iteration in range(args.iterations):
+        try:
+            record = run_session(args, session, iteration)
+        except Exception as e:
+            record = {"session": session, "iteration": iteration, "ok": False, "error": repr(e)}
+        samples.append(record)
+        samples_done = len(samples)
+        if samples_done % max(1, args.sessions) == 0:
+            logger.info("已完成 %d / %d", samples_done, args.sessions * args.iterations)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="JobAlign 并发会话压测")
+    parser.add_argument("--sessions", type=int, default=8, help="并发会话数")
+    parser.add_argument("--iterations", type=int, default=2, help="每个会话的重复次数")
+    parser.add_argument("--jds", type=int, default=3, help="每次会话的 JD 文件数")
+    parser.add_argument("--engine", choices=["single", "map_reduce"], default="single")
+    parser.add_argument("--stream", action="store_true", help="使用流式接口")
+    parser.add_argument("--jd-concurrency", type=int, default=8)
+    parser.add_argument("--extract-workers", type=int, default=2, help="文件解析进程池大小（所有会话共享）")
+    parser.add_argument("--base-url", help="外部 OpenAI 兼容服务地址；不填则在进程内启动替身服务")
+    parser.add_argument("--api-key", default="mock")
+    parser.add_argument("--model", default="deepseek-chat")
+    parser.add_argument("--out", default="load.json", help="结果 JSON 路径")
+    add_option_args(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_workers(args.extract_workers)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    set_error_handler(_capture_error)
+
+    server = None
+    if not args.base_url:
+        server, args.base_url = start_server(options=options_from_args(args))
+        logger.info("已启动替身服务：%s", args.base_url)
+
+    perf_metrics.reset()
+    baseline_rss = rss_mb()
+    peak_rss = baseline_rss
+    samples = []
+    stop = threading.Event()
+
+    def watch_memory():
+        nonlocal peak_rss
+        while not stop.wait(0.2):
+            peak_rss = max(peak_rss, rss_mb())
+
+    watcher = threading.Thread(target=watch_memory, daemon=True)
+    watcher.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        for session in range(args.sessions):
+            executor.submit(_session_loop, args, session, samples)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    watcher.join()
+    peak_rss = max(peak_rss, rss_mb())
+    if server:
+        server.shutdown()
+
+    ok = [s for s in samples if s["ok"]]
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k != "api_key"},
+        },
+        "sessions": args.sessions,
+        "completed": len(samples),
+        "succeeded": len(ok),
+        "failed": len(samples) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(ok) / elapsed, 3) if elapsed else None,
+        "latency": {
+            "total": _percentiles([s["total_s"] for s in ok]),
+            "extract": _percentiles([s["extract_s"] for s in ok]),
+            "analysis": _percentiles([s["analysis_s"] for s in ok]),
+            "first_result": _percentiles([s["first_result_s"] for s in ok if s.get("first_result_s") is not None]),
+        },
+        # 只统计本进程（解析子进程的内存不计入）；按并发会话数均摊
+        "memory": {
+            "baseline_rss_mb": round(baseline_rss, 1),
+            "peak_rss_mb": round(peak_rss, 1),
+            "per_session_mb": round((peak_rss - baseline_rss) / max(1, args.sessions), 2),
+        },
+        "stages": perf_metrics.summary(),
+        "errors": sorted({s["error"] for s in samples if s.get("error")}),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    logger.info("成功 %d / %d，吞吐 %.2f 次/秒，总耗时 p50 %.2fs p95 %.2fs，内存 %.2f MB/会话",
+                report["succeeded"], report["completed"], report["throughput_per_s"] or 0,
+                report["latency"]["total"].get("p50_s", 0), report["latency"]["total"].get("p95_s", 0),
+                report["memory"]["per_session_mb"])
+    logger.info("结果已写入 %s", args.out)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+JobAlign 性能基准（无界面、不调用大模型）
+
+覆盖：
+- DocumentHandler.extract_text：按格式（pdf / docx / txt / image）、语言、大小分别计时
+  （走 extract_text_uncached，避免提取缓存让第二轮以后全部命中）
+- build_messages：analyze_with_llm 的 prompt 组装（含 token 预算裁剪），按 JD 数量分档
+- WordGenerator.create_docx_from_markdown：MOCK_DATA["draft_resume"] 原文及放大后的长稿
+
+示例：
+    python -m benchmarks.run --out bench.json
+    # 与基线比较：任一项中位数慢于基线 25% 以上，或超过 thresholds.json 中的绝对上限，退出码为 1
+    python -m benchmarks.run --baseline bench_main.json --max-regression 0.25
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import MOCK_DATA, build_messages  # noqa: E402
+from benchmarks.corpus import build_corpus, sample_text  # noqa: E402
+from document_handler import ERROR_PREFIX, DocumentHandler, NamedBytesIO  # noqa: E402
+from word_generator import WordGenerator  # noqa: E402
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+logger = logging.getLogger("jobalign.bench")
+
+
+def measure(fn, repeat, warmup=1):
+    """执行 warmup + repeat 次，返回毫秒级统计"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def bench_extraction(repeat):
+    results = {}
+    has_tesseract = shutil.which("tesseract") is not None
+    for name, filename, data in build_corpus():
+        if name.startswith("extract.image.") and not has_tesseract:
+            logger.warning("跳过 %s：未安装 tesseract", name)
+            continue
+
+        def run():
+            text = DocumentHandler.extract_text_uncached(NamedBytesIO(data, filename))
+            if text.startswith(ERROR_PREFIX):
+                raise RuntimeError(f"{name}: {text}")
+            return text
+
+        stats = measure(run, repeat if not name.startswith("extract.image.") else max(1, repeat // 5))
+        stats["bytes"] = len(data)
+        stats["chars"] = len(run())
+        results[name] = stats
+    return results
+
+
+def bench_prompt(repeat, model):
+    results = {}
+    resume = sample_text("zh", 60, seed=10)
+    for count in (1, 5, 20, 50):
+        jd_list = [
+            {"index": i, "title": f"JD_{i}", "text": sample_text("zh" if i % 2 else "en", 80, seed=100 + i)}
+            for i in range(1, count + 1)
+        ]
+        results[f"prompt.build_messages.{count}jd"] = measure(lambda: build_messages(resume, jd_list, model), repeat)
+    return results
+
+
+def bench_docx(repeat):
+    results = {}
+    draft = MOCK_DATA["draft_resume"]
+    for factor in (1, 10, 50):
+        text = "\n\n".join([draft] * factor)
+        stats = measure(lambda: WordGenerator.create_docx_from_markdown(text), repeat)
+        stats["chars"] = len(text)
+        results[f"docx.create.x{factor}"] = stats
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(DEFAULT_THRESHOLDS),
+            capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def check(results, thresholds, baseline, max_regression):
+    """返回不达标项的描述列表：绝对上限（thresholds，fnmatch 模式）与相对基线的回退"""
+    failures = []
+    for name, stats in results.items():
+        median = stats["median_ms"]
+        for pattern, limit in thresholds.items():
+            if fnmatch.fnmatchcase(name, pattern) and median > limit:
+                failures.append(f"{name}: 中位数 {median:.1f}ms 超过上限 {limit}ms（{pattern}）")
+        base = (baseline or {}).get(name)
+        if base and base.get("median_ms"):
+            ratio = median / base["median_ms"] - 1
+            if ratio > max_regression:
+                failures.append(
+                    f"{name}: 中位数 {median:.1f}ms，较基线 {base['median_ms']:.1f}ms 慢 {ratio:.0%}"
+                )
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="JobAlign 性能基准")
+    parser.add_argument("--out", default="bench.json", help="结果 JSON 路径")
+    parser.add_argument("--repeat", type=int, default=10, help="每项重复次数（OCR 项为 1/5）")
+    parser.add_argument("--only", nargs="+", choices=["extract", "prompt", "docx"], help="只运行指定类别")
+    parser.add_argument("--model", default="deepseek-chat", help="prompt 组装使用的模型（决定 token 预算）")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="绝对上限 JSON：{模式: 毫秒}")
+    parser.add_argument("--baseline", help="基线结果 JSON（此前 --out 的输出）")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="相对基线允许的最大变慢比例")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    only = set(args.only or ["extract", "prompt", "docx"])
+
+    results = {}
+    if "extract" in only:
+        results.update(bench_extraction(args.repeat))
+    if "prompt" in only:
+        results.update(bench_prompt(args.repeat, args.model))
+    if "docx" in only:
+        results.update(bench_docx(args.repeat))
+
+    for name, stats in results.items():
+        logger.info("%-32s median %9.3fms  p95 %9.3fms", name, stats["median_ms"], stats["p95_ms"])
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    failures = check(results, thresholds, baseline, args.max_regression)
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "model": args.model,
+        },
+        "results": results,
+        "failures": failures,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info("结果已写入 %s", args.out)
+
+    for failure in failures:
+        logger.error(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
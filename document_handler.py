@@ -0,0 +1,406 @@
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ocr_pipeline
+import perf_metrics
+from docx_stream import extract_docx_text
+from extract_cache import get_extraction_cache
+from startup_timing import lazy_import
+from text_decode import decode_text
+
+ERROR_PREFIX = "Error: 文件解析失败"
+
+# PDF 页级流水线：文字层优先，文字过少的页才做 OCR
+PDF_MAX_PAGES = int(os.environ.get("JOBALIGN_PDF_MAX_PAGES", "50"))
+PDF_MAX_OCR_PAGES = int(os.environ.get("JOBALIGN_PDF_MAX_OCR_PAGES", "20"))
+PDF_MAX_CHARS = int(os.environ.get("JOBALIGN_PDF_MAX_CHARS", "60000"))
+PDF_MIN_PAGE_CHARS = 20
+PDF_OCR_THREADS = 4
+
+DOCX_MAX_CHARS = int(os.environ.get("JOBALIGN_DOCX_MAX_CHARS", "60000"))
+
+# 上传大小限制：超限的文件不做哈希、不送进程池、不解码
+MAX_FILE_BYTES = int(float(os.environ.get("JOBALIGN_MAX_FILE_MB", "20")) * 1024 * 1024)
+MAX_SESSION_UPLOAD_BYTES = int(float(os.environ.get("JOBALIGN_MAX_SESSION_UPLOAD_MB", "50")) * 1024 * 1024)
+# 单张图片（或单帧）像素上限；只读取文件头即可判断，不会先解码整张图
+IMAGE_MAX_PIXELS = int(os.environ.get("JOBALIGN_IMAGE_MAX_PIXELS", str(40 * 1000 * 1000)))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+IMAGE_EXTS = ['png', 'jpg', 'jpeg', 'bmp', 'tiff', 'gif']
+# 输出依赖 OCR 配置的格式：缓存 key 中带上 ocr_pipeline.config_tag()
+OCR_EXTS = {'pdf', *IMAGE_EXTS}
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def check_image_pixels(image):
+    width, height = image.size
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ValueError(
+            f"图片尺寸过大（{width}×{height}），上限 {IMAGE_MAX_PIXELS / 1e6:.0f} 百万像素，请缩小后重试"
+        )
+
+
+class DocumentHandler:
+    @staticmethod
+    def _file_ext(file):
+        filename = getattr(file, "name", "")
+        return filename.split(".")[-1].lower() if "." in filename else ""
+
+    @staticmethod
+    def _read_bytes(file):
+        if hasattr(file, "getvalue"):
+            return file.getvalue()
+        try:
+            file.seek(0)
+        except Exception:
+            pass
+        return file.read()
+
+    @staticmethod
+    def _file_size(file):
+        """seek 到末尾取大小（BytesIO / 普通文件均为 O(1)），不读取内容"""
+        position = file.tell()
+        try:
+            file.seek(0, os.SEEK_END)
+            return file.tell()
+        finally:
+            file.seek(position)
+
+    @staticmethod
+    def _check_size(file):
+        size = DocumentHandler._file_size(file)
+        if size > MAX_FILE_BYTES:
+            raise ValueError(f"文件过大（{_mb(size)}），单个文件上限 {_mb(MAX_FILE_BYTES)}")
+        return size
+
+    @staticmethod
+    def _content_key(cache, file):
+        """
+        内容哈希：BytesIO（含 Streamlit 的 UploadedFile）直接对其内部缓冲区的 memoryview 计算，
+        其他文件对象按块流式读取，都不会复制出整份字节
+        """
+        ext = DocumentHandler._file_ext(file)
+        if ext in OCR_EXTS:
+            ext = f"{ext}:{ocr_pipeline.config_tag()}"
+        if hasattr(file, "getbuffer"):
+            with file.getbuffer() as view:
+                return cache.make_key(view, ext)
+        file.seek(0)
+        return cache.make_key_from_chunks(iter(lambda: file.read(HASH_CHUNK_SIZE), b""), ext)
+
+    @staticmethod
+    def _decode_file(file):
+        """增量解码文本文件，返回 (text, encoding)；编码识别见 text_decode.decode_text"""
+        if hasattr(file, "getbuffer"):
+            with file.getbuffer() as view:
+                return decode_text(view)
+        file.seek(0)
+        return decode_text(file.read())
+
+    @staticmethod
+    def extract_text(file):
+        """
+        带缓存的文本提取：按文件内容哈希命中时直接返回，
+        避免每次 rerun 重复解析 PDF / 重复 OCR
+        """
+        cache = get_extraction_cache()
+        try:
+            DocumentHandler._check_size(file)
+        except ValueError as e:
+            return f"{ERROR_PREFIX} ({str(e)})"
+        try:
+            key = DocumentHandler._content_key(cache, file)
+        except Exception:
+            return DocumentHandler.extract_text_uncached(file)
+
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        text = DocumentHandler.extract_text_uncached(file)
+        # 解析失败的结果不缓存，方便用户修复后重试
+        if not text.startswith(ERROR_PREFIX):
+            cache.put(key, text)
+        return text
+
+    @staticmethod
+    def extract_text_uncached(file):
+        """
+        统一处理 PDF / Word / 文本 / 图片 的文本提取
+        支持：
+        - .pdf
+        - .doc / .docx
+        - .txt
+        - 图片：.png / .jpg / .jpeg / .bmp / .tiff / .gif（通过 OCR 识别）
+        """
+        ext = DocumentHandler._file_ext(file)
+        with perf_metrics.span(f"extract.{ext or 'unknown'}") as attrs:
+            text = DocumentHandler._extract_by_ext(file, ext)
+            attrs["chars"] = len(text)
+            attrs["failed"] = text.startswith(ERROR_PREFIX)
+        return text
+
+    @staticmethod
+    def _extract_by_ext(file, ext):
+        text = ""
+        try:
+            DocumentHandler._check_size(file)
+            # 确保指针在文件开头
+            try:
+                file.seek(0)
+            except Exception:
+                pass
+
+            if ext == 'pdf':
+                text = DocumentHandler._extract_pdf(file)
+
+            elif ext in ['docx', 'doc']:
+                text = DocumentHandler._extract_docx(file)
+
+            elif ext == 'txt':
+                text, _ = DocumentHandler._decode_file(file)
+
+            elif ext in IMAGE_EXTS:
+                # 图片 OCR 识别：直接从上传的文件对象打开，open 只读文件头，每帧解码前先校验像素数
+                image = lazy_import("PIL.Image").open(file)
+                with perf_metrics.span("ocr.image") as attrs:
+                    text, timings = ocr_pipeline.ocr_image(image, check_frame=check_image_pixels)
+                    attrs["frames"] = len(timings)
+                ocr_pipeline.record_timings(timings, "image")
+
+            else:
+                # 兜底：尝试文本方式读取，识别不出编码的二进制内容视为无文本
+                text, encoding = DocumentHandler._decode_file(file)
+                if encoding == "utf-8-replace":
+                    text = ""
+
+            return text
+        except Exception as e:
+            return f"{ERROR_PREFIX} ({str(e)})"
+
+    @staticmethod
+    def _extract_docx(file):
+        """
+        直接流式解析 ZIP 中的 XML（见 docx_stream），包含表格、页眉页脚与文本框，
+        字数达到 DOCX_MAX_CHARS 时提前结束
+        """
+        try:
+            return extract_docx_text(file, DOCX_MAX_CHARS)
+        except zipfile.BadZipFile:
+            raise ValueError("不是 .docx 格式（旧版 .doc 请在 Word 中另存为 .docx 后上传）")
+
+    @staticmethod
+    def _extract_pdf(file):
+        """
+        逐页提取 PDF：
+        1. 先取文字层；累计字数达到 PDF_MAX_CHARS 或页数达到 PDF_MAX_PAGES 时提前结束
+        2. 文字少于 PDF_MIN_PAGE_CHARS 的页视为扫描页，取出页内嵌入的图片并行 OCR
+        """
+        reader = lazy_import("PyPDF2").PdfReader(file)
+        page_count = min(len(reader.pages), PDF_MAX_PAGES)
+        texts = []
+        scanned = []
+        total_chars = 0
+
+        for i in range(page_count):
+            page = reader.pages[i]
+            content = page.extract_text() or ""
+            texts.append(content)
+            if len(content.strip()) < PDF_MIN_PAGE_CHARS:
+                scanned.append(i)
+            total_chars += len(content)
+            if total_chars >= PDF_MAX_CHARS:
+                break
+
+        # 页面图片在主线程取出（PdfReader 非线程安全），OCR 放到线程池（tesseract 是子进程，可真正并行）
+        ocr_jobs = []
+        for i in scanned[:PDF_MAX_OCR_PAGES]:
+            try:
+                images = [img.data for img in reader.pages[i].images]
+            except Exception:
+                images = []
+            if images:
+                ocr_jobs.append((i, images))
+
+        if ocr_jobs:
+            with perf_metrics.span("ocr.pdf_pages", pages=len(ocr_jobs)), \
+                    ThreadPoolExecutor(max_workers=min(PDF_OCR_THREADS, len(ocr_jobs))) as executor:
+                ocr_outputs = executor.map(_ocr_image_bytes_list, [images for _, images in ocr_jobs])
+                for (i, _), (ocr_text, timings) in zip(ocr_jobs, ocr_outputs):
+                    # 计时在本线程登记（子进程内的 capture 只收集提取线程的记录）
+                    ocr_pipeline.record_timings(timings, "pdf_page")
+                    if len(ocr_text.strip()) > len(texts[i].strip()):
+                        texts[i] = ocr_text
+
+        return "\n".join(t.strip("\n") for t in texts if t.strip())
+
+    @staticmethod
+    def extract_many(files, max_total_bytes=None):
+        """
+        多文件并行提取（简历 + 多个 JD 一起 OCR / 解析），进程池大小按进程设定（见 configure_workers）
+        - 先校验大小：单个文件超过 MAX_FILE_BYTES、或按顺序累计超过 max_total_bytes（会话上限）的文件直接报错
+        - 再查缓存，只把未命中的文件提交到进程池
+        - 返回值与输入顺序一致；单个文件失败时对应位置为 "Error: 文件解析失败 (...)"
+        """
+        cache = get_extraction_cache()
+        results = [None] * len(files)
+        pending = []
+        total = 0
+
+        for i, file in enumerate(files):
+            try:
+                size = DocumentHandler._check_size(file)
+                if max_total_bytes is not None and total + size > max_total_bytes:
+                    raise ValueError(f"本次上传文件合计超过 {_mb(max_total_bytes)} 上限，请减少文件数量或压缩后重试")
+                total += size
+                key = DocumentHandler._content_key(cache, file)
+            except Exception as e:
+                results[i] = f"{ERROR_PREFIX} ({str(e)})"
+                continue
+            cached = cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, key, file))
+
+        if not pending:
+            return results
+
+        # 只有一个文件时没必要走进程间通信，直接在原缓冲区上解析
+        if len(pending) == 1:
+            outputs = [_extract_from_file(pending[0][2])]
+        else:
+            # 进程间传递需要 bytes，此时才复制一次
+            outputs = _run_in_pool(
+                [(getattr(file, "name", ""), DocumentHandler._read_bytes(file)) for _, _, file in pending]
+            )
+
+        for (i, key, _), (text, spans) in zip(pending, outputs):
+            perf_metrics.ingest(spans)
+            results[i] = text
+            if not text.startswith(ERROR_PREFIX):
+                cache.put(key, text)
+        return results
+
+
+def _ocr_image_bytes_list(images):
+    """OCR 一页内的所有嵌入图片，返回 (text, 逐帧计时)；单张图片失败不影响其他图片"""
+    image_module = lazy_import("PIL.Image")
+    parts = []
+    timings = []
+    for data in images:
+        try:
+            text, frame_timings = ocr_pipeline.ocr_image(
+                image_module.open(io.BytesIO(data)), check_frame=check_image_pixels
+            )
+        except Exception:
+            continue
+        parts.append(text)
+        timings.extend(frame_timings)
+    return "\n".join(p.strip() for p in parts if p.strip()), timings
+
+
+# ================= 进程池 =================
+
+class NamedBytesIO(io.BytesIO):
+    """带文件名的内存文件，供子进程复用 extract_text_uncached 的扩展名分支"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def _extract_from_file(file):
+    """返回 (text, spans)：子进程内的计时随结果带回主进程登记"""
+    with perf_metrics.capture() as spans:
+        text = DocumentHandler.extract_text_uncached(file)
+    return text, spans
+
+
+def _extract_from_bytes(name, data):
+    return _extract_from_file(NamedBytesIO(data, name))
+
+
+def default_worker_count():
+    """环境变量 JOBALIGN_EXTRACT_WORKERS 可覆盖，默认取 CPU 核数（上限 8）"""
+    env = os.environ.get("JOBALIGN_EXTRACT_WORKERS")
+    if env:
+        return max(1, int(env))
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def configure_workers(workers):
+    """
+    设定本进程的进程池大小（命令行工具在首次解析前调用）；默认取 default_worker_count()
+    进程池由所有会话共享，创建后大小不再改变，返回是否生效
+    """
+    global _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            return False
+        _pool_workers = max(1, int(workers))
+        return True
+
+
+def _get_pool():
+    """进程级共享的有界进程池：首次使用时按设定的大小创建，之后不因任何会话的参数重建"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = _pool_workers or default_worker_count()
+            # Streamlit 服务端是多线程的，避免直接 fork
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    """
+    丢弃已损坏的进程池，下次使用时重建
+    只替换传入的那个池（其他线程可能已经换上新池）；不取消 future：池是共享的，
+    仍可用的任务属于其他会话
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _run_in_pool(items):
+    pool = None
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_from_bytes, name, data) for name, data in items]
+    except (BrokenProcessPool, RuntimeError):
+        # 进程池不可用时退回串行，保证功能可用
+        _discard_pool(pool)
+        return [_extract_from_bytes(name, data) for name, data in items]
+
+    outputs = []
+    for future, (name, data) in zip(futures, items):
+        try:
+            outputs.append(future.result())
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            outputs.append(_extract_from_bytes(name, data))
+        except Exception as e:
+            outputs.append((f"{ERROR_PREFIX} ({str(e)})", []))
+    return outputs
@@ -0,0 +1,121 @@
+import re
+import zipfile
+from xml.etree import ElementTree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_P, _T, _TAB, _BR, _CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+_TBL, _TR, _TC = _W + "tbl", _W + "tr", _W + "tc"
+# 各部件中直接承载段落 / 表格的容器：其子元素处理完即可丢弃，内存只与单个顶层段落 / 表格相关
+_CONTAINERS = {_W + "body", _W + "hdr", _W + "ftr"}
+
+CELL_SEPARATOR = " | "
+
+_PART_NUMBER_RE = re.compile(r"(\d+)\.xml$")
+
+
+def _part_order(name):
+    match = _PART_NUMBER_RE.search(name)
+    return int(match.group(1)) if match else 0
+
+
+def _iter_part_lines(stream):
+    """
+    增量解析一个 WordprocessingML 部件（document / header / footer），逐行产出文本：
+    - 段落一行；表格每行一行，单元格按顺序用 CELL_SEPARATOR 连接（嵌套表格并入所在单元格）
+    - 文本框（w:txbxContent）中的段落按出现位置单独成行；mc:Fallback 是同一文本框的旧格式副本，跳过
+    """
+    paragraphs = []   # 正在解析的段落（文本框段落嵌套在外层段落内，所以是栈）
+    cells = []        # 正在解析的单元格，每个为段落文本列表
+    rows = []         # 正在解析的表格行，每个为单元格文本列表
+    parents = []
+    skip = 0
+
+    def emit(text):
+        # 单元格内的内容并入单元格，否则直接成行
+        if cells:
+            cells[-1].append(text)
+            return None
+        return text
+
+    for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            parents.append(elem)
+            if tag == _MC_FALLBACK:
+                skip += 1
+            elif skip:
+                continue
+            elif tag == _P:
+                paragraphs.append([])
+            elif tag == _TC:
+                cells.append([])
+            elif tag == _TR:
+                rows.append([])
+            continue
+
+        parents.pop()
+        if tag == _MC_FALLBACK:
+            skip -= 1
+        elif skip:
+            pass
+        elif tag == _T and paragraphs:
+            paragraphs[-1].append(elem.text or "")
+        elif tag == _TAB and paragraphs:
+            paragraphs[-1].append("\t")
+        elif tag in (_BR, _CR) and paragraphs:
+            paragraphs[-1].append("\n")
+        elif tag == _P and paragraphs:
+            text = "".join(paragraphs.pop()).strip()
+            if text:
+                line = emit(text)
+                if line is not None:
+                    yield line
+        elif tag == _TC and cells:
+            text = " ".join(cells.pop())
+            if rows and text:
+                rows[-1].append(text)
+        elif tag == _TR and rows:
+            row = rows.pop()
+            if row:
+                line = emit(CELL_SEPARATOR.join(row))
+                if line is not None:
+                    yield line
+
+        # 顶层段落 / 表格处理完后从树上摘掉，避免整份文档的元素常驻内存
+        if parents and parents[-1].tag in _CONTAINERS:
+            parents[-1].clear()
+
+
+def iter_docx_lines(fileobj, max_chars=None):
+    """
+    直接从 .docx（ZIP）中流式读取 XML 提取文本，不构建 python-docx 对象模型
+    顺序：页眉 -> 正文 -> 页脚；页眉 / 页脚在多个节中重复的行只保留一次
+    累计字数达到 max_chars 时提前结束
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        names = set(archive.namelist())
+        if "word/document.xml" not in names:
+            raise ValueError("不是有效的 Word 文档（缺少 word/document.xml）")
+        headers = sorted((n for n in names if re.match(r"word/header\d*\.xml$", n)), key=_part_order)
+        footers = sorted((n for n in names if re.match(r"word/footer\d*\.xml$", n)), key=_part_order)
+
+        seen = set()
+        total = 0
+        for name in headers + ["word/document.xml"] + footers:
+            repeated = name != "word/document.xml"
+            with archive.open(name) as stream:
+                for line in _iter_part_lines(stream):
+                    if repeated:
+                        if line in seen:
+                            continue
+                        seen.add(line)
+                    yield line
+                    total += len(line) + 1
+                    if max_chars is not None and total >= max_chars:
+                        return
+
+
+def extract_docx_text(fileobj, max_chars=None):
+    return "\n".join(iter_docx_lines(fileobj, max_chars))
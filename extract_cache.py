@@ -0,0 +1,203 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# 提取逻辑有变化时递增，旧缓存自动失效
+EXTRACTOR_VERSION = "5"
+
+
+class ExtractionCache:
+    """
+    文本提取结果缓存（按文件内容寻址）
+    - key = sha256(提取器版本 + 扩展名 + 文件字节)
+    - 内存层：按条目数与总字节数限制的 LRU
+    - 磁盘层（可选）：按总字节数淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_bytes=256 * 1024 * 1024,
+                 max_memory_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data, ext=""):
+        """data 可以是 bytes / memoryview（直接对上传缓冲区计算，不复制）"""
+        return ExtractionCache.make_key_from_chunks((data,), ext)
+
+    @staticmethod
+    def make_key_from_chunks(chunks, ext=""):
+        """按块流式计算，与 make_key 对同一内容得到相同的 key"""
+        h = hashlib.sha256()
+        h.update(f"{EXTRACTOR_VERSION}:{ext}:".encode("utf-8"))
+        for chunk in chunks:
+            h.update(chunk)
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        text = self._disk_get(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, text)
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._memory_put(key, text)
+        self._disk_put(key, text)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes or 0,
+            }
+
+    # ---------- 内存层 ----------
+    def _memory_put(self, key, text):
+        # getsizeof 为字符串实际占用（中文按 2 字节 / 字计），O(1)
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= sys.getsizeof(previous)
+        self._memory[key] = text
+        self._memory_bytes += sys.getsizeof(text)
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sys.getsizeof(evicted)
+
+    # ---------- 磁盘层 ----------
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            # 更新 mtime，作为 LRU 淘汰依据
+            os.utime(path)
+            return text
+        except OSError:
+            return None
+
+    def _disk_put(self, key, text):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        data = text.encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        except OSError:
+            return
+
+        with self._lock:
+            # 覆盖同一 key 时先减去旧文件的大小，否则占用只增不减，会过早触发淘汰
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                return
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data) - previous
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _iter_disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".txt"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st_ = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st_.st_size, st_.st_mtime
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._iter_disk_entries())
+
+    def _evict_disk(self):
+        """淘汰到上限的 80%，避免每次写入都触发全量扫描"""
+        entries = sorted(self._iter_disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.8)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """
+    进程级单例（Streamlit 每次 rerun 都会重新执行 app.py，但不会重新导入本模块）
+    环境变量：
+    - JOBALIGN_EXTRACT_CACHE_ENTRIES: 内存层条目上限，默认 128
+    - JOBALIGN_EXTRACT_CACHE_MEMORY_MB: 内存层总大小上限（MB），默认 64
+    - JOBALIGN_EXTRACT_CACHE_DIR: 磁盘层目录，不设置则只用内存
+    - JOBALIGN_EXTRACT_CACHE_MAX_MB: 磁盘层容量上限（MB），默认 256
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(
+                max_entries=int(os.environ.get("JOBALIGN_EXTRACT_CACHE_ENTRIES", "128")),
+                cache_dir=os.environ.get("JOBALIGN_EXTRACT_CACHE_DIR") or None,
+                max_disk_bytes=int(os.environ.get("JOBALIGN_EXTRACT_CACHE_MAX_MB", "256")) * 1024 * 1024,
+                max_memory_bytes=int(os.environ.get("JOBALIGN_EXTRACT_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+            )
+        return _cache
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at        REAL    NOT NULL,
+    owner             TEXT    NOT NULL DEFAULT '',
+    label             TEXT,
+    resume_hash       TEXT    NOT NULL,
+    model             TEXT    NOT NULL,
+    base_url          TEXT,
+    engine            TEXT,
+    prompt_version    TEXT,
+    selected_jd_hash  TEXT,
+    selected_jd_title TEXT,
+    total_score       INTEGER,
+    dimensions        TEXT,
+    metrics           TEXT,
+    result            TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_jds (
+    run_id      INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    jd_index    INTEGER NOT NULL,
+    jd_hash     TEXT    NOT NULL,
+    jd_title    TEXT,
+    match_score INTEGER,
+    PRIMARY KEY (run_id, jd_index)
+);
+"""
+# 索引在补齐旧库缺少的列之后再建
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_owner ON runs(owner, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_resume ON runs(owner, resume_hash, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs(owner, model, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_selected_jd ON runs(owner, selected_jd_hash, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_run_jds_hash ON run_jds(jd_hash, run_id);
+"""
+
+# 列表 / 对比只读这些列，不解析完整结果 JSON
+_SUMMARY_COLUMNS = (
+    "id, created_at, label, resume_hash, model, engine, selected_jd_hash, selected_jd_title, "
+    "total_score, dimensions, metrics"
+)
+
+
+def owner_id(api_key):
+    """
+    历史记录的归属：由用户自己的 API Key 派生（跨标签页 / 会话不变，库中不保存 Key 本身）
+    没有 Key（如演示模式）时返回 None，不记录也不展示历史
+    """
+    if not api_key:
+        return None
+    return hashlib.sha256(f"jobalign-history:{api_key}".encode("utf-8")).hexdigest()
+
+
+class HistoryStore:
+    """
+    分析历史（本地 SQLite）：每次实际调用模型得到的结果记一行
+    - 每条记录属于一个 owner（见 owner_id）；所有读取 / 删除都限定在调用方自己的记录内
+    - 按简历哈希 / JD 哈希 / 模型 / 时间建索引，列表与对比只读摘要列
+    - 完整结果 JSON 与各阶段耗时一起保存，载入历史结果不需要再调用模型
+    - 每个 owner 超过 max_runs 条时删除其最早的记录
+    """
+
+    def __init__(self, path, max_runs=1000):
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 多个会话线程共用一个连接，由 _lock 串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(runs)")}
+            if "owner" not in columns:
+                # 旧库升级：已有记录没有归属，之后对任何人都不可见
+                self._conn.execute("ALTER TABLE runs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+                for index in ("idx_runs_resume", "idx_runs_model", "idx_runs_selected_jd"):
+                    self._conn.execute(f"DROP INDEX IF EXISTS {index}")
+            self._conn.executescript(_INDEXES)
+
+    def add_run(self, result, owner, resume_hash, model, base_url="", engine="", prompt_version="", label="",
+                metrics=None):
+        """记录一次分析；result 需已由 annotate_result 标注 jd_hash。返回记录 ID"""
+        if not owner:
+            raise ValueError("历史记录必须指定 owner")
+        overview = result.get("target_jd_overview") or []
+        selected = next((item for item in overview if item.get("jd_index") == result.get("selected_jd_index")), {})
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (created_at, owner, label, resume_hash, model, base_url, engine, prompt_version, "
+                "selected_jd_hash, selected_jd_title, total_score, dimensions, metrics, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), owner, label, resume_hash, model or "", base_url or "", engine, prompt_version,
+                    selected.get("jd_hash"), selected.get("jd_title"),
+                    _as_int(result.get("total_score")),
+                    json.dumps(result.get("dimensions") or {}, ensure_ascii=False),
+                    json.dumps(metrics or {}, ensure_ascii=False),
+                    json.dumps(result, ensure_ascii=False),
+                )
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO run_jds (run_id, jd_index, jd_hash, jd_title, match_score) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run_id, item.get("source_index", item["jd_index"]), item["jd_hash"], item.get("jd_title"),
+                     _as_int(item.get("match_score")))
+                    for item in overview if isinstance(item.get("jd_index"), int) and item.get("jd_hash")
+                ]
+            )
+            self._prune(owner)
+        return run_id
+
+    def recent(self, owner, limit=50, resume_hash=None, jd_hash=None, model=None):
+        """
+        owner 最近的记录摘要（新的在前），可再按简历 / JD（任一候选 JD）/ 模型过滤
+        返回 [dict]，dimensions / metrics 已解析
+        """
+        if not owner:
+            return []
+        clauses, params = ["owner = ?"], [owner]
+        if resume_hash:
+            clauses.append("resume_hash = ?")
+            params.append(resume_hash)
+        if jd_hash:
+            clauses.append("id IN (SELECT run_id FROM run_jds WHERE jd_hash = ?)")
+            params.append(jd_hash)
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM runs WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT ?",
+                params + [int(limit)]
+            ).fetchall()
+        return [_summary(row) for row in rows]
+
+    def get_result(self, run_id, owner):
+        """不属于 owner 的记录与不存在的记录一样返回 None"""
+        if not owner:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM runs WHERE id = ? AND owner = ?", (run_id, owner)
+            ).fetchone()
+        return json.loads(row["result"]) if row else None
+
+    def compare(self, run_ids, owner):
+        """
+        owner 的多次分析的总分与各维度对比（按给定顺序，不属于 owner 的 ID 被忽略）：
+        返回 (摘要列表, [{"维度": 名称, run_id: 分数, ..., "变化": 末次 - 首次}])
+        """
+        if not run_ids or not owner:
+            return [], []
+        placeholders = ", ".join("?" for _ in run_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM runs WHERE owner = ? AND id IN ({placeholders})",
+                [owner] + list(run_ids)
+            ).fetchall()
+        by_id = {row["id"]: _summary(row) for row in rows}
+        runs = [by_id[run_id] for run_id in run_ids if run_id in by_id]
+
+        names = ["总分"]
+        for run in runs:
+            names.extend(name for name in run["dimensions"] if name not in names)
+        table = []
+        for name in names:
+            row = {"维度": name}
+            values = []
+            for run in runs:
+                value = run["total_score"] if name == "总分" else _as_int(run["dimensions"].get(name))
+                row[f"#{run['id']}"] = value
+                values.append(value)
+            known = [v for v in values if v is not None]
+            row["变化"] = (values[-1] - values[0]) if len(known) == len(values) and len(values) > 1 else None
+            table.append(row)
+        return runs, table
+
+    def delete(self, run_id, owner):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runs WHERE id = ? AND owner = ?", (run_id, owner))
+
+    def count(self, owner):
+        if not owner:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM runs WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def _prune(self, owner):
+        self._conn.execute(
+            "DELETE FROM runs WHERE id IN "
+            "(SELECT id FROM runs WHERE owner = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (owner, self.max_runs)
+        )
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _summary(row):
+    run = dict(row)
+    run["dimensions"] = json.loads(run["dimensions"] or "{}")
+    run["metrics"] = json.loads(run["metrics"] or "{}")
+    return run
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """
+    进程级单例
+    环境变量：
+    - JOBALIGN_HISTORY_DB: SQLite 文件路径，默认 ~/.cache/jobalign/history.sqlite3
+    - JOBALIGN_HISTORY_MAX_RUNS: 每个用户最多保留的记录数，默认 1000
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(
+                path=os.environ.get("JOBALIGN_HISTORY_DB")
+                or os.path.join(os.path.expanduser("~"), ".cache", "jobalign", "history.sqlite3"),
+                max_runs=int(os.environ.get("JOBALIGN_HISTORY_MAX_RUNS", "1000")),
+            )
+        return _store
@@ -0,0 +1,118 @@
+import math
+import re
+
+import numpy as np
+from scipy import sparse
+
+# 中文连续片段 / 英文数字词（保留 c++、c#、.net、node.js 这类写法）
+_SEGMENT_RE = re.compile(r"[一-鿿]+|[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text, ngram_range=(2, 3)):
+    """
+    中英混合的字符 n-gram 切分（无需分词词典）
+    - 中文片段：按字切 2~3 gram，长度为 1 的片段保留单字
+    - 英文 / 数字：保留整词，并补充带边界符的字符 3-gram，容忍 python3 / pythonic 这类变体
+    """
+    tokens = []
+    low, high = ngram_range
+    for seg in _SEGMENT_RE.findall(text.lower()):
+        if "一" <= seg[0] <= "鿿":
+            if len(seg) < low:
+                tokens.append(seg)
+                continue
+            for n in range(low, high + 1):
+                tokens.extend(seg[i:i + n] for i in range(len(seg) - n + 1))
+        else:
+            seg = seg.rstrip(".")
+            if not seg:
+                continue
+            tokens.append(seg)
+            if len(seg) > 3:
+                padded = f"<{seg}>"
+                tokens.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return tokens
+
+
+class JDRanker:
+    """
+    本地 JD 预排序：BM25 加权的稀疏矩阵 + 余弦相似度，不调用大模型
+    用法：
+        ranker = JDRanker([jd["text"] for jd in jd_entries])
+        scores = ranker.score(resume_text)   # 与输入顺序一致的 0~1 分数
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+
+        rows, cols = [], []
+        for row, doc in enumerate(documents):
+            for tok in tokenize(doc):
+                col = self.vocab.setdefault(tok, len(self.vocab))
+                rows.append(row)
+                cols.append(col)
+
+        n_docs = len(documents)
+        tf = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_docs, max(1, len(self.vocab)))
+        )
+        tf.sum_duplicates()
+
+        # idf：BM25 的平滑形式，始终为正
+        df = np.bincount(tf.indices, minlength=tf.shape[1])
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # tf 饱和 + 文档长度归一
+        doc_len = np.asarray(tf.sum(axis=1)).ravel()
+        avg_len = doc_len.mean() if n_docs else 0.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len) if avg_len else np.ones(n_docs)
+        row_norm = np.repeat(norm, np.diff(tf.indptr)).astype(np.float32)
+        tf.data = tf.data * (self.k1 + 1) / (tf.data + row_norm)
+        weighted = tf.multiply(self.idf).tocsr()
+
+        self.matrix = _l2_normalize(weighted)
+
+    def query_vector(self, text):
+        counts = {}
+        for tok in tokenize(text):
+            col = self.vocab.get(tok)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+        if not counts:
+            return None
+        cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        data = (1 + np.log(tf)) * self.idf[cols]
+        vec = sparse.csr_matrix((data, (np.zeros_like(cols), cols)), shape=(1, self.matrix.shape[1]))
+        return _l2_normalize(vec)
+
+    def score(self, text):
+        """返回每个 JD 与 text 的余弦相似度（numpy 数组，顺序与构造时一致）"""
+        vec = self.query_vector(text)
+        if vec is None or self.matrix.shape[0] == 0:
+            return np.zeros(self.matrix.shape[0], dtype=np.float32)
+        return np.asarray((self.matrix @ vec.T).todense()).ravel()
+
+
+def _l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def rank_jds(resume, jd_entries, top_k=None):
+    """
+    对 JD 按与简历的本地相似度排序
+    返回 [(jd_entry, score), ...]，score 为 0~100 的整数化分数；top_k 为空时返回全部
+    """
+    if not jd_entries:
+        return []
+    ranker = JDRanker([jd.get("text", "") for jd in jd_entries])
+    scores = ranker.score(resume)
+    order = np.argsort(-scores, kind="stable")
+    if top_k:
+        order = order[:top_k]
+    return [(jd_entries[i], int(math.floor(float(scores[i]) * 100 + 0.5))) for i in order]
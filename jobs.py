@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from analyzer import (
+    PROMPT_VERSION,
+    TEMPERATURE,
+    analyze_with_llm,
+    analyze_with_llm_map_reduce_stream,
+    analyze_with_llm_stream,
+    RESULT_FIELDS,
+    annotate_result,
+    engine_tag,
+    missing_fields,
+    resolve_section_models,
+    tag_source_index,
+    thread_error_handler,
+)
+from history_store import get_history_store, owner_id
+from result_cache import get_result_cache, make_result_key, text_hash
+from single_flight import get_single_flight
+
+logger = logging.getLogger("jobalign.jobs")
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+STATUS_LABELS = {
+    QUEUED: "⏳ 排队中",
+    RUNNING: "🔄 分析中",
+    DONE: "✅ 已完成",
+    FAILED: "❌ 失败",
+    CANCELLED: "⛔ 已取消",
+}
+
+# 已结束的任务保留一段时间供查看，超出数量或时间后清理
+MAX_FINISHED_JOBS = 200
+FINISHED_JOB_TTL_SECONDS = 3600
+
+
+class Job:
+    """
+    一个后台分析任务；字段由工作线程写入、界面线程只读
+    partial 为流式产出的字段（分析中即可预览），result 为最终完整结果
+    """
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.errors = []
+        self.cached = False
+        # 与其他会话的相同请求合并、未单独调用模型
+        self.coalesced = False
+        self.usage = {}
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobManager:
+    """
+    进程级共享的任务池：所有会话的分析都提交到同一个有界线程池
+    脚本 rerun 不影响在途任务；会话只保存任务 ID，按需轮询状态
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobalign-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label, fn, *args, **kwargs):
+        """fn(job, *args, **kwargs) 返回最终结果；返回任务 ID"""
+        job = Job(label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids):
+        """按给定顺序返回仍存在的任务（已被清理的 ID 会被跳过）"""
+        with self._lock:
+            return [self._jobs[i] for i in job_ids if i in self._jobs]
+
+    def cancel(self, job_id):
+        """排队中的任务直接取消；运行中的任务设置取消标记，由分析流程在下一个数据块处停止"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            with thread_error_handler(job.errors.append):
+                result = fn(job, *args, **kwargs)
+        except Exception as e:
+            result = None
+            job.errors.append(f"任务异常: {e}")
+
+        job.finished_at = time.time()
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+        elif result:
+            job.result = result
+            job.status = DONE
+        else:
+            job.error = job.errors[-1] if job.errors else "分析失败"
+            job.status = FAILED
+        # 流式预览只在运行中使用，结束后释放
+        job.partial = {}
+
+    def _prune(self):
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at or job.created_at
+        )
+        expired = [job for job in finished if now - (job.finished_at or now) > FINISHED_JOB_TTL_SECONDS]
+        overflow = finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]
+        for job in expired + overflow:
+            self._jobs.pop(job.id, None)
+
+
+def run_analysis(job, api_key, base_url, model, resume, jd_list, map_reduce=False, stream=True,
+                 force_refresh=False, previous=None, section_models=None, model_limits=None):
+    """
+    后台分析任务：先查结果缓存；未命中时加入 single-flight，
+    其他会话正在进行的相同分析（同一缓存 key 且同一 API Key）直接合并等待，不重复调用模型
+    previous: 本会话上一次的结果，分阶段引擎据此只重算变化的 JD（force_refresh 时忽略）
+    section_models: 分阶段引擎的深度分析按分区并行生成并按分区路由模型（见 analyzer.DEEP_SECTIONS）
+    model_limits: 本会话自定义的模型上下文 / 输出上限（token_budget.model_limit_overrides），随调用传入
+    流式字段实时出现在 job.partial；返回完整结果，失败或取消时返回 None
+    """
+    section_models = resolve_section_models(model, section_models) if map_reduce else None
+    engine = engine_tag("map_reduce" if map_reduce else "single", section_models, model_limits)
+    cache = get_result_cache()
+    cache_key = make_result_key(base_url, model, PROMPT_VERSION, TEMPERATURE, engine, resume, jd_list)
+    if not force_refresh:
+        result = cache.get(cache_key)
+        if result is not None and missing_fields(result, RESULT_FIELDS):
+            # 不完整的旧缓存条目：删除后重新分析
+            cache.invalidate(cache_key)
+            result = None
+        if result is not None:
+            job.cached = True
+            return annotate_result(result, base_url, model, resume, jd_list, section_models, model_limits)
+
+    # 合并 key 带上 API Key 的哈希：不同用户的请求不会借用彼此的 Key / 额度，也不会共享对方的鉴权错误
+    flight_key = f"{cache_key}:{hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]}"
+    single_flight = get_single_flight()
+    flight, leader = single_flight.join(flight_key, lambda f: _analyze_flight(
+        f, api_key, base_url, model, resume, jd_list, map_reduce, stream, cache, cache_key,
+        None if force_refresh else previous, job.label, section_models, engine, model_limits
+    ))
+    job.coalesced = not leader
+    # 共享同一个 dict：执行方写入的字段所有等待方都能实时预览
+    job.partial = flight.partial
+    if leader:
+        job.usage = flight.usage
+    try:
+        result = flight.wait(job.cancel_event)
+    finally:
+        single_flight.leave(flight)
+    if result is None and flight.error:
+        job.errors.append(flight.error)
+    return result
+
+
+def _analyze_flight(flight, api_key, base_url, model, resume, jd_list, map_reduce, stream, cache, cache_key,
+                    previous=None, label="", section_models=None, engine="", model_limits=None):
+    """
+    single-flight 中实际调用模型的部分（在独立线程执行，错误记录到 flight.error）
+    成功后写入结果缓存与分析历史（每次实际调用模型只记一次）；
+    缺少 RESULT_FIELDS 中任一字段的结果按失败处理（返回 None），不写缓存 / 历史
+    """
+    started = time.perf_counter()
+    timings = {}
+    errors = []
+    with thread_error_handler(errors.append):
+        if map_reduce:
+            events = analyze_with_llm_map_reduce_stream(api_key, base_url, model, resume, jd_list, stream=stream,
+                                                        usage=flight.usage, cancel=flight.cancel,
+                                                        previous=previous, section_models=section_models,
+                                                        model_limits=model_limits)
+        elif stream:
+            events = analyze_with_llm_stream(api_key, base_url, model, resume, jd_list, usage=flight.usage,
+                                             cancel=flight.cancel, model_limits=model_limits)
+        else:
+            events = [(None, analyze_with_llm(api_key, base_url, model, resume, jd_list, usage=flight.usage,
+                                              model_limits=model_limits))]
+
+        result = None
+        for key, value in events:
+            if key is None:
+                result = value
+                break
+            timings.setdefault("first_field_s", time.perf_counter() - started)
+            if map_reduce and key == "selected_jd_index":
+                # 分阶段引擎：此时逐个 JD 打分已结束，之后为深度分析
+                timings["scoring_s"] = time.perf_counter() - started
+            if key == "target_jd_overview":
+                # 预览中也按原序号展示
+                tag_source_index(value, jd_list)
+            flight.partial[key] = value
+
+    missing = missing_fields(result, RESULT_FIELDS) if result else []
+    if missing and not flight.cancel.is_set():
+        errors.append(f"模型输出不完整：缺少字段 {', '.join(missing)}，结果未保存，请重试。")
+    if missing:
+        result = None
+    if errors:
+        flight.error = errors[-1]
+    annotate_result(result, base_url, model, resume, jd_list, section_models, model_limits)
+    if result and not flight.cancel.is_set():
+        cache.put(cache_key, result, flight.usage)
+        elapsed = time.perf_counter() - started
+        if "scoring_s" in timings:
+            timings["deep_s"] = elapsed - timings["scoring_s"]
+        metrics = {"elapsed_s": elapsed, "stream": stream, "jds": len(jd_list), **timings, **flight.usage}
+        try:
+            # 合并 key 含 API Key，合并等待的各方与执行方是同一 owner
+            get_history_store().add_run(
+                result, owner_id(api_key), text_hash(resume), model, base_url,
+                engine=engine,
+                prompt_version=result["analysis_basis"]["prompt_version"],
+                label=label, metrics={k: round(v, 3) if isinstance(v, float) else v for k, v in metrics.items()}
+            )
+        except Exception as e:
+            # 历史记录失败不影响本次分析结果
+            logger.warning("写入分析历史失败：%s", e)
+    return result
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    进程级单例
+    环境变量 JOBALIGN_JOB_WORKERS: 同时运行的分析任务数，默认 4（其余排队）
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(max_workers=max(1, int(os.environ.get("JOBALIGN_JOB_WORKERS", "4"))))
+        return _manager
@@ -0,0 +1,144 @@
+import json
+
+
+class IncrementalJSONObjectParser:
+    """
+    流式 JSON 对象解析器：逐块喂入模型输出，
+    每当最外层对象的某个字段值完整时，立即产出 (key, value)
+
+    用法：
+        parser = IncrementalJSONObjectParser()
+        for chunk in stream:
+            for key, value in parser.feed(chunk):
+                ...
+        result = parser.close()     # 流被截断时为 None，parser.fields 中的字段仅供预览
+    """
+
+    def __init__(self):
+        # 收到的块按列表保存，不做字符串拼接（长输出逐块 += 是平方复杂度）
+        self._chunks = []
+        self._length = 0
+        self._start = None        # 最外层对象在全文中的起止位置
+        self._end = None
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # 最外层对象内的状态：key -> colon -> value -> comma -> key ...
+        self._expect = "key"
+        # 正在读取的 key / value：之前各块中的片段 + 在当前块中的起始下标
+        self._token = None
+        self._token_from = 0
+        self._key = None
+        self.fields = {}
+
+    def _begin(self, i):
+        self._token = []
+        self._token_from = i
+
+    def _take(self, chunk, end):
+        raw = "".join(self._token) + chunk[self._token_from:end]
+        self._token = None
+        return raw
+
+    def feed(self, chunk):
+        if not chunk or self._done:
+            return []
+        self._chunks.append(chunk)
+        offset = self._length
+        self._length += len(chunk)
+        completed = []
+        i = 0
+
+        while i < len(chunk):
+            ch = chunk[i]
+
+            if not self._started:
+                # 跳过对象开始前的杂质（例如 ```json 代码块标记）
+                if ch == "{":
+                    self._started = True
+                    self._start = offset + i
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key_end":
+                        self._key = json.loads(self._take(chunk, i + 1))
+                        self._expect = "colon"
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect == "key":
+                        self._begin(i)
+                        self._expect = "key_end"
+                    elif self._expect == "value":
+                        self._begin(i)
+                        self._expect = "value_end"
+            elif ch in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._begin(i)
+                    self._expect = "value_end"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(self._take(chunk, i) if self._expect == "value_end" else None, completed)
+                    self._done = True
+                    self._end = offset + i + 1
+                    return completed
+            elif self._depth == 1:
+                if ch == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif ch == ",":
+                    self._emit(self._take(chunk, i) if self._expect == "value_end" else None, completed)
+                    self._expect = "key"
+                elif not ch.isspace() and self._expect == "value":
+                    # 数字 / true / false / null
+                    self._begin(i)
+                    self._expect = "value_end"
+            i += 1
+
+        # 跨块的 key / value：把本块中的部分存起来，下一块从头接着读
+        if self._token is not None:
+            self._token.append(chunk[self._token_from:])
+            self._token_from = 0
+        return completed
+
+    def _emit(self, raw, completed):
+        if raw is None or self._key is None:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._key = None
+
+    @property
+    def text(self):
+        return "".join(self._chunks)
+
+    def close(self):
+        """
+        流结束后返回完整对象
+        最外层对象没有闭合（流被截断）或整体不是合法 JSON 时返回 None，不把部分字段当作成功结果；
+        已解析出的字段仍可从 fields 读取，仅用于预览
+        """
+        if not self._done:
+            return None
+        try:
+            return json.loads(self.text[self._start:self._end])
+        except ValueError:
+            return None
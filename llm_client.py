@@ -0,0 +1,361 @@
+import asyncio
+import email.utils
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from startup_timing import lazy_import
+from token_budget import estimate_tokens
+
+# 连接池：同一 (base_url, api_key) 复用客户端与 keep-alive 连接
+MAX_POOLED_CLIENTS = 64
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE = 16
+HTTP_KEEPALIVE_EXPIRY = 60
+HTTP_TIMEOUT_SECONDS = 120.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+
+# 重试：指数退避 + 全抖动，优先遵循服务端 Retry-After
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# 限流估算时为输出预留的 token
+COMPLETION_TOKENS_ESTIMATE = 2000
+
+
+# ================= 客户端池 =================
+
+class _PooledClient:
+    """池中的客户端与在途请求数；被挤出池后等最后一个请求结束再关闭"""
+
+    def __init__(self, client):
+        self.client = client
+        self.leases = 0
+        self.retired = False
+
+
+_clients = OrderedDict()
+_async_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _close_client(client):
+    if isinstance(client, lazy_import("openai").AsyncOpenAI):
+        # 异步客户端的连接绑定在后台事件循环上，只能在该循环中关闭；不等待结果
+        asyncio.run_coroutine_threadsafe(client.close(), _get_loop())
+    else:
+        client.close()
+
+
+def _lease(pool, key, factory):
+    """取出（或创建）客户端并登记一次在途使用，用完必须调用 _release"""
+    evicted = []
+    with _clients_lock:
+        entry = pool.get(key)
+        if entry is None:
+            entry = _PooledClient(factory())
+            pool[key] = entry
+        pool.move_to_end(key)
+        entry.leases += 1
+        # 超出上限时移出最久未用的客户端：空闲的立即关闭，仍有请求在用的由最后一个请求结束时关闭
+        while len(pool) > MAX_POOLED_CLIENTS:
+            _, old = pool.popitem(last=False)
+            old.retired = True
+            if old.leases == 0:
+                evicted.append(old.client)
+    for client in evicted:
+        _close_client(client)
+    return entry
+
+
+def _release(entry):
+    with _clients_lock:
+        entry.leases -= 1
+        idle_retired = entry.retired and entry.leases == 0
+    if idle_retired:
+        _close_client(entry.client)
+
+
+class _LeasedStream:
+    """流式响应：读完、出错或被关闭时才归还客户端（连接在整个流期间都在使用）"""
+
+    def __init__(self, stream, entry):
+        self._stream = stream
+        self._entry = entry
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            try:
+                self._stream.close()
+            finally:
+                _release(entry)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _http_options():
+    httpx = lazy_import("httpx")
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+    }
+
+
+def _lease_client(api_key, base_url):
+    # openai 在首次分析时才导入；SDK 自带重试关掉，统一走下面带限流的重试逻辑
+    return _lease(_clients, (base_url, api_key), lambda: lazy_import("openai").OpenAI(
+        api_key=api_key,
+        base_url=base_url or None,
+        max_retries=0,
+        http_client=lazy_import("httpx").Client(**_http_options())
+    ))
+
+
+def _lease_async_client(api_key, base_url):
+    """异步客户端只在后台事件循环（run_async）中使用，连接与该循环绑定"""
+    return _lease(_async_clients, (base_url, api_key), lambda: lazy_import("openai").AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url or None,
+        max_retries=0,
+        http_client=lazy_import("httpx").AsyncClient(**_http_options())
+    ))
+
+
+# ================= 后台事件循环 =================
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="jobalign-llm-loop", daemon=True).start()
+        return _loop
+
+
+def run_async(coro):
+    """
+    在进程级常驻事件循环中执行协程并等待结果
+    （每次 asyncio.run 都会新建循环，异步连接无法跨循环复用）
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+# ================= 令牌桶限流 =================
+
+class _TokenBucket:
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        # 单次需求超过桶容量时按满桶处理，避免永远等不到
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    RPM / TPM 双令牌桶，进程内使用同一 (base_url, API Key) 的所有会话与批量任务共享
+    rpm / tpm 为 None 表示不限制
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self._requests = _TokenBucket(rpm) if rpm else None
+        self._tokens = _TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens):
+        """拿到配额返回 0，否则返回建议等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens:
+                wait = max(wait, self._tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if self._requests:
+                self._requests.take(1)
+            if self._tokens:
+                self._tokens.take(tokens)
+            return 0.0
+
+    def acquire(self, tokens=0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(min(wait, 5.0))
+
+    async def acquire_async(self, tokens=0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, 5.0))
+
+
+# 按 Key 建的限流器数量上限：最久未用的被移除（重新创建时配额回满）
+MAX_RATE_LIMITERS = 1024
+_limiters = OrderedDict()
+_limit_overrides = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_limit(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def _key_hash(api_key):
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def get_rate_limiter(base_url, api_key):
+    """
+    按 (base_url, API Key 哈希) 共享限流器：服务商的 RPM / TPM 配额按 Key 计算，
+    各自带 Key 的用户互不占用对方的额度；共用同一个 Key 的会话与批量任务共享一个配额
+    环境变量 JOBALIGN_RPM / JOBALIGN_TPM 设置每个 Key 的默认上限；set_rate_limits 可按服务商单独设置
+    """
+    key = (base_url, _key_hash(api_key))
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            rpm, tpm = _limit_overrides.get(base_url, (_env_limit("JOBALIGN_RPM"), _env_limit("JOBALIGN_TPM")))
+            limiter = RateLimiter(rpm, tpm)
+            _limiters[key] = limiter
+        _limiters.move_to_end(key)
+        while len(_limiters) > MAX_RATE_LIMITERS:
+            _limiters.popitem(last=False)
+        return limiter
+
+
+def set_rate_limits(base_url, rpm=None, tpm=None):
+    """为某个服务商设置每个 Key 的上限，已创建的限流器随之重建"""
+    with _limiters_lock:
+        _limit_overrides[base_url] = (rpm, tpm)
+        for key in [key for key in _limiters if key[0] == base_url]:
+            del _limiters[key]
+
+
+# ================= 重试 =================
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def _is_retryable(error):
+    openai = lazy_import("openai")
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+def _backoff_seconds(error, attempt):
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        return min(BACKOFF_MAX_SECONDS, retry_after) + random.uniform(0, 0.5)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _request_tokens(kwargs):
+    prompt = sum(estimate_tokens(m.get("content", "")) for m in kwargs.get("messages", []))
+    return prompt + COMPLETION_TOKENS_ESTIMATE
+
+
+def chat_completion(api_key, base_url, **kwargs):
+    """带限流与重试的 chat.completions.create（流式请求只在拿到首包前重试）"""
+    entry = _lease_client(api_key, base_url)
+    try:
+        limiter = get_rate_limiter(base_url, api_key)
+        tokens = _request_tokens(kwargs)
+        for attempt in range(MAX_ATTEMPTS):
+            limiter.acquire(tokens)
+            try:
+                response = entry.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                time.sleep(_backoff_seconds(e, attempt))
+                continue
+            if kwargs.get("stream"):
+                # 流由调用方读取，客户端在流结束时再归还
+                stream, entry = _LeasedStream(response, entry), None
+                return stream
+            return response
+    finally:
+        if entry is not None:
+            _release(entry)
+
+
+async def achat_completion(api_key, base_url, **kwargs):
+    """异步版本，需在 run_async 的事件循环中调用（不支持流式）"""
+    entry = _lease_async_client(api_key, base_url)
+    try:
+        limiter = get_rate_limiter(base_url, api_key)
+        tokens = _request_tokens(kwargs)
+        for attempt in range(MAX_ATTEMPTS):
+            await limiter.acquire_async(tokens)
+            try:
+                return await entry.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                await asyncio.sleep(_backoff_seconds(e, attempt))
+    finally:
+        _release(entry)
@@ -0,0 +1,275 @@
+"""
+本地 OpenAI 兼容的 chat.completions 替身服务（压测 / 离线联调用，不消耗 API 额度）
+
+按 system 提示词返回与 MOCK_DATA 同结构的合法 JSON：
+- SYSTEM_PROMPT：完整结果，target_jd_overview 按用户消息中的 JD 数量生成
+- JD_SCORE_PROMPT：单个 JD 的 match_score / recommendation_level / short_comment
+- DEEP_ANALYSIS_PROMPT：不含多 JD 概览的深度字段
+- SECTION_PROMPTS：对应分区的深度字段
+支持流式（SSE，含 stream_options.include_usage）、可配置延迟，以及 5xx / 429 / 流中断注入。
+
+示例：
+    python mock_llm_server.py --port 8765 --ttft 0.3 --latency 2 --rate-limit-rate 0.05
+    # 界面选择「OpenAI / 其他」，Base URL 填 http://127.0.0.1:8765/v1，API Key 任意
+"""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analyzer import DEEP_ANALYSIS_PROMPT, DEEP_SECTIONS, JD_SCORE_PROMPT, MOCK_DATA, SECTION_PROMPTS
+from token_budget import estimate_tokens
+
+logger = logging.getLogger("jobalign.mock_llm")
+
+_JD_MARKER_RE = re.compile(r"<<<JD_(\d+) - (.*?)>>>")
+_LEVELS = [(85, "强烈推荐"), (75, "可重点考虑"), (60, "可尝试"), (0, "不推荐")]
+_OVERVIEW_FIELDS = ("target_jd_overview", "selected_jd_index")
+
+
+class MockOptions:
+    def __init__(self, ttft=0.2, latency=1.0, jitter=0.2, chunk_chars=24, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1.0, disconnect_rate=0.0, seed=None):
+        self.ttft = ttft                          # 首包延迟（秒）
+        self.latency = latency                    # 首包之后的生成耗时（秒），流式时均摊到各 chunk
+        self.jitter = jitter                      # 延迟随机浮动比例
+        self.chunk_chars = chunk_chars            # 流式每个 chunk 的字符数
+        self.error_rate = error_rate              # 返回 500 的比例
+        self.rate_limit_rate = rate_limit_rate    # 返回 429 的比例
+        self.retry_after = retry_after            # 429 的 Retry-After（秒）
+        self.disconnect_rate = disconnect_rate    # 流式输出中途断开的比例
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self, rate):
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def delay(self, seconds):
+        if seconds <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, seconds * factor)
+
+
+def _stable_score(text):
+    """同一内容总是得到同一分数，保证重复运行结果一致"""
+    return 55 + int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % 41
+
+
+def _level(score):
+    return next(label for threshold, label in _LEVELS if score >= threshold)
+
+
+def _score_result(user_content):
+    score = _stable_score(user_content)
+    return {
+        "match_score": score,
+        "recommendation_level": _level(score),
+        "short_comment": "（模拟）岗位要求与简历中的项目经历部分重合，可针对差距项补充量化成果。",
+    }
+
+
+def _full_result(user_content):
+    jds = _JD_MARKER_RE.findall(user_content) or [("1", "JD_1")]
+    overview = []
+    for index, title in jds:
+        score = _stable_score(f"{title}\n{user_content}")
+        overview.append({
+            "jd_index": int(index),
+            "jd_title": title,
+            "match_score": score,
+            "recommendation_level": _level(score),
+            "short_comment": "（模拟）根据简历关键词与 JD 要求的重合度给出的示例点评。",
+        })
+    result = dict(MOCK_DATA)
+    result["target_jd_overview"] = overview
+    result["selected_jd_index"] = max(overview, key=lambda item: (item["match_score"], -item["jd_index"]))["jd_index"]
+    return result
+
+
+_SECTION_BY_PROMPT = {prompt: section for section, prompt in SECTION_PROMPTS.items()}
+
+
+def build_content(messages):
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    if system == JD_SCORE_PROMPT:
+        result = _score_result(user)
+    elif system == DEEP_ANALYSIS_PROMPT:
+        result = {k: v for k, v in MOCK_DATA.items() if k not in _OVERVIEW_FIELDS}
+    elif system in _SECTION_BY_PROMPT:
+        result = {k: MOCK_DATA[k] for k in DEEP_SECTIONS[_SECTION_BY_PROMPT[system]] if k in MOCK_DATA}
+    else:
+        result = _full_result(user)
+    return json.dumps(result, ensure_ascii=False), sum(estimate_tokens(m.get("content", "")) for m in messages)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = MockOptions()
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, error_type, headers=None):
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": status}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "jobalign"}]})
+        else:
+            self._send_error(404, "not found", "invalid_request_error")
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_error(404, "not found", "invalid_request_error")
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._send_error(400, "invalid JSON body", "invalid_request_error")
+            return
+
+        options = self.options
+        if options.roll(options.rate_limit_rate):
+            self._send_error(429, "Rate limit reached (mock)", "rate_limit_error",
+                             {"Retry-After": f"{options.retry_after:g}"})
+            return
+        if options.roll(options.error_rate):
+            self._send_error(500, "Internal server error (mock)", "server_error")
+            return
+
+        content, prompt_tokens = build_content(request.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content),
+        }
+        meta = {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+        }
+
+        time.sleep(options.delay(options.ttft))
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            self._stream(content, meta, usage if include_usage else None)
+            return
+
+        time.sleep(options.delay(options.latency))
+        self._send_json(200, dict(meta, object="chat.completion", usage=usage, choices=[{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }]))
+
+    def _stream(self, content, meta, usage):
+        options = self.options
+        pieces = [content[i:i + options.chunk_chars] for i in range(0, len(content), options.chunk_chars)]
+        per_chunk = options.latency / max(1, len(pieces))
+        disconnect_at = len(pieces) // 2 if options.roll(options.disconnect_rate) else None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            for i, piece in enumerate(pieces):
+                if i == disconnect_at:
+                    # 模拟上游中途断开：不发送结束标记直接关闭连接
+                    return
+                if i:
+                    time.sleep(options.delay(per_chunk))
+                delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                send(dict(meta, object="chat.completion.chunk",
+                          choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+            send(dict(meta, object="chat.completion.chunk",
+                      choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+            if usage:
+                send(dict(meta, object="chat.completion.chunk", choices=[], usage=usage))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_server(host="127.0.0.1", port=0, options=None):
+    """
+    在后台线程启动服务，返回 (server, base_url)；port=0 时自动分配端口
+    用完调用 server.shutdown()
+    """
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"options": options or MockOptions()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="jobalign-mock-llm", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def add_option_args(parser):
+    parser.add_argument("--ttft", type=float, default=0.2, help="首包延迟（秒）")
+    parser.add_argument("--latency", type=float, default=1.0, help="首包之后的生成耗时（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟随机浮动比例")
+    parser.add_argument("--chunk-chars", type=int, default=24, help="流式每个 chunk 的字符数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After（秒）")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="流式输出中途断开的比例")
+    parser.add_argument("--seed", type=int, help="随机种子（注入错误的序列可复现）")
+
+
+def options_from_args(args):
+    return MockOptions(
+        ttft=args.ttft, latency=args.latency, jitter=args.jitter, chunk_chars=args.chunk_chars,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        disconnect_rate=args.disconnect_rate, seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_option_args(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    server, base_url = start_server(args.host, args.port, options_from_args(args))
+    logger.info("替身服务已启动：%s（Ctrl+C 退出）", base_url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
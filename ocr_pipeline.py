@@ -0,0 +1,182 @@
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import perf_metrics
+from startup_timing import lazy_import
+
+# Tesseract 参数：语言包不存在时自动退回已安装的语言（见 resolve_lang）
+OCR_LANG = os.environ.get("JOBALIGN_OCR_LANG", "chi_sim+eng")
+OCR_PSM = int(os.environ.get("JOBALIGN_OCR_PSM", "3"))
+# 预处理：降采样到目标 DPI -> 灰度 -> 纠偏 -> 二值化；设为 0 时直接把原图交给 Tesseract
+OCR_PREPROCESS = os.environ.get("JOBALIGN_OCR_PREPROCESS", "1") != "0"
+OCR_TARGET_DPI = int(os.environ.get("JOBALIGN_OCR_TARGET_DPI", "300"))
+# 多帧 TIFF / GIF：最多识别的帧数与并行线程数（tesseract 是子进程，可真正并行）
+OCR_MAX_FRAMES = int(os.environ.get("JOBALIGN_OCR_MAX_FRAMES", "20"))
+OCR_THREADS = int(os.environ.get("JOBALIGN_OCR_THREADS", "4"))
+
+# 图片没有可信 DPI 信息（手机照片通常标 72）时，按 A4 长边估算目标像素
+PAGE_LONG_SIDE_INCHES = 11.69
+# 纠偏：在缩略图上搜索 ±DESKEW_MAX_ANGLE 度内使行投影最「尖锐」的角度，先粗后细
+DESKEW_MAX_ANGLE = 10
+DESKEW_SAMPLE_SIDE = 800
+DESKEW_MIN_ANGLE = 0.2
+DESKEW_MIN_INK_RATIO = 0.001
+
+
+def config_tag():
+    """影响 OCR 输出的配置，拼进提取缓存的 key，配置变化后旧结果不再命中"""
+    return f"ocr:{OCR_LANG}:{OCR_PSM}:{int(OCR_PREPROCESS)}:{OCR_TARGET_DPI}"
+
+
+@functools.lru_cache(maxsize=1)
+def resolve_lang():
+    """只保留本机已安装的语言包；查询失败时原样使用配置"""
+    pytesseract = lazy_import("pytesseract")
+    try:
+        available = set(pytesseract.get_languages(config=""))
+    except Exception:
+        return OCR_LANG
+    langs = [lang for lang in OCR_LANG.split("+") if lang in available]
+    if langs:
+        return "+".join(langs)
+    return "eng" if "eng" in available else OCR_LANG
+
+
+# ================= 预处理 =================
+
+def _to_gray(image):
+    image_module = lazy_import("PIL.Image")
+    # 透明背景先铺白底，否则转灰度后透明区域变黑
+    if "A" in image.getbands() or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = image_module.new("RGBA", image.size, (255, 255, 255, 255))
+        image = image_module.alpha_composite(background, image)
+    return image.convert("L")
+
+
+def _downsample(gray, source_dpi):
+    """只缩小不放大：有可信 DPI（高于目标）时按比例缩放，否则把长边限制在 A4 目标 DPI 下的像素数"""
+    image_module = lazy_import("PIL.Image")
+    width, height = gray.size
+    if source_dpi and source_dpi > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / source_dpi
+    else:
+        scale = PAGE_LONG_SIDE_INCHES * OCR_TARGET_DPI / max(width, height)
+    if scale >= 1:
+        return gray
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return gray.resize(size, image_module.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+def otsu_threshold(gray):
+    """按灰度直方图计算 Otsu 全局阈值（类间方差最大）"""
+    np = lazy_import("numpy")
+    hist = np.asarray(gray.histogram()[:256], dtype=np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    mean_bg = sum_bg / np.maximum(weight_bg, 1)
+    mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def estimate_skew(gray, threshold):
+    """
+    投影法估计倾斜角：文字行水平时，逐行墨迹数量的相邻差最大
+    在缩略图上计算，返回应传给 Image.rotate 的角度（度）；几乎无墨迹时返回 0
+    """
+    np = lazy_import("numpy")
+    image_module = lazy_import("PIL.Image")
+    sample = gray.copy()
+    sample.thumbnail((DESKEW_SAMPLE_SIDE, DESKEW_SAMPLE_SIDE))
+    # 墨迹为 1、背景为 0，旋转补出的边角填 0 不影响投影
+    ink = np.asarray(sample) <= threshold
+    if ink.mean() < DESKEW_MIN_INK_RATIO:
+        return 0.0
+    ink_image = image_module.fromarray(ink.astype(np.uint8) * 255)
+
+    def score(angle):
+        rotated = ink_image.rotate(float(angle), resample=image_module.Resampling.NEAREST)
+        rows = np.asarray(rotated, dtype=np.float64).sum(axis=1)
+        # 得分相同时偏向更小的角度
+        return float(np.sum(np.diff(rows) ** 2)), -abs(angle)
+
+    best = max(np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + 0.5, 1.0), key=score)
+    best = max(np.arange(best - 1.0, best + 1.05, 0.1), key=score)
+    return round(float(best), 1) + 0.0
+
+
+def preprocess(image):
+    """返回 (处理后的图片, 附加信息)；附加信息写入逐帧计时"""
+    source_dpi = image.info.get("dpi")
+    source_dpi = max(source_dpi) if isinstance(source_dpi, tuple) and source_dpi else 0
+    gray = _downsample(_to_gray(image), source_dpi)
+    threshold = otsu_threshold(gray)
+    angle = estimate_skew(gray, threshold)
+    if abs(angle) >= DESKEW_MIN_ANGLE:
+        gray = gray.rotate(angle, resample=lazy_import("PIL.Image").Resampling.BILINEAR, expand=True, fillcolor=255)
+    binary = gray.point([255 if value > threshold else 0 for value in range(256)])
+    return binary, {"width": binary.size[0], "height": binary.size[1], "angle": angle, "threshold": threshold}
+
+
+# ================= 识别 =================
+
+def _ocr_frame(index, frame):
+    """单帧：预处理 + Tesseract，返回 (text, timing)；在线程池中执行"""
+    timing = {"frame": index}
+    started = time.perf_counter()
+    if OCR_PREPROCESS:
+        frame, info = preprocess(frame)
+        timing.update(info)
+    timing["preprocess_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    text = lazy_import("pytesseract").image_to_string(frame, lang=resolve_lang(), config=f"--psm {OCR_PSM}")
+    timing["ocr_s"] = time.perf_counter() - started
+    return text, timing
+
+
+def ocr_image(image, check_frame=None):
+    """
+    识别图片的所有帧（最多 OCR_MAX_FRAMES 帧），返回 (text, timings)
+    - 帧在调用线程中逐个 seek + copy（PIL 图片对象非线程安全），预处理与识别放到线程池
+    - 在途帧数有上限，不会一次把所有帧解码到内存
+    - check_frame(frame) 在解码前调用，可抛异常拒绝（如像素数超限）
+    - timings 交给 record_timings 在调用线程登记，保证子进程中的 perf_metrics.capture 能收集到
+    """
+    frame_count = min(getattr(image, "n_frames", 1) or 1, OCR_MAX_FRAMES)
+    if frame_count == 1:
+        if check_frame:
+            check_frame(image)
+        text, timing = _ocr_frame(0, image)
+        return text.strip(), [timing]
+
+    outputs = []
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=min(OCR_THREADS, frame_count)) as executor:
+        for index in range(frame_count):
+            image.seek(index)
+            if check_frame:
+                check_frame(image)
+            in_flight.append(executor.submit(_ocr_frame, index, image.copy()))
+            if len(in_flight) >= OCR_THREADS * 2:
+                outputs.append(in_flight.popleft().result())
+        while in_flight:
+            outputs.append(in_flight.popleft().result())
+
+    texts = [text.strip() for text, _ in outputs]
+    return "\n".join(t for t in texts if t), [timing for _, timing in outputs]
+
+
+def record_timings(timings, source):
+    """逐帧登记预处理与识别耗时（source: image / pdf_page）"""
+    for timing in timings:
+        attrs = {k: v for k, v in timing.items() if k not in ("preprocess_s", "ocr_s")}
+        perf_metrics.record("ocr.preprocess", timing["preprocess_s"], source=source, **attrs)
+        perf_metrics.record("ocr.tesseract", timing["ocr_s"], source=source, lang=resolve_lang(), psm=OCR_PSM,
+                            frame=timing["frame"])
@@ -0,0 +1,194 @@
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 最近的 span 保留在内存环形缓冲中，用于分位数与面板展示
+MAX_SPANS = 2000
+QUANTILES = (0.5, 0.95)
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens")
+
+logger = logging.getLogger("jobalign.perf")
+
+_lock = threading.Lock()
+_spans = deque(maxlen=MAX_SPANS)
+# 累计值单调递增，不受环形缓冲淘汰影响（Prometheus 的 _sum / _count / counter 语义）
+_stage_totals = {}
+_token_totals = {field: 0 for field in TOKEN_FIELDS}
+_local = threading.local()
+
+
+def record(stage, seconds, **attrs):
+    """
+    记录一次阶段耗时；attrs 为附加字段（文件类型、字节数、token 数等）
+    环境变量 JOBALIGN_PERF_LOG 指定文件时，同时逐行追加 JSON（便于线上采集）
+    """
+    entry = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 6)}
+    entry.update(attrs)
+    captured = getattr(_local, "captured", None)
+    if captured is not None:
+        captured.append(entry)
+        return
+    ingest([entry])
+
+
+def ingest(entries):
+    """登记在其他地方（如解析子进程内）产生的 span"""
+    sink = os.environ.get("JOBALIGN_PERF_LOG")
+    with _lock:
+        for entry in entries:
+            _spans.append(entry)
+            count, total = _stage_totals.get(entry["stage"], (0, 0.0))
+            _stage_totals[entry["stage"]] = (count + 1, total + entry["seconds"])
+            for field in TOKEN_FIELDS:
+                _token_totals[field] += entry.get(field) or 0
+        if sink and entries:
+            try:
+                with open(sink, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+            except OSError as e:
+                logger.warning("写入性能日志失败：%s", e)
+
+
+@contextmanager
+def span(stage, **attrs):
+    """
+    计时上下文；可在块内向返回的 dict 追加字段：
+        with span("llm.total", model=model) as attrs:
+            ...
+            attrs["prompt_tokens"] = usage.prompt_tokens
+    块内抛异常时记录 error 字段后继续抛出
+    """
+    started = time.perf_counter()
+    attrs = dict(attrs)
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record(stage, time.perf_counter() - started, **attrs)
+
+
+def timed(stage):
+    """装饰器版本的 span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def capture():
+    """
+    收集当前线程在块内产生的 span（不登记到全局），用于把子进程内的计时带回主进程：
+        with capture() as spans:
+            text = extract(...)
+        return text, spans          # 主进程再调用 ingest(spans)
+    """
+    previous = getattr(_local, "captured", None)
+    _local.captured = []
+    try:
+        yield _local.captured
+    finally:
+        _local.captured = previous
+
+
+def usage_attrs(usage):
+    """response.usage -> {'prompt_tokens': ..., 'completion_tokens': ...}；无 usage 时为空"""
+    if usage is None:
+        return {}
+    return {field: getattr(usage, field, 0) or 0 for field in TOKEN_FIELDS}
+
+
+def _quantile(sorted_values, q):
+    # nearest-rank
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summary():
+    """按阶段汇总最近 MAX_SPANS 条记录：次数、p50、p95、平均、最大（秒）"""
+    with _lock:
+        spans = list(_spans)
+    by_stage = {}
+    for entry in spans:
+        by_stage.setdefault(entry["stage"], []).append(entry["seconds"])
+    result = {}
+    for stage in sorted(by_stage):
+        values = sorted(by_stage[stage])
+        result[stage] = {
+            "count": len(values),
+            "p50_s": _quantile(values, 0.5),
+            "p95_s": _quantile(values, 0.95),
+            "avg_s": sum(values) / len(values),
+            "max_s": values[-1],
+        }
+    return result
+
+
+def token_totals():
+    with _lock:
+        return dict(_token_totals)
+
+
+def recent(limit=None):
+    with _lock:
+        spans = list(_spans)
+    return spans[-limit:] if limit else spans
+
+
+def export_jsonl():
+    return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in recent())
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def export_prometheus():
+    """Prometheus 文本格式：各阶段耗时 summary（分位数取自最近窗口）+ token 计数器"""
+    with _lock:
+        totals = dict(_stage_totals)
+        tokens = dict(_token_totals)
+        spans = list(_spans)
+    by_stage = {}
+    for entry in spans:
+        by_stage.setdefault(entry["stage"], []).append(entry["seconds"])
+
+    lines = [
+        "# HELP jobalign_stage_seconds Latency of each processing stage.",
+        "# TYPE jobalign_stage_seconds summary",
+    ]
+    for stage in sorted(totals):
+        label = _label(stage)
+        values = sorted(by_stage.get(stage, []))
+        if values:
+            for q in QUANTILES:
+                lines.append(f'jobalign_stage_seconds{{stage="{label}",quantile="{q}"}} {_quantile(values, q):.6f}')
+        count, total = totals[stage]
+        lines.append(f'jobalign_stage_seconds_sum{{stage="{label}"}} {total:.6f}')
+        lines.append(f'jobalign_stage_seconds_count{{stage="{label}"}} {count}')
+
+    lines += [
+        "# HELP jobalign_llm_tokens_total Tokens reported by the model API.",
+        "# TYPE jobalign_llm_tokens_total counter",
+    ]
+    for field in TOKEN_FIELDS:
+        lines.append(f'jobalign_llm_tokens_total{{kind="{field.split("_")[0]}"}} {tokens[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _stage_totals.clear()
+        for field in TOKEN_FIELDS:
+            _token_totals[field] = 0
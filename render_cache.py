@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    结果展示产物（DataFrame、plotly 图等）的进程级 LRU
+    - key = (结果哈希, 产物类型)：同一份结果在任何会话、任何一次 rerun 中只构建一次
+    - 产物构建后只读使用，多个会话可以共享同一对象
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, result_key, kind, build):
+        """result_key 为 None（如流式预览中的未完成结果）时不缓存，直接构建"""
+        if result_key is None:
+            return build()
+        key = (result_key, kind)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # 构建在锁外进行；并发构建同一产物时后写入的覆盖先写入的，结果相同
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """
+    进程级单例
+    环境变量 JOBALIGN_RENDER_CACHE_ENTRIES: 条目上限，默认 256
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache(max_entries=int(os.environ.get("JOBALIGN_RENDER_CACHE_ENTRIES", "256")))
+        return _cache
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+_SPACE_RE = re.compile(r"[ \t\u3000\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{2,}")
+
+
+def normalize_text(text):
+    """
+    计算缓存 key 前的文本规范化：统一换行、合并连续空白与空行、去掉首尾空白
+    同一份简历 / JD 经不同方式复制粘贴或提取后，只要内容相同就命中同一 key
+    """
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(_SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def make_result_key(base_url, model, prompt_version, temperature, engine, resume, jd_list):
+    """
+    分析结果缓存 key：
+    base_url + model + 提示词版本 + temperature + 引擎 + 简历哈希 + 按顺序排列的 JD 哈希
+    （文本先经 normalize_text 规范化；也用作 single-flight 合并在途请求的 key）
+    """
+    parts = {
+        "base_url": base_url or "",
+        "model": model or "",
+        "prompt_version": prompt_version,
+        "temperature": temperature,
+        "engine": engine,
+        "resume": text_hash(resume),
+        "jds": [text_hash(jd.get("title", "") + "\n" + jd.get("text", "")) for jd in jd_list],
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    大模型分析结果的持久化缓存（每条一个 JSON 文件）
+    - TTL 过期：读取时发现过期即删除
+    - 容量上限：条目数 / 总字节数超限时按最久未使用淘汰
+    - 统计：命中率、累计节省的 token 数
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=7 * 24 * 3600, max_entries=500, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += entry.get("usage", {}).get("total_tokens", 0)
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["result"]
+
+    def put(self, key, result, usage=None):
+        entry = {"created_at": time.time(), "result": result, "usage": usage or {}}
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._evict()
+
+    def invalidate(self, key):
+        self._remove(self._path(key))
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "tokens_saved": self.tokens_saved,
+            }
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            # mtime 在写入 / 命中时更新；超过 TTL 未被使用的条目一定已过期
+            if now - st_.st_mtime > self.ttl_seconds:
+                self._remove(path)
+                continue
+            entries.append((st_.st_mtime, st_.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    进程级单例
+    环境变量：
+    - JOBALIGN_RESULT_CACHE_DIR: 缓存目录，默认 ~/.cache/jobalign/llm_results
+    - JOBALIGN_RESULT_CACHE_TTL_HOURS: 过期时间（小时），默认 168
+    - JOBALIGN_RESULT_CACHE_MAX_ENTRIES / JOBALIGN_RESULT_CACHE_MAX_MB: 容量上限
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                cache_dir=os.environ.get("JOBALIGN_RESULT_CACHE_DIR")
+                or os.path.join(os.path.expanduser("~"), ".cache", "jobalign", "llm_results"),
+                ttl_seconds=float(os.environ.get("JOBALIGN_RESULT_CACHE_TTL_HOURS", "168")) * 3600,
+                max_entries=int(os.environ.get("JOBALIGN_RESULT_CACHE_MAX_ENTRIES", "500")),
+                max_bytes=int(os.environ.get("JOBALIGN_RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024,
+            )
+        return _cache
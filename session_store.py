@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_HANDLE_RE = re.compile(r"^(?P<session>[0-9a-f]{32})\.(?P<blob>[0-9a-f]{32})$")
+
+# 空闲清理最多每隔这么久扫描一次，避免每次 rerun 都遍历目录
+IDLE_SWEEP_INTERVAL_SECONDS = 60
+
+
+class SessionBlobStore:
+    """
+    会话大对象存储：分析结果 JSON、生成的 docx 等写入磁盘，st.session_state 只保存句柄（字符串）
+    - 磁盘：每个会话一个目录，单会话总字节数超限时淘汰该会话最早写入的对象
+    - 内存：全局共享、按总字节数限制的 LRU，rerun 反复读取同一对象时不必每次读盘
+    - 空闲清理：会话超过 idle_seconds 未访问即删除其全部对象（读取时返回 None，由界面提示重新分析）
+    """
+
+    def __init__(self, root, memory_bytes=32 * 1024 * 1024, session_bytes=16 * 1024 * 1024,
+                 idle_seconds=3600):
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.session_bytes = session_bytes
+        self.idle_seconds = idle_seconds
+        self._memory = OrderedDict()
+        self._memory_total = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.evicted_sessions = 0
+        self.evicted_blobs = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    # ---------- 读写 ----------
+    def put_bytes(self, session_id, data):
+        """写入一个对象，返回句柄"""
+        if not _SESSION_ID_RE.match(session_id or ""):
+            raise ValueError(f"非法的会话 ID: {session_id!r}")
+        handle = f"{session_id}.{uuid.uuid4().hex}"
+        path = self._path(handle)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._memory_put(handle, data)
+            self._sessions[session_id] = time.time()
+        self._enforce_session_cap(session_id, keep=handle)
+        self.sweep_idle()
+        return handle
+
+    def get_bytes(self, handle):
+        """按句柄读取；对象已被淘汰或句柄无效时返回 None"""
+        match = _HANDLE_RE.match(handle or "")
+        if not match:
+            return None
+        with self._lock:
+            data = self._memory.get(handle)
+            if data is not None:
+                self._memory.move_to_end(handle)
+                self._sessions[match.group("session")] = time.time()
+                return data
+        try:
+            with open(self._path(handle), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._memory_put(handle, data)
+            self._sessions[match.group("session")] = time.time()
+        return data
+
+    def put_json(self, session_id, obj):
+        return self.put_bytes(session_id, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+    def get_json(self, handle):
+        data = self.get_bytes(handle)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def drop(self, handle):
+        """删除一个对象（会话用新结果替换旧结果时调用）"""
+        if not _HANDLE_RE.match(handle or ""):
+            return
+        with self._lock:
+            self._memory_pop(handle)
+        try:
+            os.remove(self._path(handle))
+        except OSError:
+            pass
+
+    # ---------- 会话生命周期 ----------
+    def touch(self, session_id):
+        """每次脚本执行时调用，标记会话仍活跃，并顺带清理空闲会话"""
+        with self._lock:
+            self._sessions[session_id] = time.time()
+        self.sweep_idle()
+
+    def drop_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            for handle in [h for h in self._memory if h.startswith(f"{session_id}.")]:
+                self._memory_pop(handle)
+        shutil.rmtree(os.path.join(self.root, session_id), ignore_errors=True)
+
+    def sweep_idle(self, force=False):
+        """
+        删除空闲会话的全部对象
+        进程重启后内存中没有访问记录，按目录 mtime（最近一次写入）判断
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < IDLE_SWEEP_INTERVAL_SECONDS:
+                return
+            self._last_sweep = now
+            sessions = dict(self._sessions)
+
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            if not _SESSION_ID_RE.match(name):
+                continue
+            last_seen = sessions.get(name)
+            if last_seen is None:
+                try:
+                    last_seen = os.stat(os.path.join(self.root, name)).st_mtime
+                except OSError:
+                    continue
+            if now - last_seen > self.idle_seconds:
+                self.drop_session(name)
+                with self._lock:
+                    self.evicted_sessions += 1
+        with self._lock:
+            for session_id in [s for s, seen in self._sessions.items() if now - seen > self.idle_seconds]:
+                del self._sessions[session_id]
+
+    def _enforce_session_cap(self, session_id, keep):
+        """单会话超出上限时按写入时间淘汰最早的对象（刚写入的对象保留）"""
+        entries = []
+        session_dir = os.path.join(self.root, session_id)
+        try:
+            names = os.listdir(session_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".bin"):
+                continue
+            try:
+                st_ = os.stat(os.path.join(session_dir, name))
+            except OSError:
+                continue
+            entries.append((st_.st_mtime, st_.st_size, f"{session_id}.{name[:-len('.bin')]}"))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, handle in entries:
+            if total <= self.session_bytes:
+                break
+            if handle == keep:
+                continue
+            self.drop(handle)
+            total -= size
+            with self._lock:
+                self.evicted_blobs += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory_total,
+                "memory_entries": len(self._memory),
+                "evicted_sessions": self.evicted_sessions,
+                "evicted_blobs": self.evicted_blobs,
+            }
+
+    # ---------- 内存层 ----------
+    def _path(self, handle):
+        session_id, blob_id = handle.split(".", 1)
+        return os.path.join(self.root, session_id, f"{blob_id}.bin")
+
+    def _memory_put(self, handle, data):
+        # 超过内存上限四分之一的大对象只落盘，不挤占其他会话的热数据
+        if len(data) > self.memory_bytes // 4:
+            return
+        self._memory_pop(handle)
+        self._memory[handle] = data
+        self._memory_total += len(data)
+        while self._memory_total > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_total -= len(evicted)
+
+    def _memory_pop(self, handle):
+        data = self._memory.pop(handle, None)
+        if data is not None:
+            self._memory_total -= len(data)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    进程级单例
+    环境变量：
+    - JOBALIGN_SESSION_STORE_DIR: 存储目录，默认系统临时目录下的 jobalign_sessions
+    - JOBALIGN_SESSION_STORE_MEMORY_MB: 全局内存层上限，默认 32
+    - JOBALIGN_SESSION_STORE_SESSION_MB: 单会话磁盘上限，默认 16
+    - JOBALIGN_SESSION_IDLE_MINUTES: 会话空闲多久后清理，默认 60
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionBlobStore(
+                root=os.environ.get("JOBALIGN_SESSION_STORE_DIR")
+                or os.path.join(tempfile.gettempdir(), "jobalign_sessions"),
+                memory_bytes=int(os.environ.get("JOBALIGN_SESSION_STORE_MEMORY_MB", "32")) * 1024 * 1024,
+                session_bytes=int(os.environ.get("JOBALIGN_SESSION_STORE_SESSION_MB", "16")) * 1024 * 1024,
+                idle_seconds=float(os.environ.get("JOBALIGN_SESSION_IDLE_MINUTES", "60")) * 60,
+            )
+        return _store
@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Flight:
+    """
+    一次进行中的上游调用；所有等待方共享同一个 partial / usage / result
+    partial 由执行方边产出边写入，等待方可直接读取做实时预览
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.partial = {}
+        self.usage = {}
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.cancel = threading.Event()
+        self.waiters = 0
+        self.joined = 0
+
+    def wait(self, cancel=None, poll_seconds=0.2):
+        """等待结果；调用方的 cancel 被设置时立即返回 None（不影响其他等待方）"""
+        while not self.done.wait(poll_seconds):
+            if cancel is not None and cancel.is_set():
+                return None
+        return self.result
+
+
+class SingleFlight:
+    """
+    进程内 single-flight：同一 key 同时只有一个上游调用，并发的相同请求合并等待同一结果
+    - 调用在有界线程池中执行，任何等待方（包括最先发起的）都可以单独放弃等待；
+      已被放弃但仍在收尾的调用继续占用名额，同时进行的上游调用数不超过 max_workers
+    - 所有等待方都离开后才设置 flight.cancel，让执行方尽早结束上游调用（排队中的直接跳过）
+    - 调用结束即从表中移除；之后的相同请求由结果缓存负责
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobalign-flight")
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+
+    def join(self, key, fn):
+        """
+        加入 key 对应的调用，不存在时以 fn(flight) 启动一个；返回 (flight, 是否由本次发起)
+        用完必须调用 leave(flight)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            # 已被所有等待方放弃、正在收尾的调用不再合并
+            leader = flight is None or flight.cancel.is_set()
+            if leader:
+                flight = Flight(key)
+                self._flights[key] = flight
+                self.started += 1
+                self._executor.submit(self._run, flight, fn)
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+            flight.joined += 1
+        return flight, leader
+
+    def leave(self, flight):
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters <= 0 and not flight.done.is_set():
+                flight.cancel.set()
+
+    def _run(self, flight, fn):
+        try:
+            if not flight.cancel.is_set():
+                flight.result = fn(flight)
+        except Exception as e:
+            flight.error = flight.error or str(e)
+        finally:
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "started": self.started,
+                "coalesced": self.coalesced,
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    进程级单例
+    环境变量 JOBALIGN_JOB_WORKERS: 同时进行的上游调用数，与任务池并发数一致，默认 4
+    """
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(max_workers=max(1, int(os.environ.get("JOBALIGN_JOB_WORKERS", "4"))))
+        return _single_flight
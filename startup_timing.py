@@ -0,0 +1,61 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# 本模块首次导入的时间点（app.py 最先导入它），近似为冷启动后首次脚本执行的开始
+PROCESS_START = time.perf_counter()
+
+logger = logging.getLogger("jobalign.startup")
+
+_lock = threading.Lock()
+_import_timings = {}
+_script_runs = []
+_first_paint = None
+
+
+def lazy_import(name):
+    """
+    按需导入重依赖，并记录首次导入耗时
+    已导入过的模块直接从 sys.modules 返回，开销可忽略
+    （其他线程正在导入中的模块不能直接返回，交给 import_module 等待导入锁）
+    """
+    module = sys.modules.get(name)
+    if module is not None and not getattr(getattr(module, "__spec__", None), "_initializing", False):
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _import_timings.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+def record_import(name, seconds):
+    """记录非 lazy_import 的导入耗时（如 app.py 顶部的导入块），只保留首次"""
+    with _lock:
+        _import_timings.setdefault(name, seconds)
+
+
+def record_script_run(started):
+    """记录一次 Streamlit 脚本执行；进程内第一次执行即首屏耗时"""
+    global _first_paint
+    finished = time.perf_counter()
+    with _lock:
+        _script_runs.append(finished - started)
+        del _script_runs[:-50]
+        if _first_paint is None:
+            _first_paint = finished - PROCESS_START
+            logger.info("首屏完成：冷启动 %.3fs，首次脚本执行 %.3fs", _first_paint, finished - started)
+
+
+def report():
+    with _lock:
+        runs = list(_script_runs)
+        return {
+            "first_paint_s": _first_paint,
+            "last_run_s": runs[-1] if runs else None,
+            "avg_run_s": (sum(runs) / len(runs)) if runs else None,
+            "runs": len(runs),
+            "imports_s": dict(sorted(_import_timings.items(), key=lambda kv: -kv[1])),
+        }
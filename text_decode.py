@@ -0,0 +1,49 @@
+import codecs
+
+# 每次送入增量解码器的字节数：解码失败时能尽早发现，且不需要一次性复制整个缓冲区
+CHUNK_SIZE = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# 无 BOM 时依次尝试；gb18030 是 GBK / GB2312 的超集，覆盖国内常见的「ANSI」记事本文件
+CANDIDATE_ENCODINGS = ("utf-8", "gb18030")
+
+
+def _decode_with(view, encoding, chunk_size):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parts = []
+    for start in range(0, len(view), chunk_size):
+        parts.append(decoder.decode(view[start:start + chunk_size]))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def detect_bom(view):
+    head = bytes(view[:4])
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def decode_text(data, chunk_size=CHUNK_SIZE):
+    """
+    增量解码字节内容（bytes / memoryview 均可，切片不复制），返回 (text, encoding)
+    - 有 BOM 时按 BOM 解码
+    - 否则依次尝试 CANDIDATE_ENCODINGS，某个编码中途出错即换下一个
+    - 全部失败时按 UTF-8 解码并用替换字符代替非法字节
+    """
+    view = memoryview(data).cast("B")
+    encoding = detect_bom(view)
+    if encoding:
+        return _decode_with(view, encoding, chunk_size), encoding
+
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            return _decode_with(view, encoding, chunk_size), encoding
+        except UnicodeDecodeError:
+            continue
+    return str(view, "utf-8", errors="replace"), "utf-8-replace"
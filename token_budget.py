@@ -0,0 +1,261 @@
+import re
+
+# (上下文窗口, 输出预留) —— 按模型名前缀匹配，未知模型使用 DEFAULT_MODEL_LIMITS
+MODEL_LIMITS = {
+    "deepseek-chat": (64000, 8000),
+    "deepseek-reasoner": (64000, 8000),
+    "gpt-4o-mini": (128000, 16000),
+    "gpt-4o": (128000, 16000),
+    "gpt-4.1": (1000000, 32000),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-3.5-turbo": (16000, 4096),
+    "qwen": (32000, 8000),
+    "moonshot": (32000, 8000),
+}
+DEFAULT_MODEL_LIMITS = (32000, 8000)
+
+# 单条 JD 在分阶段引擎第一阶段中的输入上限（小请求，省 token）
+SCORE_CALL_INPUT_TOKENS = 6000
+# 消息包装、JD 标题等固定开销
+MESSAGE_OVERHEAD_TOKENS = 200
+
+_CJK_RE = re.compile(r"[　-〿一-鿿＀-￯]")
+
+
+def estimate_tokens(text):
+    """
+    本地粗估 token 数（不依赖 tokenizer）：
+    中文及全角字符按 1 token/字，其余按 4 字符/token，偏保守
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _model_key(model):
+    return (model or "").strip().lower()
+
+
+def model_limit_overrides(model, context_tokens, output_tokens):
+    """
+    界面为自定义模型填写的上下文 / 输出上限，随每次调用传入（model_limits 参数），不修改全局 MODEL_LIMITS
+    返回 {模型名: (上下文, 输出预留)}；模型名的规范化与 get_model_limits 查询时一致
+    """
+    if not _model_key(model):
+        return None
+    return {_model_key(model): (int(context_tokens), int(output_tokens))}
+
+
+def get_model_limits(model, overrides=None):
+    """overrides（见 model_limit_overrides）按模型名精确匹配优先，其次 MODEL_LIMITS 最长前缀匹配"""
+    model = _model_key(model)
+    if overrides and model in overrides:
+        return tuple(overrides[model])
+    if model in MODEL_LIMITS:
+        return MODEL_LIMITS[model]
+    # 最长前缀优先，避免 gpt-4o-mini 命中 gpt-4o
+    for prefix in sorted(MODEL_LIMITS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_LIMITS[prefix]
+    return DEFAULT_MODEL_LIMITS
+
+
+def input_budget(model, system_prompt, model_limits=None):
+    """模型可用的输入 token 预算 = 上下文 - 输出预留 - 系统提示词 - 固定开销"""
+    context_tokens, output_tokens = get_model_limits(model, model_limits)
+    return max(1000, context_tokens - output_tokens - estimate_tokens(system_prompt) - MESSAGE_OVERHEAD_TOKENS)
+
+
+# ================= 低价值内容裁剪 =================
+
+# JD 中的低价值段落标题（公司介绍 / 福利待遇 / 投递方式等）：必须整行就是标题，
+# 「熟悉薪资福利系统开发」这类正文不能被当成标题而整段降级
+_JD_LOW_VALUE_TERM = (
+    r"(?:公司介绍|公司简介|关于我们|企业介绍|企业简介|团队介绍|福利|待遇|薪资|我们提供|工作时间|工作地点|"
+    r"联系方式|投递方式|招聘流程|about\s+us|who\s+we\s+are|benefits|perks|what\s+we\s+offer|compensation)"
+)
+_JD_LOW_VALUE_HEADER = re.compile(
+    r"^[#【\[■●◆\s]*(?:[0-9一二三四五六七八九十]+\s*[.、)）]\s*)?"
+    rf"{_JD_LOW_VALUE_TERM}(?:\s*(?:与|和|及|&|/|、|and)?\s*{_JD_LOW_VALUE_TERM})*"
+    r"\s*[】\]]?\s*[:：]?\s*$",
+    re.IGNORECASE
+)
+# JD 中的高价值段落标题（职责 / 要求）
+_JD_HIGH_VALUE_HEADER = re.compile(
+    r"(职责|要求|任职|资格|技能|岗位描述|工作内容|加分项|优先|responsibilit|requirement|qualification|"
+    r"what\s+you.?ll\s+do|skills)",
+    re.IGNORECASE
+)
+# 无论出现在哪个段落都可以直接去掉的套话
+_JD_BOILERPLATE_LINE = re.compile(
+    r"(五险一金|六险一金|带薪年假|下午茶|零食|团建|节日福利|年终奖|股票期权|弹性工作|免费班车|"
+    r"equal\s+opportunity|we\s+are\s+an?\s+equal|apply\s+now|投递简历请|简历投递至|欢迎加入我们)",
+    re.IGNORECASE
+)
+# 简历中的页码行
+_PAGE_MARKER_LINE = re.compile(r"^\s*(第\s*\d+\s*页(\s*[/／共]\s*\d+\s*页?)?|page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*/\s*\d+)\s*$",
+                               re.IGNORECASE)
+# 与页码相距不超过这么多个非空行的重复短行视为页眉页脚
+PAGE_FURNITURE_REACH = 2
+
+
+def _is_header(line):
+    stripped = line.strip()
+    if not stripped or len(stripped) > 30:
+        return False
+    return (
+        stripped.startswith(("#", "【", "[", "■", "●", "◆"))
+        or stripped.endswith((":", "："))
+        or bool(_JD_LOW_VALUE_HEADER.match(stripped) or _JD_HIGH_VALUE_HEADER.search(stripped))
+    )
+
+
+def _collapse_blank_lines(lines):
+    out = []
+    for line in lines:
+        if not line.strip() and (not out or not out[-1].strip()):
+            continue
+        out.append(line.rstrip())
+    return "\n".join(out).strip()
+
+
+def clean_jd(text):
+    """去掉 JD 中的福利套话与重复行，并把段落按价值分级：返回 [(priority, text), ...]，0 最重要"""
+    sections = []
+    priority = 1
+    current = []
+    seen = set()
+    for line in (text or "").splitlines():
+        key = line.strip()
+        if key and _JD_BOILERPLATE_LINE.search(key):
+            continue
+        if key and key in seen:
+            continue
+        if key:
+            seen.add(key)
+        if _is_header(line):
+            if current:
+                sections.append((priority, current))
+            if _JD_LOW_VALUE_HEADER.match(key):
+                priority = 2
+            elif _JD_HIGH_VALUE_HEADER.search(key):
+                priority = 0
+            else:
+                priority = 1
+            current = [line]
+        else:
+            current.append(line)
+    if current:
+        sections.append((priority, current))
+    return [(p, _collapse_blank_lines(lines)) for p, lines in sections]
+
+
+def _page_furniture(lines):
+    """
+    页码行，以及每次都紧挨页码或文首 / 文末（前后 PAGE_FURNITURE_REACH 个非空行内）的重复短行，
+    即跨页的页眉页脚；返回要去掉的行号（重复的页眉页脚保留第一次出现）
+    """
+    nonblank = [i for i, line in enumerate(lines) if line.strip()]
+    markers = [pos for pos, i in enumerate(nonblank) if _PAGE_MARKER_LINE.match(lines[i].strip())]
+    drop = {nonblank[pos] for pos in markers}
+    if not markers:
+        return drop
+    boundaries = markers + [-1, len(nonblank)]
+    occurrences = {}
+    for pos, i in enumerate(nonblank):
+        key = lines[i].strip()
+        if i not in drop and len(key) <= 40:
+            occurrences.setdefault(key, []).append(pos)
+    for positions in occurrences.values():
+        if len(positions) < 2:
+            continue
+        if all(any(abs(pos - b) <= PAGE_FURNITURE_REACH for b in boundaries) for pos in positions):
+            drop.update(nonblank[pos] for pos in positions[1:])
+    return drop
+
+
+def clean_resume(text, budget=None):
+    """
+    合并多余空行；超出 budget 时再去掉页码与跨页重复的页眉页脚
+    其他重复行（如各段经历里相同的职位名、技能名）一律保留
+    """
+    lines = (text or "").splitlines()
+    if budget is not None and estimate_tokens(text) > budget:
+        drop = _page_furniture(lines)
+        lines = [line for i, line in enumerate(lines) if i not in drop]
+    return _collapse_blank_lines(lines)
+
+
+def truncate_to_tokens(text, budget):
+    if estimate_tokens(text) <= budget:
+        return text
+    used = 0
+    for i, ch in enumerate(text):
+        used += 1 if _CJK_RE.match(ch) else 0.25
+        if used > budget:
+            return text[:i].rstrip() + "\n…（已截断）"
+    return text
+
+
+def fit_jd(text, budget):
+    """在预算内尽量保留 JD 的职责 / 要求：先丢低价值段落，再从尾部截断"""
+    sections = clean_jd(text)
+    kept = list(sections)
+    for drop_priority in (2, 1):
+        if estimate_tokens("\n\n".join(t for _, t in kept)) <= budget:
+            break
+        kept = [(p, t) for p, t in kept if p < drop_priority] or kept
+    return truncate_to_tokens("\n\n".join(t for _, t in kept), budget)
+
+
+def fit_resume(text, budget):
+    return truncate_to_tokens(clean_resume(text, budget), budget)
+
+
+def allocate(resume, jd_texts, total_budget, resume_share=0.4):
+    """
+    把输入预算分给简历和 N 个 JD：
+    - 简历最多占 resume_share，用不完的部分让给 JD
+    - JD 之间做水位线分配：短 JD 用多少给多少，剩余平均分给长 JD
+    - JD 分完后仍有剩余则还给简历
+    返回 (resume_budget, [jd_budget, ...])
+    """
+    resume_need = estimate_tokens(resume)
+    jd_needs = [estimate_tokens(t) for t in jd_texts]
+
+    resume_budget = min(resume_need, int(total_budget * (resume_share if jd_needs else 1.0)))
+    remaining = total_budget - resume_budget
+
+    jd_budgets = [0] * len(jd_needs)
+    pending = sorted(range(len(jd_needs)), key=lambda i: jd_needs[i])
+    while pending:
+        share = remaining // len(pending)
+        i = pending[0]
+        if jd_needs[i] <= share:
+            jd_budgets[i] = jd_needs[i]
+            remaining -= jd_needs[i]
+            pending.pop(0)
+        else:
+            for j in pending:
+                jd_budgets[j] = share
+            remaining -= share * len(pending)
+            pending = []
+
+    if remaining > 0 and resume_budget < resume_need:
+        resume_budget = min(resume_need, resume_budget + remaining)
+    return resume_budget, jd_budgets
+
+
+def fit_inputs(resume, jd_texts, total_budget):
+    """
+    按预算裁剪简历与多个 JD，返回 (resume_text, [jd_text, ...])
+    先做 JD 低价值内容清理再分配预算，避免套话挤占有效内容；简历只在超出分到的预算时才去页眉页脚
+    """
+    resume_clean = clean_resume(resume)
+    jd_clean = ["\n\n".join(t for _, t in clean_jd(text)) for text in jd_texts]
+    _, jd_budgets = allocate(resume_clean, jd_clean, total_budget)
+    jd_fits = [fit_jd(text, budget) for text, budget in zip(jd_texts, jd_budgets)]
+    # JD 裁掉低价值段落后实际用量可能远低于分配额，剩余预算全部留给简历
+    resume_budget = total_budget - sum(estimate_tokens(t) for t in jd_fits)
+    return fit_resume(resume_clean, resume_budget), jd_fits
@@ -0,0 +1,169 @@
+import io
+import re
+import threading
+import zipfile
+
+import perf_metrics
+from startup_timing import lazy_import
+
+BASE_FONT = '微软雅黑'
+BASE_FONT_SIZE = 11
+# tab 折算的空格数；列表层级按实际出现的缩进台阶计算（2 空格、4 空格缩进都是一级一台阶），最多到 List Bullet 3
+INDENT_WIDTH = 4
+MAX_LIST_LEVEL = 3
+
+# 行内标记：***粗斜体*** / **粗体** / __粗体__ / *斜体*（星号两侧不能是空白，避免误伤 "a * b"）
+_INLINE_RE = re.compile(
+    r"\*\*\*(?P<bold_italic>\S(?:.*?\S)?)\*\*\*"
+    r"|\*\*(?P<bold>\S(?:.*?\S)?)\*\*"
+    r"|__(?P<bold_alt>\S(?:.*?\S)?)__"
+    r"|(?<![*\w])\*(?P<italic>[^\s*](?:[^*]*?[^\s*])?)\*(?![*\w])"
+)
+_BULLET_RE = re.compile(r"^(?P<indent>[ \t]*)[-*+]\s+(?P<text>.*)$")
+_NUMBERED_RE = re.compile(r"^(?P<indent>[ \t]*)\d+[.)]\s+(?P<text>.*)$")
+_HEADING_RE = re.compile(r"^(?P<marks>#{1,3})\s+(?P<text>.*)$")
+
+_template_bytes = None
+_style_ids = {}
+_template_lock = threading.Lock()
+
+
+def parse_inline(text):
+    """单次扫描把行内 Markdown 切成 [(文本, 粗体, 斜体), ...]"""
+    runs = []
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > pos:
+            runs.append((text[pos:match.start()], False, False))
+        kind = match.lastgroup
+        runs.append((
+            match.group(kind),
+            kind in ("bold_italic", "bold", "bold_alt"),
+            kind in ("bold_italic", "italic"),
+        ))
+        pos = match.end()
+    if pos < len(text):
+        runs.append((text[pos:], False, False))
+    return runs
+
+
+def _list_level(indent, stack):
+    """
+    stack 为当前列表中各级的缩进宽度（由调用方在列表之间清空）：
+    比上一级缩进更深即下一级，回退到某级的缩进即回到该级
+    """
+    width = len(indent.replace("\t", " " * INDENT_WIDTH))
+    while stack and stack[-1] > width:
+        stack.pop()
+    if not stack or stack[-1] < width:
+        stack.append(width)
+    return min(MAX_LIST_LEVEL, len(stack))
+
+
+def _template():
+    """
+    预设好样式的空白文档（只构建一次，之后从字节加载）
+    Normal 同时设置西文与东亚字体，否则中文仍按默认字体显示；
+    同时记下样式名 -> styleId，python-docx 按名称设置样式时每个段落都要遍历全部样式，占生成耗时的大头
+    """
+    global _template_bytes
+    with _template_lock:
+        if _template_bytes is None:
+            docx = lazy_import("docx")
+            Pt = lazy_import("docx.shared").Pt
+            qn = lazy_import("docx.oxml.ns").qn
+
+            doc = docx.Document()
+            style = doc.styles['Normal']
+            style.font.name = BASE_FONT
+            style.font.size = Pt(BASE_FONT_SIZE)
+            style.element.get_or_add_rPr().get_or_add_rFonts().set(qn('w:eastAsia'), BASE_FONT)
+
+            _style_ids.update((s.name, s.style_id) for s in doc.styles if s.name)
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            _template_bytes = buffer.getvalue()
+        return _template_bytes
+
+
+class WordGenerator:
+    @staticmethod
+    @perf_metrics.timed("docx.generate")
+    def create_docx_from_markdown(markdown_text):
+        """将 Markdown 格式的简历草稿转换为格式化的 Word 文档，返回 BytesIO"""
+        buffer = io.BytesIO()
+        WordGenerator.write_docx(markdown_text, buffer)
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def write_docx(markdown_text, fileobj):
+        """
+        把文档直接写入 fileobj（文件、ZIP 条目等）
+        支持：# / ## / ### 标题、按缩进嵌套的 - * + 列表、1. 编号列表、行内粗体 / 斜体
+        """
+        doc = lazy_import("docx").Document(io.BytesIO(_template()))
+        WD_PARAGRAPH_ALIGNMENT = lazy_import("docx.enum.text").WD_PARAGRAPH_ALIGNMENT
+        indents = []
+
+        for raw_line in markdown_text.split('\n'):
+            line = raw_line.rstrip()
+            if not line.strip():
+                continue
+
+            heading = _HEADING_RE.match(line.strip())
+            bullet = _BULLET_RE.match(line)
+            numbered = _NUMBERED_RE.match(line)
+            if heading or not (bullet or numbered):
+                indents.clear()
+
+            if heading:
+                level = len(heading.group("marks"))
+                p = WordGenerator._add_paragraph(doc, f'Heading {level}', heading.group("text"))
+                # 一级标题（姓名）居中
+                if level == 1:
+                    p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            elif bullet:
+                level = _list_level(bullet.group("indent"), indents)
+                style = 'List Bullet' if level == 1 else f'List Bullet {level}'
+                WordGenerator._add_paragraph(doc, style, bullet.group("text"))
+            elif numbered:
+                level = _list_level(numbered.group("indent"), indents)
+                style = 'List Number' if level == 1 else f'List Number {level}'
+                WordGenerator._add_paragraph(doc, style, numbered.group("text"))
+            else:
+                WordGenerator._add_paragraph(doc, None, line.strip())
+
+        doc.save(fileobj)
+
+    @staticmethod
+    def _add_paragraph(doc, style_name, text):
+        paragraph = doc.add_paragraph()
+        if style_name:
+            # 直接写 pStyle，跳过 python-docx 的按名称查找
+            paragraph._p.style = _style_ids[style_name]
+        for content, bold, italic in parse_inline(text):
+            run = paragraph.add_run(content)
+            if bold:
+                run.bold = True
+            if italic:
+                run.italic = True
+        return paragraph
+
+    @staticmethod
+    def add_to_zip(zip_file, name, markdown_text):
+        """向已打开的 ZipFile 追加一份 .docx；文档直接写入 ZIP 条目，不在内存中另留副本"""
+        with zip_file.open(name, "w", force_zip64=True) as entry:
+            WordGenerator.write_docx(markdown_text, entry)
+
+    @staticmethod
+    def write_zip(drafts, fileobj):
+        """
+        drafts: 可迭代的 (文件名, markdown)，可以是生成器
+        逐份生成并写入 fileobj，同一时刻只有一份文档在内存中
+        （.docx 本身已压缩，外层 ZIP 只做打包不再压缩）
+        """
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as zip_file:
+            for name, markdown_text in drafts:
+                WordGenerator.add_to_zip(zip_file, name, markdown_text)
+        return fileobj